@@ -0,0 +1,108 @@
+"""
+Platform statistics for the admin dashboard.
+
+The headline numbers come from one multi-aggregate statement over users,
+groups and the user_daily_totals rollup (one row per user-day), never from
+food_entries itself. The scheduler refreshes them every REFRESH_SECONDS and
+requests are served from that snapshot. Each refresh also records the day's
+row in admin_stats_daily, which backs /admin/stats/history.
+"""
+import time
+from datetime import date, datetime, timedelta, timezone
+
+REFRESH_SECONDS = 300
+HISTORY_BACKFILL_DAYS = 90
+
+STATS_SQL = """
+    WITH u AS (
+        SELECT COUNT(*) AS total_users,
+               COUNT(*) FILTER (WHERE created_at >= $1::timestamptz - INTERVAL '24 hours') AS new_users_last_24h,
+               COUNT(*) FILTER (WHERE created_at >= $1::timestamptz - INTERVAL '7 days') AS new_users_last_7_days
+        FROM users
+    ), f AS (
+        SELECT COALESCE(SUM(entries), 0) AS total_food_entries,
+               COUNT(DISTINCT user_id) FILTER (WHERE day > $2::date - 7 AND entries > 0)
+                   AS active_users_last_7_days,
+               COALESCE(SUM(protein_g), 0) AS total_protein_logged_all_time,
+               COALESCE(SUM(calories), 0) AS total_calories_logged_all_time
+        FROM user_daily_totals
+    )
+    SELECT u.*, f.*, (SELECT COUNT(*) FROM groups) AS total_groups
+    FROM u, f
+"""
+
+# Everything is computed "as of the end of $1", so re-running it for a past
+# day gives the same row.
+SNAPSHOT_DAY_SQL = """
+    WITH u AS (
+        SELECT COUNT(*) FILTER (WHERE created_at < $1::date + 1) AS total_users,
+               COUNT(*) FILTER (WHERE created_at >= $1::date AND created_at < $1::date + 1) AS new_users
+        FROM users
+    ), a AS (
+        SELECT COUNT(DISTINCT user_id) FILTER (WHERE day = $1) AS daily_active_users,
+               COUNT(DISTINCT user_id) AS weekly_active_users
+        FROM user_daily_totals
+        WHERE day > $1::date - 7 AND day <= $1 AND entries > 0
+    )
+    INSERT INTO admin_stats_daily
+        (day, total_users, new_users, daily_active_users, weekly_active_users, total_groups, computed_at)
+    SELECT $1, u.total_users, u.new_users, a.daily_active_users, a.weekly_active_users,
+           (SELECT COUNT(*) FROM groups WHERE created_at < $1::date + 1), NOW()
+    FROM u, a
+    ON CONFLICT (day) DO UPDATE SET
+        total_users = EXCLUDED.total_users,
+        new_users = EXCLUDED.new_users,
+        daily_active_users = EXCLUDED.daily_active_users,
+        weekly_active_users = EXCLUDED.weekly_active_users,
+        total_groups = EXCLUDED.total_groups,
+        computed_at = EXCLUDED.computed_at
+"""
+
+_snapshot: dict = {"stats": None, "at": 0.0}
+
+
+async def compute(db) -> dict:
+    now = datetime.now(timezone.utc)
+    row = await db.fetchrow(STATS_SQL, now, now.date())
+    stats = dict(row)
+    stats["as_of"] = now
+    _snapshot.update(stats=stats, at=time.monotonic())
+    return stats
+
+
+async def current(db) -> dict:
+    """The last snapshot, or a fresh one if this process has none recent enough."""
+    if _snapshot["stats"] is None or time.monotonic() - _snapshot["at"] > 2 * REFRESH_SECONDS:
+        return await compute(db)
+    return _snapshot["stats"]
+
+
+async def snapshot_day(db, day: date):
+    await db.execute(SNAPSHOT_DAY_SQL, day)
+
+
+async def refresh(db):
+    """Scheduler entry point: recompute the stats and today's/yesterday's rows."""
+    await compute(db)
+    today = datetime.now(timezone.utc).date()
+    missing = await db.fetch(
+        """SELECT d::date AS day
+           FROM generate_series($1::date, $2::date - 2, INTERVAL '1 day') d
+           WHERE NOT EXISTS (SELECT 1 FROM admin_stats_daily s WHERE s.day = d::date)""",
+        today - timedelta(days=HISTORY_BACKFILL_DAYS), today,
+    )
+    for r in missing:
+        await snapshot_day(db, r["day"])
+    # Yesterday is re-snapshotted so its row ends up complete
+    await snapshot_day(db, today - timedelta(days=1))
+    await snapshot_day(db, today)
+
+
+async def history(db, days: int) -> list:
+    return await db.fetch(
+        """SELECT day, total_users, new_users, daily_active_users, weekly_active_users, total_groups
+           FROM admin_stats_daily
+           WHERE day > CURRENT_DATE - $1::int
+           ORDER BY day""",
+        days,
+    )
@@ -7,6 +7,14 @@ GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
 
+# EventSource can't send an Authorization header, so group event streams
+# authenticate with a ticket in the URL instead of the session JWT. It is
+# bound to one group and expires quickly, so one leaked through a proxy or
+# access log is of little use. The audience claim also makes decode_jwt
+# reject it, so it can't stand in for a session token.
+STREAM_TICKET_AUDIENCE = "group-events"
+STREAM_TICKET_SECONDS = 60
+
 
 def create_jwt(user_id: int) -> str:
     settings = get_settings()
@@ -29,6 +37,32 @@ def decode_jwt(token: str) -> dict | None:
         return None
 
 
+def create_stream_ticket(user_id: int, group_id: int) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": str(user_id),
+        "gid": group_id,
+        "aud": STREAM_TICKET_AUDIENCE,
+        "exp": now + timedelta(seconds=STREAM_TICKET_SECONDS),
+        "iat": now,
+    }
+    return jwt.encode(payload, get_settings().jwt_secret, algorithm="HS256")
+
+
+def decode_stream_ticket(ticket: str, group_id: int) -> int | None:
+    """The user id a valid ticket for `group_id` was issued to, else None."""
+    try:
+        payload = jwt.decode(
+            ticket, get_settings().jwt_secret, algorithms=["HS256"],
+            audience=STREAM_TICKET_AUDIENCE,
+        )
+    except JWTError:
+        return None
+    if payload.get("gid") != group_id:
+        return None
+    return int(payload["sub"])
+
+
 def get_google_login_url() -> str:
     settings = get_settings()
     params = {
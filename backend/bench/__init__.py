@@ -0,0 +1,7 @@
+"""
+End-to-end benchmarks: a synthetic population in a throwaway Postgres, the
+real app under uvicorn, local stand-ins for Gemini and Web Push, and a
+traffic driver that reports per-endpoint latency percentiles as JSON.
+
+Run from backend/:  python -m bench --help
+"""
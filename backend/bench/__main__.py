@@ -0,0 +1,240 @@
+"""
+python -m bench seed --users 2000 --years 2
+python -m bench run --duration 60 --concurrency 64 --out bench/results/$(git rev-parse --short HEAD).json
+python -m bench pregen --budget 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+from config import get_settings
+
+
+def _use_database(url: str | None):
+    if url:
+        os.environ["DATABASE_URL"] = url
+        get_settings.cache_clear()
+
+
+async def cmd_seed(args):
+    import database
+    from bench import population
+
+    await database.create_pool()
+    try:
+        await database.init_db()
+        async with database.acquire() as conn:
+            if args.reset:
+                await population.reset(conn)
+            counts = await population.seed(
+                conn,
+                users=args.users,
+                years=args.years,
+                entries_per_day=args.entries_per_day,
+                active_day_ratio=args.active_day_ratio,
+                group_size=args.group_size,
+                push_ratio=args.push_ratio,
+                push_url=f"http://127.0.0.1:{args.push_port}",
+            )
+    finally:
+        await database.close_pool()
+    print(json.dumps(counts, indent=2))
+
+
+async def _wait_healthy(base_url: str, proc, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if proc.returncode is not None:
+                raise SystemExit(f"App exited with code {proc.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit("App did not become healthy in time")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def cmd_run(args):
+    import database
+    from bench import fakes, population, traffic
+
+    mix = traffic.parse_mix(args.mix)
+    gemini = fakes.FakeBehaviour(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate)
+    push = fakes.FakeBehaviour(args.push_latency_ms, args.push_jitter_ms, args.push_error_rate)
+    servers = [
+        await fakes.serve(fakes.gemini_app(gemini), args.gemini_port),
+        await fakes.serve(fakes.push_app(push), args.push_port),
+    ]
+
+    await database.create_pool()
+    try:
+        async with database.acquire() as conn:
+            await population.schedule_reminders(conn, args.reminder_window)
+            actors = await population.load_actors(conn)
+            population_counts = {
+                "users": len(actors),
+                "food_entries": await conn.fetchval("SELECT COUNT(*) FROM food_entries"),
+                "groups": await conn.fetchval("SELECT COUNT(*) FROM groups"),
+            }
+    finally:
+        await database.close_pool()
+    if not actors:
+        raise SystemExit("No benchmark users found; run `python -m bench seed` first")
+
+    vapid_private, vapid_public = population.vapid_keypair()
+    env = {
+        **os.environ,
+        "GEMINI_STUB_URL": f"http://127.0.0.1:{args.gemini_port}",
+        "VAPID_PRIVATE_KEY": vapid_private,
+        "VAPID_PUBLIC_KEY": vapid_public,
+    }
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        await _wait_healthy(base_url, proc)
+        report = await traffic.drive(
+            base_url, actors, mix, args.concurrency, args.duration, args.warmup,
+        )
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            await proc.wait()
+        for server, task in servers:
+            server.should_exit = True
+            await task
+
+    result = {
+        "commit": _git_commit(),
+        "started_at": started_at,
+        "config": {
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "warmup_s": args.warmup,
+            "mix": mix,
+            "gemini": {"latency_ms": args.gemini_latency_ms, "jitter_ms": args.gemini_jitter_ms,
+                       "error_rate": args.gemini_error_rate},
+            "push": {"latency_ms": args.push_latency_ms, "jitter_ms": args.push_jitter_ms,
+                     "error_rate": args.push_error_rate},
+        },
+        "population": population_counts,
+        **report,
+        "fakes": {"gemini": gemini.calls, "push": push.calls},
+    }
+    text = json.dumps(result, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+async def cmd_pregen(args):
+    """Run the nightly meal plan pre-generation in-process against the fake Gemini."""
+    import database
+    import meal_plan_pregen
+    from bench import fakes
+
+    gemini = fakes.FakeBehaviour(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate)
+    server, task = await fakes.serve(fakes.gemini_app(gemini), args.gemini_port)
+    os.environ["GEMINI_STUB_URL"] = f"http://127.0.0.1:{args.gemini_port}"
+    get_settings.cache_clear()
+
+    day = date.fromisoformat(args.day) if args.day else date.today() + timedelta(days=1)
+    await database.create_pool()
+    try:
+        start = time.perf_counter()
+        counts = await meal_plan_pregen.run(day, args.budget, args.interval)
+        elapsed = time.perf_counter() - start
+        async with database.acquire() as conn:
+            stored = await conn.fetchval(
+                "SELECT COUNT(*) FROM precomputed_meal_plans WHERE plan_date = $1", day,
+            )
+    finally:
+        await database.close_pool()
+        server.should_exit = True
+        await task
+
+    print(json.dumps({
+        "day": day.isoformat(),
+        "counts": counts,
+        "stored": stored,
+        "elapsed_s": round(elapsed, 2),
+        "fakes": {"gemini": gemini.calls},
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL; the name must contain 'bench' for --reset")
+    parser.add_argument("--push-port", type=int, default=8102)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="Bulk-load a synthetic population")
+    seed.add_argument("--reset", action="store_true", help="Truncate users and groups first")
+    seed.add_argument("--users", type=int, default=1000)
+    seed.add_argument("--years", type=float, default=1.0)
+    seed.add_argument("--entries-per-day", type=int, default=4)
+    seed.add_argument("--active-day-ratio", type=float, default=0.8)
+    seed.add_argument("--group-size", type=int, default=25)
+    seed.add_argument("--push-ratio", type=float, default=0.3)
+
+    run = sub.add_parser("run", help="Start the app and fakes, drive traffic, report JSON")
+    run.add_argument("--app-port", type=int, default=8100)
+    run.add_argument("--gemini-port", type=int, default=8101)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--duration", type=float, default=60)
+    run.add_argument("--warmup", type=float, default=5)
+    run.add_argument("--mix", help="e.g. log=30,home=20,leaderboard=10 (default: built-in mix)")
+    run.add_argument("--gemini-latency-ms", type=float, default=1500)
+    run.add_argument("--gemini-jitter-ms", type=float, default=500)
+    run.add_argument("--gemini-error-rate", type=float, default=0.02)
+    run.add_argument("--push-latency-ms", type=float, default=80)
+    run.add_argument("--push-jitter-ms", type=float, default=40)
+    run.add_argument("--push-error-rate", type=float, default=0.01)
+    run.add_argument("--reminder-window", type=int, default=2,
+                     help="Spread push reminders over this many minutes from now")
+    run.add_argument("--out", help="Also write the JSON report here")
+
+    pregen = sub.add_parser("pregen", help="Pre-generate next-day meal plans against the fake Gemini")
+    pregen.add_argument("--gemini-port", type=int, default=8101)
+    pregen.add_argument("--day", help="YYYY-MM-DD (default: tomorrow)")
+    pregen.add_argument("--budget", type=int, default=100)
+    pregen.add_argument("--interval", type=float, default=0.0)
+    pregen.add_argument("--gemini-latency-ms", type=float, default=1500)
+    pregen.add_argument("--gemini-jitter-ms", type=float, default=500)
+    pregen.add_argument("--gemini-error-rate", type=float, default=0.02)
+
+    args = parser.parse_args()
+    _use_database(args.database_url)
+    commands = {"seed": cmd_seed, "run": cmd_run, "pregen": cmd_pregen}
+    asyncio.run(commands[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
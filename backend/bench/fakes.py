@@ -0,0 +1,135 @@
+"""
+Local stand-ins for Gemini and Web Push push services.
+
+Both are small FastAPI apps served by uvicorn inside the benchmark process,
+with configurable latency, jitter and error rate. The app reaches the fake
+Gemini through GEMINI_STUB_URL; the fake push service is reached through
+the endpoints the seeder wrote into push_subscriptions.
+"""
+import asyncio
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+@dataclass
+class FakeBehaviour:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    calls: dict = field(default_factory=dict)
+
+    async def delay(self):
+        wait = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if wait > 0:
+            await asyncio.sleep(wait / 1000)
+
+    def record(self, key: str, ok: bool):
+        counts = self.calls.setdefault(key, {"ok": 0, "error": 0})
+        counts["ok" if ok else "error"] += 1
+
+
+def _meal(meal_type: str, food: str, protein: float, calories: float, carbs: float) -> dict:
+    return {
+        "meal_type": meal_type,
+        "already_eaten": False,
+        "items": [{"food": food, "quantity": "1 serving", "protein_g": protein,
+                   "calories": calories, "carbs_g": carbs}],
+        "meal_protein": protein,
+        "meal_calories": calories,
+        "meal_carbs": carbs,
+        "meal_tip": "",
+    }
+
+
+def day_plan() -> dict:
+    meals = [
+        _meal("breakfast", "Greek yogurt with oats", 30, 420, 55),
+        _meal("lunch", "Chicken rice bowl", 45, 650, 70),
+        _meal("dinner", "Paneer tikka with dal", 40, 600, 45),
+        _meal("snack", "Whey shake", 25, 120, 3),
+    ]
+    return {
+        "meal_plan": meals,
+        "day_summary": {"total_protein": 140, "total_calories": 1790, "total_carbs": 173},
+        "nutritionist_note": "Benchmark plan.",
+    }
+
+
+def week_plan() -> list:
+    monday = date.today() - timedelta(days=date.today().weekday())
+    return [
+        {"day": name, "date": (monday + timedelta(days=i)).isoformat(), **day_plan()}
+        for i, name in enumerate(DAYS)
+    ]
+
+
+CANNED = {
+    "detect_food": lambda: {
+        "foods": [{"name": "Grilled chicken", "protein_g": 31, "calories": 165, "carbs_g": 0,
+                   "confidence": 0.9}],
+        "total_protein": 31, "total_calories": 165, "total_carbs": 0,
+    },
+    "meal_plan": day_plan,
+    "weekly_meal_plan": lambda: {"plan": week_plan()},
+    "refine_weekly_plan": lambda: {"plan": week_plan(), "assistant_message": "Swapped dinner."},
+    # The benchmark plan's dishes are all in the seeded knowledge base, so
+    # this only answers for dishes added by hand
+    "dish_ingredients": lambda: {"dishes": []},
+}
+
+
+def gemini_app(behaviour: FakeBehaviour) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/{operation}")
+    async def generate(operation: str, request: Request):
+        body = await request.json()
+        await behaviour.delay()
+        if operation not in CANNED or random.random() < behaviour.error_rate:
+            behaviour.record(operation, False)
+            return JSONResponse({"error": "429 Resource has been exhausted (fake)"}, status_code=429)
+        behaviour.record(operation, True)
+        text = json.dumps(CANNED[operation]())
+        return {
+            "text": text,
+            "usage": {
+                "prompt_token_count": len(body.get("prompt", "")) // 4,
+                "candidates_token_count": len(text) // 4,
+            },
+        }
+
+    return app
+
+
+def push_app(behaviour: FakeBehaviour) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/push/{subscription}")
+    async def deliver(subscription: str, request: Request):
+        await request.body()
+        await behaviour.delay()
+        if random.random() < behaviour.error_rate:
+            behaviour.record("push", False)
+            return Response(status_code=410)  # the app deletes gone subscriptions
+        behaviour.record("push", True)
+        return Response(status_code=201)
+
+    return app
+
+
+async def serve(app: FastAPI, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return server, task
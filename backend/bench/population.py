@@ -0,0 +1,174 @@
+"""
+Synthetic population, bulk-inserted with generate_series.
+
+Users get `years` of food history (a few entries on most days, picked
+deterministically from common_foods), are packed into groups of
+`group_size`, and a fraction get a push subscription pointing at the fake
+push service. Rollups derived from food_entries are rebuilt at the end.
+"""
+import base64
+import os
+from datetime import date, timedelta
+
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives import serialization
+
+import partitions
+from migrations import v013_daily_totals_and_streaks, v014_admin_stats_daily
+
+USER_BATCH = 200
+GOOGLE_ID_PREFIX = "bench-"
+
+
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _public_point(key) -> str:
+    return _b64url(key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint,
+    ))
+
+
+def vapid_keypair() -> tuple[str, str]:
+    """(private, public) VAPID keys in the encodings pywebpush accepts."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    private = _b64url(key.private_bytes(
+        serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    ))
+    return private, _public_point(key)
+
+
+async def reset(conn):
+    name = await conn.fetchval("SELECT current_database()")
+    if "bench" not in name:
+        raise SystemExit(f"Refusing to truncate database {name!r}; its name must contain 'bench'")
+    await conn.execute("TRUNCATE users, groups RESTART IDENTITY CASCADE")
+    await conn.execute("TRUNCATE admin_stats_daily")
+
+
+async def seed(
+    conn, *, users: int, years: float, entries_per_day: int, active_day_ratio: float,
+    group_size: int, push_ratio: float, push_url: str,
+) -> dict:
+    today = date.today()
+    start = today - timedelta(days=int(years * 365))
+
+    if await partitions.is_partitioned(conn):
+        month = partitions.month_start(start)
+        while month <= today:
+            await partitions.ensure_partition(conn, month)
+            month = partitions.add_months(month, 1)
+
+    first_id = await conn.fetchval("SELECT COALESCE(MAX(id), 0) + 1 FROM users")
+    await conn.execute(
+        """INSERT INTO users (google_id, email, display_name, protein_goal, calorie_goal, carb_goal,
+                              created_at)
+           SELECT $1 || n, $1 || n || '@example.com', 'Bench User ' || n,
+                  120 + (n % 5) * 15, 1800 + (n % 4) * 200, 180 + (n % 3) * 40,
+                  $3::date + ((n * 7919) % GREATEST($4::int, 1))
+           FROM generate_series($2::int, $2::int + $5 - 1) n""",
+        GOOGLE_ID_PREFIX, first_id, start, (today - start).days, users,
+    )
+    last_id = first_id + users - 1
+
+    for lo in range(first_id, last_id + 1, USER_BATCH):
+        hi = min(lo + USER_BATCH - 1, last_id)
+        await conn.execute(
+            """WITH foods AS (
+                   SELECT array_agg(name ORDER BY id) AS names,
+                          array_agg(protein_g ORDER BY id) AS protein,
+                          array_agg(calories ORDER BY id) AS calories,
+                          array_agg(carbs_g ORDER BY id) AS carbs,
+                          COUNT(*) AS n
+                   FROM common_foods
+               )
+               INSERT INTO food_entries
+                   (user_id, food_name, protein_g, calories, carbs_g, meal_type, serving_qty, logged_at)
+               SELECT u.id, f.names[k], f.protein[k], f.calories[k], f.carbs[k],
+                      (ARRAY['breakfast', 'lunch', 'dinner', 'snack'])[1 + slot % 4], 1,
+                      d + make_interval(hours => 7 + (slot * 4) % 15, mins => (u.id * 13 + slot) % 60)
+               FROM users u
+               CROSS JOIN generate_series(GREATEST($3::date, u.created_at::date), $4::date, INTERVAL '1 day') d
+               CROSS JOIN generate_series(0, $5 - 1) slot
+               CROSS JOIN foods f
+               CROSS JOIN LATERAL (
+                   SELECT 1 + (u.id * 31 + slot * 7 + EXTRACT(DOY FROM d)::int) % f.n::int AS k
+               ) pick
+               WHERE u.id BETWEEN $1 AND $2
+                 AND random() < $6""",
+            lo, hi, start, today, entries_per_day, active_day_ratio,
+        )
+        print(f"  food entries: users {lo}-{hi} of {last_id}")
+
+    await conn.execute(
+        """INSERT INTO groups (name, invite_code, created_by, created_at)
+           SELECT 'Bench Group ' || g, 'bench' || g, $1 + g * $3, $4
+           FROM generate_series(0, ($2 - $1) / $3) g""",
+        first_id, last_id, group_size, start,
+    )
+    await conn.execute(
+        """INSERT INTO group_members (group_id, user_id)
+           SELECT grp.id, u.id
+           FROM users u JOIN groups grp ON grp.invite_code = 'bench' || ((u.id - $1) / $3)
+           WHERE u.id BETWEEN $1 AND $2""",
+        first_id, last_id, group_size,
+    )
+    await conn.execute(
+        """UPDATE groups g SET member_count = c.n
+           FROM (SELECT group_id, COUNT(*) AS n FROM group_members GROUP BY group_id) c
+           WHERE c.group_id = g.id"""
+    )
+
+    # One subscriber key pair is enough; pywebpush encrypts per message anyway
+    sub_key = ec.generate_private_key(ec.SECP256R1())
+    await conn.execute(
+        """INSERT INTO push_subscriptions (user_id, endpoint, p256dh, auth, timezone)
+           SELECT id, $3 || '/push/' || id, $4, $5, 'UTC'
+           FROM users WHERE id BETWEEN $1 AND $2 AND random() < $6""",
+        first_id, last_id, push_url.rstrip("/"), _public_point(sub_key), _b64url(os.urandom(16)),
+        push_ratio,
+    )
+    await conn.execute(
+        """UPDATE users SET notif_enabled = TRUE
+           WHERE id IN (SELECT user_id FROM push_subscriptions) AND id BETWEEN $1 AND $2""",
+        first_id, last_id,
+    )
+
+    # The backfills in these migrations are idempotent; rerun them to build
+    # user_daily_totals and streaks for the rows inserted above.
+    await v013_daily_totals_and_streaks.upgrade(conn)
+    await v014_admin_stats_daily.upgrade(conn)
+    await conn.execute("ANALYZE")
+
+    return {
+        "users": users,
+        "food_entries": await conn.fetchval("SELECT COUNT(*) FROM food_entries"),
+        "groups": await conn.fetchval("SELECT COUNT(*) FROM groups"),
+        "push_subscriptions": await conn.fetchval("SELECT COUNT(*) FROM push_subscriptions"),
+    }
+
+
+async def schedule_reminders(conn, window_minutes: int):
+    """Spread subscribed users' reminder times over the next `window_minutes` (UTC)."""
+    await conn.execute(
+        """UPDATE users
+           SET notif_breakfast_time = t, notif_lunch_time = t, notif_dinner_time = t
+           FROM (SELECT id AS uid,
+                        to_char(now() AT TIME ZONE 'UTC' + make_interval(mins => 1 + id % $1), 'HH24:MI') AS t
+                 FROM users WHERE notif_enabled) r
+           WHERE users.id = r.uid""",
+        max(window_minutes, 1),
+    )
+
+
+async def load_actors(conn) -> list[tuple[int, int | None]]:
+    """(user id, group id) for every benchmark user."""
+    rows = await conn.fetch(
+        """SELECT u.id, MIN(gm.group_id) AS group_id
+           FROM users u LEFT JOIN group_members gm ON gm.user_id = u.id
+           WHERE u.google_id LIKE $1 || '%'
+           GROUP BY u.id""",
+        GOOGLE_ID_PREFIX,
+    )
+    return [(r["id"], r["group_id"]) for r in rows]
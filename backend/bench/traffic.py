@@ -0,0 +1,163 @@
+"""
+Traffic driver: N concurrent virtual users issuing a weighted mix of
+requests for `duration` seconds, with per-endpoint latency percentiles.
+"""
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from auth import create_jwt
+from bench.fakes import week_plan
+
+# name -> weight; see _request for what each one sends
+DEFAULT_MIX = {
+    "log": 25,
+    "dashboard_daily": 20,
+    "home": 15,
+    "leaderboard": 15,
+    "entries_history": 10,
+    "weekly_plan_get": 5,
+    "meal_plan": 5,
+    "weekly_plan_generate": 3,
+    "grocery_list": 2,
+}
+
+FOODS = [
+    ("Chicken Breast (100g)", 31.0, 165, 0.0),
+    ("Greek Yogurt (200g)", 20.0, 130, 9.0),
+    ("Dal / Lentils (1 cup)", 18.0, 230, 40.0),
+    ("Whey Protein Scoop", 25.0, 120, 3.0),
+]
+
+
+def parse_mix(spec: str | None) -> dict:
+    """"log=30,home=10" -> weights; unknown names are rejected."""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+        self.recording = False
+
+    def add(self, name: str, seconds: float, status: int):
+        if not self.recording:
+            return
+        self.latencies.setdefault(name, []).append(seconds)
+        by_status = self.statuses.setdefault(name, {})
+        by_status[str(status)] = by_status.get(str(status), 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            samples.sort()
+            statuses = self.statuses[name]
+            errors = sum(n for code, n in statuses.items() if not code.startswith(("2", "3")))
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": errors,
+                "statuses": statuses,
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "p99_ms": _percentile(samples, 99),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+def _percentile(sorted_samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile, in milliseconds."""
+    k = max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1))
+    return round(sorted_samples[k] * 1000, 2)
+
+
+_tokens: dict[int, str] = {}
+
+
+async def _request(client: httpx.AsyncClient, name: str, user_id: int, group_id: int | None):
+    token = _tokens.get(user_id)
+    if token is None:
+        token = _tokens[user_id] = create_jwt(user_id)
+    headers = {"Authorization": f"Bearer {token}"}
+    today = date.today().isoformat()
+    week_start = (date.today() - timedelta(days=date.today().weekday())).isoformat()
+    if name == "log":
+        food, protein, calories, carbs = random.choice(FOODS)
+        return await client.post("/food/log", headers=headers, json={
+            "food_name": food, "protein_g": protein, "calories": calories, "carbs_g": carbs,
+            "meal_type": random.choice(["breakfast", "lunch", "dinner", "snack"]),
+        })
+    if name == "dashboard_daily":
+        return await client.get("/dashboard/daily", headers=headers, params={"date": today})
+    if name == "home":
+        return await client.get("/home", headers=headers, params={"today": today})
+    if name == "leaderboard":
+        if group_id is None:
+            return await client.get("/groups", headers=headers)
+        return await client.get(
+            f"/groups/{group_id}/leaderboard/page", headers=headers,
+            params={"period": random.choice(["daily", "weekly"]), "today": today, "around_me": 5},
+        )
+    if name == "entries_history":
+        return await client.get("/food/entries/history", headers=headers, params={"limit": 50})
+    if name == "weekly_plan_get":
+        return await client.get("/food/weekly-meal-plan", headers=headers, params={"week_start": week_start})
+    if name == "meal_plan":
+        return await client.get("/food/meal-plan", headers=headers, params={"date": today})
+    if name == "weekly_plan_generate":
+        return await client.post("/food/weekly-meal-plan/generate", headers=headers,
+                                 json={"week_start": week_start})
+    if name == "grocery_list":
+        return await client.post("/food/weekly-meal-plan/grocery-list", headers=headers,
+                                 json={"week_start": week_start, "plan": week_plan()})
+    raise ValueError(name)
+
+
+async def drive(
+    base_url: str, actors: list[tuple[int, int | None]], mix: dict,
+    concurrency: int, duration: float, warmup: float,
+) -> dict:
+    names, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    deadline = time.monotonic() + warmup + duration
+
+    async def virtual_user(client):
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            user_id, group_id = random.choice(actors)
+            start = time.perf_counter()
+            try:
+                resp = await _request(client, name, user_id, group_id)
+                status = resp.status_code
+            except httpx.HTTPError:
+                status = 599
+            recorder.add(name, time.perf_counter() - start, status)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        users = [asyncio.create_task(virtual_user(client)) for _ in range(concurrency)]
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        started = time.monotonic()
+        await asyncio.gather(*users)
+        elapsed = time.monotonic() - started
+    return recorder.report(elapsed)
@@ -0,0 +1,34 @@
+"""Per-user change versions backing /sync and conditional dashboard requests."""
+import database
+
+BUMP_VERSION_SQL = database.hot_statement(
+    "UPDATE users SET change_version = change_version + 1 WHERE id = $1 RETURNING change_version"
+)
+
+
+async def bump_change_version(db, user_id: int) -> int:
+    """
+    Increment and return the user's change version.
+
+    Call inside the same transaction as the write it describes, so the new
+    version only becomes visible together with the data it covers. Also
+    marks the request as a write, so the response carries a last-write
+    token for read-your-writes (see database.acquire_read).
+    """
+    version = await db.fetchval(BUMP_VERSION_SQL, user_id)
+    database.note_write(user_id, version)
+    return version
+
+
+def make_etag(user: dict, *parts) -> str:
+    """Weak ETag for a per-user view; changes whenever the user writes anything."""
+    key = "-".join(str(p) for p in (user["id"], user.get("change_version", 0), *parts))
+    return f'W/"{key}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
@@ -0,0 +1,92 @@
+"""
+Circuit breaker for calls to an upstream service.
+
+Closed: calls go through, and outcomes are kept for the last
+`window_seconds`. Once at least `min_calls` are in the window and the error
+share reaches `error_rate`, the breaker opens. Open: calls fail at once with
+CircuitOpen until `open_seconds` pass. Half-open: a single probe call is let
+through; success closes the breaker, failure opens it again.
+
+State is per process, and is exported as circuit_breaker_state in metrics.
+"""
+import math
+import time
+from collections import deque
+
+import metrics
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, error_rate: float, min_calls: int,
+                 window_seconds: float, open_seconds: float):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.outcomes: deque[tuple[float, bool]] = deque()
+        self.errors = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        metrics.BREAKER_STATE.set(STATE_VALUES[CLOSED], name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            metrics.BREAKER_STATE.set(STATE_VALUES[state], self.name)
+            metrics.BREAKER_TRANSITIONS.inc(self.name, state)
+
+    def _trim(self, now: float):
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            _, ok = self.outcomes.popleft()
+            if not ok:
+                self.errors -= 1
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.opened_at + self.open_seconds - time.monotonic()))
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                metrics.BREAKER_REJECTIONS.inc(self.name)
+                raise CircuitOpen(self.name, self.retry_after())
+            self._set_state(HALF_OPEN)
+            self.probe_started = 0.0
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported back (cancelled) expires
+            if self.probe_started and now - self.probe_started < self.open_seconds:
+                metrics.BREAKER_REJECTIONS.inc(self.name)
+                raise CircuitOpen(self.name, 1)
+            self.probe_started = now
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            if ok:
+                self.outcomes.clear()
+                self.errors = 0
+                self._set_state(CLOSED)
+            else:
+                self.opened_at = now
+                self._set_state(OPEN)
+            return
+        self.outcomes.append((now, ok))
+        if not ok:
+            self.errors += 1
+        self._trim(now)
+        if (self.state == CLOSED and len(self.outcomes) >= self.min_calls
+                and self.errors / len(self.outcomes) >= self.error_rate):
+            self.opened_at = now
+            self._set_state(OPEN)
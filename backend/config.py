@@ -7,12 +7,38 @@ class Settings(BaseSettings):
     google_client_secret: str = ""
     jwt_secret: str = "dev-secret-change-in-production"
     gemini_api_key: str = ""
+    gemini_stub_url: str = ""  # benchmarks only: send Gemini calls to a local stand-in
+    meal_plan_gemini_timeout_s: float = 8.0  # past this, /food/meal-plan uses the local planner
+    gemini_breaker_error_rate: float = 0.5
+    gemini_breaker_min_calls: int = 10
+    gemini_breaker_window_s: float = 60.0
+    gemini_breaker_open_s: float = 30.0
+    gemini_hedge_after_s: float = 0.0  # 0 disables hedging; see gemini_client.HEDGED_OPERATIONS
+    gemini_detect_concurrency: int = 8  # image detections in flight per process
+    meal_plan_pregen_enabled: bool = False  # nightly next-day plans, see meal_plan_pregen.py
+    meal_plan_pregen_hour: int = 22  # local server hour the job starts; it plans the following day
+    meal_plan_pregen_budget: int = 200  # max Gemini calls per run
+    meal_plan_pregen_interval_s: float = 2.0  # pause between calls, to stay under the per-minute quota
     frontend_url: str = "http://localhost:5173"
     database_url: str = "postgresql://localhost:5432/tracker"
+    database_replica_url: str = ""  # optional streaming replica for read-only routes
+    replica_max_lag_seconds: float = 5.0
+    read_your_writes_seconds: float = 10.0  # how long a client's X-Last-Write token is honoured
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_max_idle_seconds: float = 300.0
+    db_statement_cache_size: int = 100
+    db_pgbouncer_mode: bool | None = None  # None = detect from DATABASE_URL host
+    db_slow_query_ms: float = 500.0
+    export_concurrency: int = 4  # account exports streaming at once per process, each on its own connection
+    export_idle_timeout_s: float = 60.0  # an export whose client stops reading is cut off after this
+    metrics_token: str = ""  # /metrics requires "Authorization: Bearer <token>"; unset disables it
     jwt_expiry_days: int = 7
     vapid_private_key: str = ""
     vapid_public_key: str = ""
     vapid_contact_email: str = "admin@example.com"
+    partition_months_ahead: int = 3
+    food_entries_retention_months: int = 0  # 0 keeps every partition attached
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
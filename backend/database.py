@@ -1,15 +1,129 @@
 import asyncpg
+import importlib
+import logging
+import orjson
+import pkgutil
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from config import get_settings
 
-CURRENT_SCHEMA_VERSION = 6
+import metrics
+import migrations
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant shared by every process that may run migrations
+MIGRATION_LOCK_ID = 0x7472616B
 
 pool: asyncpg.Pool = None
+replica_pool: asyncpg.Pool | None = None
 
+# Query texts prepared on every new connection (see hot_statement)
+HOT_STATEMENTS: list[str] = []
 
-async def create_pool():
-    """Create the asyncpg connection pool."""
-    global pool
-    dsn = get_settings().database_url
+
+def hot_statement(sql: str) -> str:
+    """Register a query to be prepared at connection warm-up; returns it unchanged."""
+    HOT_STATEMENTS.append(sql)
+    return sql
+
+
+@lru_cache(maxsize=2048)
+def statement_key(query: str) -> str:
+    """Whitespace-collapsed, truncated query text used to label statements."""
+    return " ".join(query.split())[:120]
+
+
+class PoolStats:
+    """In-process counters for pool acquisition and statement cache behaviour."""
+
+    def __init__(self):
+        self.acquire_count = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+        self.statements: dict[str, dict] = {}
+
+    def record_acquire(self, waited: float):
+        self.acquire_count += 1
+        self.acquire_wait_total += waited
+        self.acquire_wait_max = max(self.acquire_wait_max, waited)
+
+    def record_statement(self, query: str, hit: bool):
+        key = statement_key(query)
+        entry = self.statements.setdefault(key, {"hits": 0, "prepares": 0})
+        entry["hits" if hit else "prepares"] += 1
+
+    def snapshot(self) -> dict:
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        return {
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "max_size": pool.get_max_size() if pool else 0,
+            "acquire_count": self.acquire_count,
+            "acquire_wait_avg_ms": round(1000 * self.acquire_wait_total / self.acquire_count, 3)
+            if self.acquire_count else 0.0,
+            "acquire_wait_max_ms": round(1000 * self.acquire_wait_max, 3),
+            "replica_size": replica_pool.get_size() if replica_pool else 0,
+            "replica_idle": replica_pool.get_idle_size() if replica_pool else 0,
+            "statements": self.statements,
+        }
+
+
+pool_stats = PoolStats()
+
+
+class TrackedConnection(asyncpg.Connection):
+    """
+    Connection that reports statement cache hits.
+
+    asyncpg names every cached prepared statement uniquely, so getting the
+    same name back for a query means the cache served it; a new (or empty,
+    when caching is off) name means it was prepared again.
+    """
+
+    async def _get_statement(self, query, timeout, **kwargs):
+        stmt = await super()._get_statement(query, timeout, **kwargs)
+        seen = getattr(self, "_tracked_names", None)
+        if seen is None:
+            seen = self._tracked_names = {}
+        name = stmt.name
+        pool_stats.record_statement(query, hit=bool(name) and seen.get(query) == name)
+        seen[query] = name
+        return stmt
+
+    async def warm_up(self):
+        for sql in HOT_STATEMENTS:
+            try:
+                await self._get_statement(sql, None)
+            except asyncpg.PostgresError:
+                # e.g. a fresh database whose tables don't exist yet
+                pass
+
+
+def _on_query(record):
+    """asyncpg query logger: per-statement timings and the slow query log."""
+    key = statement_key(record.query)
+    slow = record.elapsed * 1000 >= get_settings().db_slow_query_ms
+    metrics.record_query(key, record.elapsed, record.exception is not None, slow)
+    if slow:
+        logger.warning("Slow query (%.0f ms): %s", record.elapsed * 1000, key)
+
+
+def _uses_pgbouncer(dsn: str) -> bool:
+    settings = get_settings()
+    if settings.db_pgbouncer_mode is not None:
+        return settings.db_pgbouncer_mode
+    # Neon's pooled endpoints and PgBouncer's conventional port
+    host = dsn.split('@')[-1].split('/')[0]
+    return '-pooler' in host or host.endswith(':6432')
+
+
+def _split_sslmode(dsn: str) -> tuple[str, str | None]:
     # Handle sslmode param (asyncpg needs it as a separate kwarg)
     ssl_mode = None
     if 'sslmode=' in dsn:
@@ -19,224 +133,307 @@ async def create_pool():
         base, _, query = dsn.partition('?')
         params = '&'.join(p for p in query.split('&') if not p.startswith('sslmode='))
         dsn = base + ('?' + params if params else '')
-    pool = await asyncpg.create_pool(dsn=dsn, ssl=ssl_mode, min_size=1, max_size=10, statement_cache_size=0)
+    return dsn, ssl_mode
+
+
+def _encode_json(value) -> bytes:
+    """bytes are taken as already-encoded JSON (e.g. a pydantic dump_json)."""
+    return value if isinstance(value, bytes) else orjson.dumps(value)
+
+
+def _encode_jsonb(value) -> bytes:
+    # Binary jsonb is a format version byte followed by the JSON text
+    return b"\x01" + _encode_json(value)
+
+
+def _decode_jsonb(data: bytes):
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def register_json_codecs(conn):
+    """Send and receive json/jsonb as binary with orjson instead of str round trips."""
+    await conn.set_type_codec(
+        "json", schema="pg_catalog", format="binary",
+        encoder=_encode_json, decoder=orjson.loads,
+    )
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog", format="binary",
+        encoder=_encode_jsonb, decoder=_decode_jsonb,
+    )
+
+
+async def _open_pool(dsn: str) -> asyncpg.Pool:
+    settings = get_settings()
+    dsn, ssl_mode = _split_sslmode(dsn)
+
+    # PgBouncer in transaction mode hands each transaction a different
+    # server connection, so named prepared statements can't be reused.
+    pgbouncer = _uses_pgbouncer(dsn)
+    cache_size = 0 if pgbouncer else settings.db_statement_cache_size
+
+    async def init_connection(conn):
+        conn.add_query_logger(_on_query)
+        # Before warm_up: setting a codec drops the connection's statement cache
+        await register_json_codecs(conn)
+        if cache_size:
+            await conn.warm_up()
+
+    return await asyncpg.create_pool(
+        dsn=dsn,
+        ssl=ssl_mode,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        max_inactive_connection_lifetime=settings.db_pool_max_idle_seconds,
+        statement_cache_size=cache_size,
+        connection_class=TrackedConnection,
+        init=init_connection,
+    )
+
+
+async def create_pool():
+    """Create the primary pool, and the replica pool if one is configured."""
+    global pool, replica_pool
+    settings = get_settings()
+    pool = await _open_pool(settings.database_url)
+    if settings.database_replica_url:
+        try:
+            replica_pool = await _open_pool(settings.database_replica_url)
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning("Read replica unavailable, serving reads from primary: %s", e)
+            replica_pool = None
+
+
+async def connect_dedicated() -> asyncpg.Connection:
+    """
+    A standalone primary connection outside the pool, for long-lived
+    sessions such as LISTEN. Point DATABASE_URL at a direct (non-PgBouncer)
+    endpoint if LISTEN is needed, since transaction pooling drops it.
+    """
+    dsn, ssl_mode = _split_sslmode(get_settings().database_url)
+    return await asyncpg.connect(dsn=dsn, ssl=ssl_mode)
+
+
+@asynccontextmanager
+async def acquire():
+    """pool.acquire() that records how long the caller waited for a connection."""
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        pool_stats.record_acquire(time.perf_counter() - start)
+        yield conn
+
+
+# Read-your-writes is carried by the client, so it holds across workers: a
+# request that wrote gets "<user id>:<change version>@<unix time>" back in
+# this header, and sends it on later requests. Within the read-your-writes
+# window, a read only uses the replica once the user's row there shows that
+# change version. The version comes back from the write's own statement
+# and is visible on the replica only after the commit replays, so this
+# needs no extra primary round trip and can't see a half-replayed write.
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_RE = re.compile(r"^(\d+):(\d+)@(\d+(?:\.\d+)?)$")
+
+# Set per request by ReadYourWritesMiddleware; a dict so writes made in
+# copied contexts (dependencies, task groups) are still seen
+_request_writes: ContextVar[dict | None] = ContextVar("request_writes", default=None)
+_replica_lag = {"checked_at": 0.0, "seconds": 0.0}
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+CAUGHT_UP_SQL = "SELECT COALESCE((SELECT change_version >= $2 FROM users WHERE id = $1), FALSE)"
+
+
+def note_write(user_id: int, change_version: int):
+    """
+    Record that the current request wrote `change_version` for the user,
+    so its response carries a last-write token. Called by
+    changes.bump_change_version.
+    """
+    writes = _request_writes.get()
+    if writes is not None and change_version >= writes.get("version", -1):
+        writes.update(user_id=user_id, version=change_version)
+
+
+def last_write_token(user_id: int, change_version: int) -> str:
+    return f"{user_id}:{change_version}@{time.time():.3f}"
+
+
+def _required_version(user_id: int | None, last_write: str | None) -> int | None:
+    """The change version a replica must show for this reader, or None if any replica state will do."""
+    match = LAST_WRITE_RE.match(last_write or "")
+    if not match or user_id is None or int(match.group(1)) != user_id:
+        return None
+    if time.time() - float(match.group(3)) >= get_settings().read_your_writes_seconds:
+        return None
+    return int(match.group(2))
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware that adds LAST_WRITE_HEADER to responses of requests that wrote."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        writes: dict = {}
+        token = _request_writes.set(writes)
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and writes:
+                value = last_write_token(writes["user_id"], writes["version"])
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.lower().encode(), value.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _request_writes.reset(token)
+
+
+async def _replica_lag_seconds() -> float:
+    """Replica replay lag, re-measured at most once a second."""
+    now = time.monotonic()
+    if now - _replica_lag["checked_at"] >= 1.0:
+        _replica_lag["checked_at"] = now
+        try:
+            async with replica_pool.acquire() as conn:
+                _replica_lag["seconds"] = float(await conn.fetchval(REPLICA_LAG_SQL))
+        except (OSError, asyncpg.PostgresError):
+            _replica_lag["seconds"] = float("inf")
+    return _replica_lag["seconds"]
+
+
+@asynccontextmanager
+async def acquire_read(user_id: int | None = None, last_write: str | None = None):
+    """
+    Connection for a read-only request.
+
+    Uses the replica unless none is configured, replication lag exceeds the
+    configured limit, or `last_write` (the client's LAST_WRITE_HEADER) is
+    the user's, inside the read-your-writes window, and not yet replayed;
+    in each of those cases the primary serves the read.
+    """
+    if replica_pool is not None and await _replica_lag_seconds() <= get_settings().replica_max_lag_seconds:
+        version = _required_version(user_id, last_write)
+        start = time.perf_counter()
+        async with replica_pool.acquire() as conn:
+            pool_stats.record_acquire(time.perf_counter() - start)
+            if version is None or await conn.fetchval(CAUGHT_UP_SQL, user_id, version):
+                yield conn
+                return
+
+    async with acquire() as conn:
+        yield conn
 
 
 async def close_pool():
-    """Close the connection pool."""
-    global pool
+    """Close the connection pools."""
+    global pool, replica_pool
+    if replica_pool:
+        await replica_pool.close()
+        replica_pool = None
     if pool:
         await pool.close()
         pool = None
 
 
+def load_migrations() -> dict:
+    """Discover migrations/vNNN_*.py modules, keyed by version number."""
+    found = {}
+    for info in pkgutil.iter_modules(migrations.__path__):
+        match = re.match(r"v(\d+)_", info.name)
+        if match:
+            found[int(match.group(1))] = importlib.import_module(f"migrations.{info.name}")
+    return dict(sorted(found.items()))
+
+
+MIGRATIONS = load_migrations()
+CURRENT_SCHEMA_VERSION = max(MIGRATIONS)
+
+
+async def _schema_version(conn) -> int:
+    try:
+        version = await conn.fetchval("SELECT version FROM schema_version")
+    except asyncpg.UndefinedTableError:
+        return 0
+    return version or 0
+
+
 async def init_db():
-    """Create tables and manage schema versions."""
+    """
+    Bring the schema up to CURRENT_SCHEMA_VERSION.
+
+    An up-to-date database costs a single query. Otherwise the migrator
+    takes an advisory lock, so concurrently starting workers wait for one
+    of them to finish instead of racing, and re-reads the version once it
+    holds the lock.
+    """
     async with pool.acquire() as conn:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS schema_version (
-                version INTEGER NOT NULL
-            )
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                google_id VARCHAR UNIQUE NOT NULL,
-                email VARCHAR UNIQUE NOT NULL,
-                display_name VARCHAR NOT NULL,
-                avatar_url VARCHAR,
-                protein_goal REAL DEFAULT 150,
-                calorie_goal REAL DEFAULT 2000,
-                carb_goal REAL DEFAULT 200,
-                age INTEGER,
-                weight_kg REAL,
-                height_cm REAL,
-                sex VARCHAR,
-                activity_level VARCHAR,
-                goal_type VARCHAR,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS common_foods (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR NOT NULL,
-                protein_g REAL NOT NULL,
-                calories REAL NOT NULL,
-                carbs_g REAL DEFAULT 0,
-                category VARCHAR NOT NULL,
-                icon VARCHAR NOT NULL,
-                sort_order INTEGER DEFAULT 0
-            )
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS food_entries (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL REFERENCES users(id),
-                food_name VARCHAR NOT NULL,
-                protein_g REAL NOT NULL,
-                calories REAL NOT NULL,
-                carbs_g REAL DEFAULT 0,
-                fdc_id VARCHAR,
-                meal_type VARCHAR DEFAULT 'snack',
-                serving_qty REAL DEFAULT 1.0,
-                logged_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-        await conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_food_entries_user_date
-                ON food_entries(user_id, logged_at)
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS groups (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR NOT NULL,
-                invite_code VARCHAR UNIQUE NOT NULL,
-                created_by INTEGER NOT NULL REFERENCES users(id),
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS group_members (
-                id SERIAL PRIMARY KEY,
-                group_id INTEGER NOT NULL REFERENCES groups(id),
-                user_id INTEGER NOT NULL REFERENCES users(id),
-                joined_at TIMESTAMPTZ DEFAULT NOW(),
-                UNIQUE(group_id, user_id)
-            )
-        """)
-
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS weekly_meal_plans (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL REFERENCES users(id),
-                week_start DATE NOT NULL,
-                plan_data JSONB NOT NULL,
-                conversation_history JSONB DEFAULT '[]',
-                updated_at TIMESTAMPTZ DEFAULT NOW(),
-                UNIQUE(user_id, week_start)
-            )
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS push_subscriptions (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                endpoint TEXT NOT NULL,
-                p256dh TEXT NOT NULL,
-                auth TEXT NOT NULL,
-                timezone VARCHAR DEFAULT 'UTC',
-                created_at TIMESTAMPTZ DEFAULT NOW(),
-                UNIQUE(user_id, endpoint)
-            )
-        """)
-
-        # Check and set schema version
-        row = await conn.fetchrow("SELECT version FROM schema_version")
-        if row is None:
-            await conn.execute(
-                "INSERT INTO schema_version (version) VALUES ($1)",
-                CURRENT_SCHEMA_VERSION,
-            )
-        else:
-            current = row['version']
+        if await _schema_version(conn) >= CURRENT_SCHEMA_VERSION:
+            return
+
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER NOT NULL
+                )
+            """)
+            await conn.execute("""
+                INSERT INTO schema_version (version)
+                SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM schema_version)
+            """)
+            current = await _schema_version(conn)
             if current < CURRENT_SCHEMA_VERSION:
                 await run_migrations(conn, current, CURRENT_SCHEMA_VERSION)
-                await conn.execute(
-                    "UPDATE schema_version SET version = $1",
-                    CURRENT_SCHEMA_VERSION,
-                )
-
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
 
-async def migrate_v1_to_v2(conn):
-    """Add carbs_g to food_entries and common_foods; add carb_goal to users."""
-    await conn.execute(
-        "ALTER TABLE food_entries ADD COLUMN IF NOT EXISTS carbs_g REAL DEFAULT 0"
-    )
-    await conn.execute(
-        "ALTER TABLE common_foods ADD COLUMN IF NOT EXISTS carbs_g REAL DEFAULT 0"
-    )
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS carb_goal REAL DEFAULT 200"
-    )
-    print("Migrated schema v1 → v2: added carbs_g and carb_goal columns")
 
+async def run_migrations(conn, from_version: int, to_version: int):
+    """
+    Apply numbered migrations sequentially, recording each version as it
+    lands. Transactional migrations commit together with their version bump.
+    """
+    for v, module in MIGRATIONS.items():
+        if not from_version < v <= to_version:
+            continue
+        name = module.__name__.rsplit(".", 1)[-1]
+        if getattr(module, "TRANSACTIONAL", True):
+            async with conn.transaction():
+                await module.upgrade(conn)
+                await conn.execute("UPDATE schema_version SET version = $1", v)
+        else:
+            await module.upgrade(conn)
+            await conn.execute("UPDATE schema_version SET version = $1", v)
+        print(f"Migrated schema → v{v}: {name}")
 
-async def migrate_v2_to_v3(conn):
-    """Add user profile fields for smart goal calculation."""
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS age INTEGER")
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS weight_kg REAL")
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS height_cm REAL")
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS sex VARCHAR")
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS activity_level VARCHAR")
-    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS goal_type VARCHAR")
-    print("Migrated schema v2 → v3: added user profile columns")
 
+async def create_index_concurrently(conn, name: str, target: str):
+    """
+    CREATE INDEX CONCURRENTLY, tolerating a previous interrupted attempt.
 
-async def migrate_v3_to_v4(conn):
-    """Add dietary preference and food dislikes to users."""
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS dietary_preference VARCHAR DEFAULT 'non_vegetarian'"
-    )
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS food_dislikes TEXT"
-    )
-    print("Migrated schema v3 → v4: added dietary_preference and food_dislikes columns")
-
-
-async def migrate_v4_to_v5(conn):
-    """Add weekly_meal_plans table for persisting 7-day meal plans."""
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS weekly_meal_plans (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER NOT NULL REFERENCES users(id),
-            week_start DATE NOT NULL,
-            plan_data JSONB NOT NULL,
-            conversation_history JSONB DEFAULT '[]',
-            updated_at TIMESTAMPTZ DEFAULT NOW(),
-            UNIQUE(user_id, week_start)
-        )
-    """)
-    print("Migrated schema v4 → v5: added weekly_meal_plans table")
-
-
-async def migrate_v5_to_v6(conn):
-    """Add push_subscriptions table and notification prefs columns to users."""
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS push_subscriptions (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-            endpoint TEXT NOT NULL,
-            p256dh TEXT NOT NULL,
-            auth TEXT NOT NULL,
-            timezone VARCHAR DEFAULT 'UTC',
-            created_at TIMESTAMPTZ DEFAULT NOW(),
-            UNIQUE(user_id, endpoint)
-        )
-    """)
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_enabled BOOLEAN DEFAULT FALSE"
+    A failed concurrent build leaves an INVALID index behind that
+    IF NOT EXISTS would silently keep, so drop it first. Must run outside a
+    transaction (i.e. from a TRANSACTIONAL = False migration).
+    """
+    invalid = await conn.fetchval(
+        """SELECT NOT i.indisvalid
+           FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+           WHERE c.relname = $1""",
+        name,
     )
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_breakfast_time VARCHAR DEFAULT '08:00'"
-    )
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_lunch_time VARCHAR DEFAULT '12:30'"
-    )
-    await conn.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_dinner_time VARCHAR DEFAULT '19:00'"
-    )
-    print("Migrated schema v5 → v6: added push_subscriptions table and notification columns")
-
-
-async def run_migrations(conn, from_version: int, to_version: int):
-    """Run numbered migrations sequentially. Add new migrations here."""
-    migrations = {
-        2: migrate_v1_to_v2,
-        3: migrate_v2_to_v3,
-        4: migrate_v3_to_v4,
-        5: migrate_v4_to_v5,
-        6: migrate_v5_to_v6,
-    }
-    for v in range(from_version + 1, to_version + 1):
-        if v in migrations:
-            await migrations[v](conn)
+    if invalid:
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
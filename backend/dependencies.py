@@ -2,15 +2,28 @@ from fastapi import Depends, HTTPException, Header
 import database
 from auth import decode_jwt
 
+USER_BY_ID_SQL = database.hot_statement("SELECT * FROM users WHERE id = $1")
+
 
 async def get_db():
-    async with database.pool.acquire() as conn:
+    async with database.acquire() as conn:
         yield conn
 
 
-async def get_current_user(
-    authorization: str = Header(None), db=Depends(get_db)
-) -> dict:
+def _token_user_id(authorization: str | None) -> int | None:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    payload = decode_jwt(authorization.split(" ", 1)[1])
+    return int(payload["sub"]) if payload else None
+
+
+async def get_read_db(authorization: str = Header(None), x_last_write: str = Header(None)):
+    """Like get_db, but may route to the read replica (see database.acquire_read)."""
+    async with database.acquire_read(_token_user_id(authorization), x_last_write) as conn:
+        yield conn
+
+
+async def _load_user(authorization: str | None, db) -> dict:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -20,8 +33,21 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     user_id = int(payload["sub"])
-    user = await db.fetchrow("SELECT * FROM users WHERE id = $1", user_id)
+    user = await db.fetchrow(USER_BY_ID_SQL, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
 
     return dict(user)
+
+
+async def get_current_user(
+    authorization: str = Header(None), db=Depends(get_db)
+) -> dict:
+    return await _load_user(authorization, db)
+
+
+async def get_current_user_read(
+    authorization: str = Header(None), db=Depends(get_read_db)
+) -> dict:
+    """get_current_user for read-only routes; shares the request's read connection."""
+    return await _load_user(authorization, db)
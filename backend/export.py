@@ -0,0 +1,196 @@
+import asyncio
+import csv
+import io
+import json
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import database
+from config import get_settings
+
+# Rows are pulled from the server-side cursor in batches of this size, so
+# memory stays flat no matter how many years of history a user has.
+CURSOR_PREFETCH = 500
+
+# (section name, query, columns) — every query takes the user id as $1.
+EXPORT_SECTIONS = [
+    (
+        "food_entries",
+        """SELECT id, food_name, protein_g, calories, carbs_g, fdc_id,
+                  meal_type, serving_qty, logged_at
+           FROM food_entries
+           WHERE user_id = $1
+           ORDER BY logged_at, id""",
+        ["id", "food_name", "protein_g", "calories", "carbs_g", "fdc_id",
+         "meal_type", "serving_qty", "logged_at"],
+    ),
+    (
+        "weekly_meal_plans",
+        """SELECT p.week_start, p.plan_data,
+                  COALESCE(
+                      (SELECT json_agg(json_build_object('role', m.role, 'content', m.content) ORDER BY m.id)
+                       FROM weekly_plan_messages m
+                       WHERE m.user_id = p.user_id AND m.week_start = p.week_start),
+                      '[]'
+                  ) AS conversation_history,
+                  p.updated_at
+           FROM weekly_meal_plans p
+           WHERE p.user_id = $1
+           ORDER BY p.week_start""",
+        ["week_start", "plan_data", "conversation_history", "updated_at"],
+    ),
+    (
+        "groups",
+        """SELECT g.id, g.name, g.invite_code, g.created_by, gm.joined_at
+           FROM group_members gm
+           JOIN groups g ON g.id = gm.group_id
+           WHERE gm.user_id = $1
+           ORDER BY gm.joined_at""",
+        ["id", "name", "invite_code", "created_by", "joined_at"],
+    ),
+]
+
+_export_limiter: asyncio.Semaphore | None = None
+
+
+def export_limiter() -> asyncio.Semaphore:
+    """Caps concurrent exports; created lazily so it binds to the running loop."""
+    global _export_limiter
+    if _export_limiter is None:
+        _export_limiter = asyncio.Semaphore(get_settings().export_concurrency)
+    return _export_limiter
+
+
+@asynccontextmanager
+async def _export_connection():
+    """
+    A dedicated primary connection for one export, outside the pool.
+
+    An export keeps its snapshot open for as long as the client takes to
+    download it, so it must not tie up a pooled connection. The timeouts
+    end the session if the client stops reading or a batch stalls, rather
+    than leaving a transaction holding back vacuum.
+    """
+    timeout_ms = int(get_settings().export_idle_timeout_s * 1000)
+    async with export_limiter():
+        conn = await database.connect_dedicated()
+        try:
+            await database.register_json_codecs(conn)
+            await conn.execute(f"SET idle_in_transaction_session_timeout = {timeout_ms}")
+            await conn.execute(f"SET statement_timeout = {timeout_ms}")
+            yield conn
+        finally:
+            await conn.close()
+
+
+PROFILE_EXCLUDED_FIELDS = {"google_id"}
+JSON_COLUMNS = {"plan_data", "conversation_history"}
+
+
+def _to_jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _row_to_export_dict(row) -> dict:
+    # json/jsonb columns arrive decoded (see database.register_json_codecs)
+    return {k: _to_jsonable(v) for k, v in dict(row).items()}
+
+
+async def _fetch_profile(conn, user_id: int) -> dict:
+    row = await conn.fetchrow("SELECT * FROM users WHERE id = $1", user_id)
+    return {
+        k: _to_jsonable(v)
+        for k, v in dict(row).items()
+        if k not in PROFILE_EXCLUDED_FIELDS
+    }
+
+
+async def stream_ndjson(user_id: int):
+    """
+    Yield the user's full account as NDJSON, one record per line.
+
+    The first line is the profile; every following line is
+    {"type": <section>, "data": {...}}. The connection is opened here
+    rather than through get_db, because dependency cleanup runs before a
+    StreamingResponse body is sent.
+    """
+    async with _export_connection() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            profile = await _fetch_profile(conn, user_id)
+            yield (json.dumps({"type": "user", "data": profile}) + "\n").encode()
+
+            for section, query, _columns in EXPORT_SECTIONS:
+                async for row in conn.cursor(query, user_id, prefetch=CURSOR_PREFETCH):
+                    line = json.dumps({"type": section, "data": _row_to_export_dict(row)})
+                    yield (line + "\n").encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target for ZipFile that hands written bytes back out."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _csv_cell(column: str, value):
+    if column in JSON_COLUMNS and not isinstance(value, str) and value is not None:
+        return json.dumps(value)
+    return _to_jsonable(value)
+
+
+async def stream_csv_zip(user_id: int):
+    """
+    Yield the user's full account as a zip of CSV files, one per section.
+
+    ZipFile falls back to data descriptors when its target can't seek, so
+    each archive member is compressed and sent while its rows are still
+    being read from the cursor.
+    """
+    sink = _ChunkSink()
+    async with _export_connection() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+                profile = await _fetch_profile(conn, user_id)
+                text = io.StringIO()
+                writer = csv.writer(text)
+                writer.writerow(profile.keys())
+                writer.writerow(profile.values())
+                zf.writestr("user.csv", text.getvalue())
+                yield sink.drain()
+
+                for section, query, columns in EXPORT_SECTIONS:
+                    with zf.open(f"{section}.csv", mode="w", force_zip64=True) as member:
+                        text = io.StringIO()
+                        writer = csv.writer(text)
+                        writer.writerow(columns)
+                        batch = 0
+                        async for row in conn.cursor(query, user_id, prefetch=CURSOR_PREFETCH):
+                            writer.writerow(_csv_cell(c, row[c]) for c in columns)
+                            batch += 1
+                            if batch >= CURSOR_PREFETCH:
+                                member.write(text.getvalue().encode())
+                                text.seek(0)
+                                text.truncate()
+                                batch = 0
+                                chunk = sink.drain()
+                                if chunk:
+                                    yield chunk
+                        member.write(text.getvalue().encode())
+                    yield sink.drain()
+            # Closing the archive writes the central directory.
+            yield sink.drain()
@@ -1,9 +1,62 @@
 import google.generativeai as genai
 from config import get_settings
 import PIL.Image
+import asyncio
 import io
 import json
-from collections import defaultdict
+import time
+from types import SimpleNamespace
+
+import httpx
+
+import metrics
+from circuit import CircuitBreaker, CircuitOpen
+
+# Whole-call deadline per operation, hedged attempts included
+OPERATION_TIMEOUTS = {
+    "detect_food": 20.0,
+    "meal_plan": 25.0,
+    "dish_ingredients": 30.0,
+    "weekly_meal_plan": 60.0,
+    "refine_weekly_plan": 60.0,
+}
+# Idempotent and short enough that a second attempt is worth the tokens
+HEDGED_OPERATIONS = {"detect_food", "meal_plan", "dish_ingredients"}
+QUOTA_RETRY_AFTER = 30
+TIMEOUT_RETRY_AFTER = 5
+# Longest image side sent for detection; phone photos are several times this
+MAX_IMAGE_SIDE = 1536
+
+
+class GeminiUnavailable(Exception):
+    """Gemini can't serve this now (breaker open, deadline passed, or quota); retry later."""
+
+    def __init__(self, message: str, retry_after: int, quota: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.quota = quota
+
+
+_breaker: CircuitBreaker | None = None
+
+
+def breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        settings = get_settings()
+        _breaker = CircuitBreaker(
+            "gemini",
+            error_rate=settings.gemini_breaker_error_rate,
+            min_calls=settings.gemini_breaker_min_calls,
+            window_seconds=settings.gemini_breaker_window_s,
+            open_seconds=settings.gemini_breaker_open_s,
+        )
+    return _breaker
+
+
+def _is_quota_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return "429" in msg or "quota" in msg or "exhausted" in msg
 
 
 def configure_gemini():
@@ -12,7 +65,141 @@ def configure_gemini():
         genai.configure(api_key=settings.gemini_api_key)
 
 
+_stub_client: httpx.AsyncClient | None = None
+
+
+async def _generate_via_stub(url: str, operation: str, contents):
+    """
+    POST the prompt to a Gemini stand-in (GEMINI_STUB_URL, see bench/) and
+    return a response shaped like the SDK's: .text and .usage_metadata.
+    """
+    global _stub_client
+    if _stub_client is None:
+        _stub_client = httpx.AsyncClient(timeout=120)
+    parts = contents if isinstance(contents, list) else [contents]
+    prompt = "\n".join(p if isinstance(p, str) else f"[image {p.size[0]}x{p.size[1]}]" for p in parts)
+    resp = await _stub_client.post(f"{url.rstrip('/')}/{operation}", json={"prompt": prompt})
+    if resp.status_code != 200:
+        raise RuntimeError(f"{resp.status_code} {resp.text}")
+    body = resp.json()
+    return SimpleNamespace(
+        text=body["text"],
+        usage_metadata=SimpleNamespace(**body.get("usage", {})),
+    )
+
+
+async def _attempt(operation: str, model, contents):
+    """One model.generate_content_async call, timed and token-counted into metrics."""
+    stub_url = get_settings().gemini_stub_url
+    start = time.perf_counter()
+    try:
+        if stub_url:
+            response = await _generate_via_stub(stub_url, operation, contents)
+        else:
+            response = await model.generate_content_async(contents)
+    except Exception:
+        metrics.record_gemini(operation, time.perf_counter() - start, "error")
+        raise
+    metrics.record_gemini(
+        operation, time.perf_counter() - start, "ok", getattr(response, "usage_metadata", None),
+    )
+    return response
+
+
+async def _hedged(operation: str, model, contents, hedge_after: float):
+    """
+    Start a second identical attempt if the first hasn't answered within
+    `hedge_after` seconds; return whichever succeeds first. If one attempt
+    fails, keep waiting on the other.
+    """
+    pending = {asyncio.create_task(_attempt(operation, model, contents))}
+    error = None
+    try:
+        # Cancellation (the caller's deadline) can land in either wait; the
+        # finally cancels whatever attempts are still running
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        if done:
+            return done.pop().result()
+        metrics.GEMINI_HEDGES.inc(operation)
+        pending.add(asyncio.create_task(_attempt(operation, model, contents)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _generate(operation: str, model, contents, deadline: float | None = None):
+    """
+    Call Gemini under the circuit breaker and the operation's deadline, or
+    the caller's `deadline` (seconds) if that is shorter.
+
+    Raises GeminiUnavailable when the breaker is open, the deadline passes,
+    or Gemini reports a quota error; other errors propagate unchanged. Every
+    failure counts against the breaker.
+    """
+    gemini = breaker()
+    try:
+        gemini.before_call()
+    except CircuitOpen as e:
+        metrics.record_gemini(operation, 0.0, "rejected")
+        raise GeminiUnavailable(str(e), retry_after=gemini.retry_after()) from e
+
+    timeout = OPERATION_TIMEOUTS.get(operation, 60.0)
+    if deadline is not None:
+        timeout = min(timeout, deadline)
+    hedge_after = get_settings().gemini_hedge_after_s
+    try:
+        if hedge_after and operation in HEDGED_OPERATIONS:
+            call = _hedged(operation, model, contents, hedge_after)
+        else:
+            call = _attempt(operation, model, contents)
+        response = await asyncio.wait_for(call, timeout=timeout)
+    except asyncio.TimeoutError as e:
+        gemini.record(False)
+        metrics.record_gemini(operation, timeout, "timeout")
+        raise GeminiUnavailable(f"Gemini {operation} timed out after {timeout:g}s", retry_after=TIMEOUT_RETRY_AFTER) from e
+    except Exception as e:
+        gemini.record(False)
+        if _is_quota_error(e):
+            raise GeminiUnavailable(str(e), retry_after=QUOTA_RETRY_AFTER, quota=True) from e
+        raise
+    gemini.record(True)
+    return response
+
+
+_detect_limiter: asyncio.Semaphore | None = None
+
+
+def detect_limiter() -> asyncio.Semaphore:
+    """Caps concurrent image detections per process, single and batch alike."""
+    global _detect_limiter
+    if _detect_limiter is None:
+        _detect_limiter = asyncio.Semaphore(get_settings().gemini_detect_concurrency)
+    return _detect_limiter
+
+
+def prepare_image(image_bytes: bytes) -> PIL.Image.Image:
+    """
+    Decode an upload and shrink it to MAX_IMAGE_SIDE. CPU-bound, so callers
+    run it with asyncio.to_thread; JPEGs are decoded at reduced scale.
+    """
+    img = PIL.Image.open(io.BytesIO(image_bytes))
+    img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    return img
+
+
 async def detect_food_from_image(image_bytes: bytes) -> dict:
+    """Decode the image off the event loop, then detect_food_in_image."""
+    return await detect_food_in_image(await asyncio.to_thread(prepare_image, image_bytes))
+
+
+async def detect_food_in_image(img: PIL.Image.Image) -> dict:
     """
     Analyzes food image using Gemini Vision and returns nutrition estimate.
 
@@ -50,8 +237,8 @@ async def detect_food_from_image(image_bytes: bytes) -> dict:
     - Return ONLY the JSON, no other text
     """
 
-    img = PIL.Image.open(io.BytesIO(image_bytes))
-    response = await model.generate_content_async([prompt, img])
+    async with detect_limiter():
+        response = await _generate("detect_food", model, [prompt, img])
 
     # Parse JSON from response - handle markdown code blocks
     response_text = response.text.strip()
@@ -81,59 +268,48 @@ async def detect_food_from_image(image_bytes: bytes) -> dict:
     return result
 
 
-async def generate_meal_plan(user: dict, today_entries: list, history_entries: list = []) -> dict:
+async def generate_meal_plan(user: dict, context: dict, deadline: float | None = None) -> dict:
     """
     Generates a personalized meal plan using Gemini based on user profile and
     what they've already eaten today.
+
+    context: nutrition_context.build() output (today's entries, recent
+    averages, top foods, shortfalls). deadline: optional cap in seconds
+    below the operation's own (see _generate).
     """
     configure_gemini()
     model = genai.GenerativeModel('models/gemini-2.5-flash')
 
-    # Determine which meal slots have already been logged today
-    logged_meal_types = {e['meal_type'] for e in today_entries}
-    all_meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
-    remaining_meals = [m for m in all_meal_types if m not in logged_meal_types]
-
-    # Compute totals consumed
-    total_protein = sum(e.get('protein_g', 0) for e in today_entries)
-    total_calories = sum(e.get('calories', 0) for e in today_entries)
-    total_carbs = sum(e.get('carbs_g', 0) for e in today_entries)
-
     protein_goal = user.get('protein_goal', 150)
     calorie_goal = user.get('calorie_goal', 2000)
     carb_goal = user.get('carb_goal', 200)
-
-    remaining_protein = max(0, protein_goal - total_protein)
-    remaining_cal = max(0, calorie_goal - total_calories)
-    remaining_carbs = max(0, carb_goal - total_carbs)
+    eaten = context['eaten']
+    remaining = context['remaining']
+    remaining_meals = context['remaining_slots']
 
     dietary_preference = user.get('dietary_preference', 'non_vegetarian')
     food_dislikes = user.get('food_dislikes') or 'None'
 
-    # Build 7-day history summary
-    day_totals = defaultdict(lambda: {'protein': 0, 'calories': 0, 'carbs': 0})
-    food_freq = defaultdict(int)
-    for e in history_entries:
-        day = str(e['log_date'])
-        day_totals[day]['protein'] += e.get('protein_g', 0)
-        day_totals[day]['calories'] += e.get('calories', 0)
-        day_totals[day]['carbs'] += e.get('carbs_g', 0)
-        food_freq[e['food_name']] += 1
-
-    history_lines = [
-        f"  {day}: {v['protein']:.0f}g P | {v['calories']:.0f} cal | {v['carbs']:.0f}g C"
-        for day, v in sorted(day_totals.items())
-    ]
-    top_foods = sorted(food_freq.items(), key=lambda x: -x[1])[:5]
-    top_foods_str = ', '.join(f"{name} (x{cnt})" for name, cnt in top_foods) or 'None'
-    history_section = '\n'.join(history_lines) if history_lines else '  No history yet'
+    shortfalls = context['shortfalls']
+    if shortfalls:
+        avg = shortfalls['avg']
+        history_section = (
+            f"  {shortfalls['days_logged']} days logged, {shortfalls['days_on_target']} on target; "
+            f"protein short on {shortfalls['protein_short_days']}\n"
+            f"  Daily average: {avg['protein']}g P | {avg['calories']} cal | {avg['carbs']}g C"
+        )
+    else:
+        history_section = '  No history yet'
+    top_foods_str = ', '.join(
+        f"{f['food_name']} (x{f['times']})" for f in context['top_foods'][:5]
+    ) or 'None'
 
     # Build list of logged entries for context
-    if today_entries:
+    if context['today']:
         entries_text = '\n'.join(
-            f"  - {e['food_name']} ({e.get('meal_type', 'snack')}): "
-            f"{e.get('protein_g', 0):.1f}g protein | {e.get('calories', 0):.0f} cal | {e.get('carbs_g', 0):.1f}g carbs"
-            for e in today_entries
+            f"  - {e['food_name']} ({e['meal_type']}): "
+            f"{e['protein_g']:.0f}g P | {e['calories']:.0f} cal | {e['carbs_g']:.0f}g C"
+            for e in context['today']
         )
     else:
         entries_text = '  (Nothing logged yet today)'
@@ -147,7 +323,7 @@ USER PROFILE:
 - Food dislikes/allergies: {food_dislikes}
 - Daily targets: {protein_goal}g protein | {calorie_goal} calories | {carb_goal}g carbs
 
-RECENT EATING HISTORY (last 7 days):
+LAST 7 DAYS:
 {history_section}
 Most frequent foods: {top_foods_str}
 Use this to:
@@ -157,8 +333,8 @@ Use this to:
 
 ALREADY CONSUMED TODAY:
 {entries_text}
-- Total consumed: {total_protein:.1f}g protein | {total_calories:.0f} cal | {total_carbs:.1f}g carbs
-- Remaining budget: {remaining_protein:.1f}g protein | {remaining_cal:.0f} cal | {remaining_carbs:.1f}g carbs
+- Total consumed: {eaten['protein']:.0f}g protein | {eaten['calories']:.0f} cal | {eaten['carbs']:.0f}g carbs
+- Remaining budget: {remaining['protein']:.0f}g protein | {remaining['calories']:.0f} cal | {remaining['carbs']:.0f}g carbs
 
 INSTRUCTIONS:
 - Suggest meals ONLY for remaining/upcoming meal slots: {remaining_meals_str}
@@ -201,7 +377,7 @@ Return ONLY a JSON object with this exact structure:
   "nutritionist_note": "..."
 }}"""
 
-    response = await model.generate_content_async(prompt)
+    response = await _generate("meal_plan", model, prompt, deadline)
     response_text = response.text.strip()
 
     # Remove markdown code blocks if present
@@ -312,60 +488,50 @@ Return ONLY a JSON object with this exact structure:
   ]
 }}"""
 
-    response = await model.generate_content_async(prompt)
+    response = await _generate("weekly_meal_plan", model, prompt)
     result = _parse_json_response(response.text)
     return result.get('plan', [])
 
 
-async def generate_grocery_list(plan_dicts: list, week_start: str) -> dict:
+async def decompose_dishes(dish_names: list) -> list:
     """
-    Generates a categorized grocery list from a 7-day meal plan.
+    Breaks dishes down into raw ingredients for one serving each.
 
-    Returns dict with:
-    - categories: list of {category, items: [{name, quantity, notes}]}
+    Returns a list of {dish, ingredients: [{name, category, amount, unit}]},
+    with unit one of g, ml or count. Used by grocery.py for dishes its
+    knowledge base doesn't know yet.
     """
     configure_gemini()
     model = genai.GenerativeModel('models/gemini-2.5-flash')
 
-    # Flatten all meals and items into a readable list
-    meals_lines = []
-    for day in plan_dicts:
-        day_name = day.get('day', '')
-        for meal in day.get('meal_plan', []):
-            meal_type = meal.get('meal_type', '')
-            for item in meal.get('items', []):
-                food = item.get('food', '')
-                qty = item.get('quantity', '')
-                meals_lines.append(f"  {day_name} {meal_type}: {food} ({qty})")
-    meals_str = '\n'.join(meals_lines)
+    dishes_str = '\n'.join(f"  - {name}" for name in dish_names)
 
-    prompt = f"""You are a meal prep assistant. Given a 7-day meal plan, extract all raw ingredients needed and create a grocery shopping list.
+    prompt = f"""You are a meal prep assistant. Break each dish below into the raw ingredients needed for ONE serving.
 
-7-DAY MEAL PLAN:
-{meals_str}
+DISHES:
+{dishes_str}
 
 INSTRUCTIONS:
-- Decompose each dish into its raw ingredients (e.g. "Scrambled Eggs on Toast" → eggs, bread, butter, salt)
-- Aggregate the same ingredient across all days (e.g. if eggs appear 5 times, combine into one entry)
-- Categorize ingredients into exactly these categories: Produce, Protein & Meat, Dairy & Eggs, Grains & Bread, Pantry & Spices, Other
-- For quantity, give an aggregated estimate (e.g. "12 eggs", "500g chicken breast", "1 loaf")
-- Use notes for any helpful prep hints (optional, keep brief)
-- Do NOT list dish names — only raw ingredients
+- List raw ingredients only (e.g. "Scrambled Eggs on Toast" → Eggs, Bread, Butter)
+- Give each ingredient an amount for one serving in exactly one unit: "g", "ml" or "count"
+- Use "count" for items bought whole (eggs, bread slices, bananas, tortillas)
+- Categorize each ingredient into exactly one of: Produce, Protein & Meat, Dairy & Eggs, Grains & Bread, Pantry & Spices, Other
+- Use the dish name exactly as given
 - Return ONLY a JSON object with this exact structure:
 {{
-  "categories": [
+  "dishes": [
     {{
-      "category": "Produce",
-      "items": [
-        {{"name": "Spinach", "quantity": "200g", "notes": "fresh"}},
-        {{"name": "Tomatoes", "quantity": "6 medium"}}
+      "dish": "Scrambled Eggs on Toast",
+      "ingredients": [
+        {{"name": "Eggs", "category": "Dairy & Eggs", "amount": 3, "unit": "count"}},
+        {{"name": "Butter", "category": "Dairy & Eggs", "amount": 10, "unit": "g"}}
       ]
     }}
   ]
 }}"""
 
-    response = await model.generate_content_async(prompt)
-    return _parse_json_response(response.text)
+    response = await _generate("dish_ingredients", model, prompt)
+    return _parse_json_response(response.text).get('dishes', [])
 
 
 async def refine_weekly_meal_plan(
@@ -428,7 +594,7 @@ Return ONLY a JSON object:
   "assistant_message": "..."
 }}"""
 
-    response = await model.generate_content_async(prompt)
+    response = await _generate("refine_weekly_plan", model, prompt)
     result = _parse_json_response(response.text)
     return {
         'plan': result.get('plan', current_plan),
@@ -0,0 +1,168 @@
+"""
+Grocery lists built locally from a dish -> ingredient knowledge base.
+
+Every meal item in the plan is matched to a dish in dish_ingredients (one
+serving's worth of ingredients), scaled by the item's quantity, and summed
+per ingredient in g, ml or count. Dishes the table doesn't know are sent to
+Gemini in one batch, and the answer is stored for next time. If that call
+fails, the unknown dishes are listed under "Other" as they are.
+"""
+import math
+import re
+from collections import defaultdict
+
+from gemini_client import decompose_dishes
+
+CATEGORIES = ["Produce", "Protein & Meat", "Dairy & Eggs", "Grains & Bread", "Pantry & Spices", "Other"]
+UNITS = ("g", "ml", "count")
+
+# Quantity words that convert to g or ml; anything else counts servings
+MASS_UNITS = {
+    "g": ("g", 1), "gm": ("g", 1), "gram": ("g", 1), "grams": ("g", 1),
+    "kg": ("g", 1000), "oz": ("g", 28.35), "lb": ("g", 453.6), "lbs": ("g", 453.6),
+    "tbsp": ("g", 15), "tsp": ("g", 5),
+    "ml": ("ml", 1), "l": ("ml", 1000), "liter": ("ml", 1000), "litre": ("ml", 1000),
+}
+QUANTITY_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)(?:\s*/\s*(\d+))?\s*([a-zA-Z]+)?")
+
+# dish_key -> [(ingredient, category, amount, unit)]; filled lazily from the table
+_kb: dict[str, list[tuple]] = {}
+
+KB_SQL = "SELECT dish_key, ingredient, category, amount, unit FROM dish_ingredients"
+
+LEARN_SQL = """
+    INSERT INTO dish_ingredients (dish_key, ingredient, category, amount, unit, source)
+    VALUES ($1, $2, $3, $4, $5, 'gemini')
+    ON CONFLICT (dish_key, ingredient) DO NOTHING
+"""
+
+
+def dish_key(name: str) -> str:
+    """'Chicken Breast (100g)' -> 'chicken breast'."""
+    name = re.sub(r"\(.*?\)", " ", name.lower())
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", name).split())
+
+
+def parse_quantity(quantity: str) -> tuple[float, str | None]:
+    """'200g' -> (200, 'g'); '1.5 L' -> (1500, 'ml'); '2 bowls' or '' -> (servings, None)."""
+    m = QUANTITY_RE.match(quantity or "")
+    if not m:
+        return 1.0, None
+    value = float(m.group(1)) / (float(m.group(2)) if m.group(2) else 1)
+    unit = MASS_UNITS.get((m.group(3) or "").lower())
+    if unit is None:
+        return value or 1.0, None
+    return value * unit[1], unit[0]
+
+
+def _servings(recipe: list[tuple], amount: float, unit: str | None) -> float:
+    """How many KB servings an item is. Weights are compared to the recipe's total weight."""
+    if unit is None:
+        return amount
+    recipe_total = sum(a for _, _, a, u in recipe if u != "count")
+    return amount / recipe_total if recipe_total else 1.0
+
+
+def format_amount(amount: float, unit: str) -> str:
+    if unit == "count":
+        return str(max(1, math.ceil(round(amount, 2))))
+    big, factor = ("kg", 1000) if unit == "g" else ("L", 1000)
+    if amount >= factor:
+        return f"{round(amount / factor, 1):g} {big}"
+    step = 10 if amount >= 100 else 5
+    return f"{max(step, round(amount / step) * step)}{unit}"
+
+
+async def _load(db, keys: set[str]):
+    """Fill _kb from the table: everything on first use, then just `keys` (another worker may have learned them)."""
+    if _kb:
+        rows = await db.fetch(KB_SQL + " WHERE dish_key = ANY($1)", list(keys))
+    else:
+        rows = await db.fetch(KB_SQL)
+    loaded = defaultdict(list)
+    for r in rows:
+        loaded[r["dish_key"]].append((r["ingredient"], r["category"], r["amount"], r["unit"]))
+    _kb.update(loaded)
+
+
+async def _learn(db, names_by_key: dict[str, str]):
+    """Ask Gemini for the unknown dishes and store the answers."""
+    try:
+        dishes = await decompose_dishes(sorted(set(names_by_key.values())))
+    except Exception as e:
+        print(f"[grocery] Gemini error while decomposing {len(names_by_key)} dishes: {e}")
+        return
+
+    rows = []
+    for dish in dishes:
+        key = dish_key(dish.get("dish", ""))
+        if key not in names_by_key:
+            continue
+        seen = set()
+        for ing in dish.get("ingredients", []):
+            name = str(ing.get("name", "")).strip().capitalize()
+            unit = ing.get("unit")
+            try:
+                amount = float(ing.get("amount", 0))
+            except (TypeError, ValueError):
+                continue
+            if not name or name in seen or unit not in UNITS or amount <= 0:
+                continue
+            category = ing.get("category") if ing.get("category") in CATEGORIES else "Other"
+            seen.add(name)
+            rows.append((key, name, category, amount, unit))
+    if not rows:
+        return
+    await db.executemany(LEARN_SQL, rows)
+    learned = defaultdict(list)
+    for key, name, category, amount, unit in rows:
+        learned[key].append((name, category, amount, unit))
+    _kb.update(learned)
+
+
+async def build_list(db, plan_days: list[dict]) -> list[dict]:
+    """GroceryListResponse categories for a 7-day plan."""
+    items = [
+        (item.get("food", ""), item.get("quantity", ""))
+        for day in plan_days
+        for meal in day.get("meal_plan", [])
+        for item in meal.get("items", [])
+        if item.get("food")
+    ]
+    names_by_key = {dish_key(food): food for food, _ in items}
+    names_by_key.pop("", None)
+
+    missing = {k: n for k, n in names_by_key.items() if k not in _kb}
+    if missing:
+        await _load(db, set(missing))
+        missing = {k: n for k, n in missing.items() if k not in _kb}
+    if missing:
+        await _learn(db, missing)
+
+    # (ingredient, unit) -> [category, amount]; unknown dishes -> serving count
+    totals: dict[tuple, list] = {}
+    unknown: dict[str, float] = defaultdict(float)
+    for food, quantity in items:
+        key = dish_key(food)
+        recipe = _kb.get(key)
+        amount, unit = parse_quantity(quantity)
+        if not recipe:
+            unknown[names_by_key.get(key, food)] += amount if unit is None else 1
+            continue
+        servings = _servings(recipe, amount, unit)
+        for ingredient, category, per_serving, ing_unit in recipe:
+            total = totals.setdefault((ingredient, ing_unit), [category, 0.0])
+            total[1] += per_serving * servings
+
+    by_category: dict[str, list] = {c: [] for c in CATEGORIES}
+    for (ingredient, unit), (category, amount) in sorted(totals.items()):
+        by_category.get(category, by_category["Other"]).append(
+            {"name": ingredient, "quantity": format_amount(amount, unit)}
+        )
+    for food, servings in sorted(unknown.items()):
+        by_category["Other"].append({
+            "name": food,
+            "quantity": f"{servings:g} serving{'s' if servings != 1 else ''}",
+            "notes": "ingredients not broken down",
+        })
+    return [{"category": c, "items": by_category[c]} for c in CATEGORIES if by_category[c]]
@@ -0,0 +1,257 @@
+"""
+Precomputed group leaderboards.
+
+Scores live in leaderboard_scores, one row per (group, period, day, member),
+and are kept current by log_food/delete_entry applying the entry's protein
+delta to every materialized board it falls into. Boards are materialized on
+first read from food_entries, then served from an in-process cache that is
+refreshed from Postgres after BOARD_TTL_SECONDS so other workers' writes
+show up.
+
+Materialization and delta application coordinate through a per-group
+advisory lock (exclusive for materialization, shared for deltas), so a
+delta can't slip in between a board's snapshot of food_entries and its
+insert.
+"""
+import time
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+import database
+
+PERIODS = ("daily", "weekly")
+BOARD_TTL_SECONDS = 5.0
+MAX_CACHED_GROUPS = 2000
+# Boards bigger than this are never pulled into memory; pages and ranks are
+# answered by index range scans over idx_leaderboard_scores_rank instead.
+LARGE_BOARD_MEMBERS = 2000
+LOCK_CLASS = 0x4C42  # first key of the two-int advisory lock, "LB"
+
+
+def period_start(period: str, day: date) -> date:
+    return day - timedelta(days=6) if period == "weekly" else day
+
+
+class Board:
+    """Members ordered by score, with O(log n) rank lookups via bisect."""
+
+    def __init__(self, scores: dict[int, float]):
+        self.scores = dict(scores)
+        self.order = sorted((-score, uid) for uid, score in self.scores.items())
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, user_id: int):
+        return user_id in self.scores
+
+    def add(self, user_id: int, delta: float):
+        old = self.scores.get(user_id)
+        if old is None:
+            return
+        del self.order[bisect_left(self.order, (-old, user_id))]
+        new = old + delta
+        self.scores[user_id] = new
+        insort(self.order, (-new, user_id))
+
+    def rank(self, user_id: int) -> int | None:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self.order, (-score, user_id)) + 1
+
+    def page(self, offset: int, limit: int | None) -> list[tuple[int, float, int]]:
+        """[(user_id, score, rank)] for the requested slice."""
+        end = len(self.order) if limit is None else offset + limit
+        return [
+            (uid, -neg_score, offset + i + 1)
+            for i, (neg_score, uid) in enumerate(self.order[offset:end])
+        ]
+
+    def around(self, user_id: int, window: int) -> list[tuple[int, float, int]]:
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - window, 0)
+        return self.page(start, rank - start + window)
+
+
+# group_id -> {(period, day): Board}
+_cache: dict[int, dict[tuple[str, date], Board]] = {}
+
+
+def _cache_board(group_id: int, period: str, day: date, board: Board):
+    if group_id not in _cache and len(_cache) >= MAX_CACHED_GROUPS:
+        _cache.pop(next(iter(_cache)))
+    _cache.setdefault(group_id, {})[(period, day)] = board
+
+
+def evict_group(group_id: int):
+    _cache.pop(group_id, None)
+
+
+async def _load_scores(db, group_id: int, period: str, day: date) -> dict[int, float]:
+    rows = await db.fetch(
+        """SELECT user_id, score FROM leaderboard_scores
+           WHERE group_id = $1 AND period = $2 AND period_day = $3""",
+        group_id, period, day,
+    )
+    return {r["user_id"]: r["score"] for r in rows}
+
+
+async def _materialize(conn, group_id: int, period: str, day: date) -> dict[int, float]:
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1, $2)", LOCK_CLASS, group_id)
+        scores = await _load_scores(conn, group_id, period, day)
+        if scores:
+            return scores
+        rows = await conn.fetch(
+            """INSERT INTO leaderboard_scores (group_id, period, period_day, user_id, score)
+               SELECT $1, $2, $3, gm.user_id, COALESCE(SUM(fe.protein_g), 0)
+               FROM group_members gm
+               LEFT JOIN food_entries fe
+                 ON fe.user_id = gm.user_id
+                AND fe.logged_at >= $4::date AND fe.logged_at < $3::date + 1
+               WHERE gm.group_id = $1
+               GROUP BY gm.user_id
+               RETURNING user_id, score""",
+            group_id, period, day, period_start(period, day),
+        )
+        return {r["user_id"]: r["score"] for r in rows}
+
+
+async def get_board(db, group_id: int, period: str, day: date) -> Board | None:
+    """
+    Cached board, reloaded from `db` (may be a replica) once stale.
+
+    Returns None for boards over LARGE_BOARD_MEMBERS; use the sql_* helpers
+    for those.
+    """
+    board = _cache.get(group_id, {}).get((period, day))
+    if board is not None and time.monotonic() - board.loaded_at < BOARD_TTL_SECONDS:
+        return board
+
+    size = await db.fetchval(
+        """SELECT COUNT(*) FROM (
+               SELECT 1 FROM leaderboard_scores
+               WHERE group_id = $1 AND period = $2 AND period_day = $3
+               LIMIT $4
+           ) s""",
+        group_id, period, day, LARGE_BOARD_MEMBERS + 1,
+    )
+    if size > LARGE_BOARD_MEMBERS:
+        return None
+
+    scores = await _load_scores(db, group_id, period, day) if size else {}
+    if not scores:
+        async with database.acquire() as conn:
+            scores = await _materialize(conn, group_id, period, day)
+        if len(scores) > LARGE_BOARD_MEMBERS:
+            return None
+    board = Board(scores)
+    _cache_board(group_id, period, day, board)
+    return board
+
+
+async def sql_total(db, group_id: int, period: str, day: date) -> int:
+    return await db.fetchval(
+        "SELECT COUNT(*) FROM leaderboard_scores WHERE group_id = $1 AND period = $2 AND period_day = $3",
+        group_id, period, day,
+    )
+
+
+async def sql_page(db, group_id: int, period: str, day: date, offset: int, limit: int | None):
+    rows = await db.fetch(
+        """SELECT user_id, score,
+                  $4 + ROW_NUMBER() OVER (ORDER BY score DESC, user_id) AS rank
+           FROM (SELECT user_id, score FROM leaderboard_scores
+                 WHERE group_id = $1 AND period = $2 AND period_day = $3
+                 ORDER BY score DESC, user_id
+                 OFFSET $4 LIMIT $5) page
+           ORDER BY rank""",
+        group_id, period, day, offset, limit,
+    )
+    return [(r["user_id"], r["score"], r["rank"]) for r in rows]
+
+
+async def sql_my_rank(db, group_id: int, period: str, day: date, user_id: int):
+    """(score, rank) for one member, counted over the rank index; None if absent."""
+    row = await db.fetchrow(
+        """SELECT me.score,
+                  1 + (SELECT COUNT(*) FROM leaderboard_scores o
+                       WHERE o.group_id = $1 AND o.period = $2 AND o.period_day = $3
+                         AND (o.score > me.score OR (o.score = me.score AND o.user_id < me.user_id))
+                      ) AS rank
+           FROM leaderboard_scores me
+           WHERE me.group_id = $1 AND me.period = $2 AND me.period_day = $3 AND me.user_id = $4""",
+        group_id, period, day, user_id,
+    )
+    return (row["score"], row["rank"]) if row else None
+
+
+async def sql_around(db, group_id: int, period: str, day: date, user_id: int, window: int):
+    mine = await sql_my_rank(db, group_id, period, day, user_id)
+    if mine is None:
+        return []
+    rank = mine[1]
+    start = max(rank - 1 - window, 0)
+    return await sql_page(db, group_id, period, day, start, rank - start + window)
+
+
+async def apply_entry_delta(db, user_id: int, day: date, delta: float) -> list[int]:
+    """
+    Add `delta` protein on `day` to every materialized board of the user's
+    groups. Call inside the write's transaction; returns the group ids so
+    the caller can update the cache with apply_cached_delta after commit.
+    """
+    group_ids = await db.fetchval(
+        "SELECT COALESCE(array_agg(group_id ORDER BY group_id), '{}') FROM group_members WHERE user_id = $1",
+        user_id,
+    )
+    if not group_ids:
+        return []
+    await db.execute(
+        "SELECT pg_advisory_xact_lock_shared($1, g) FROM unnest($2::int[]) AS g",
+        LOCK_CLASS, group_ids,
+    )
+    await db.execute(
+        """UPDATE leaderboard_scores SET score = score + $4
+           WHERE group_id = ANY($1) AND user_id = $2
+             AND ((period = 'daily' AND period_day = $3)
+               OR (period = 'weekly' AND period_day BETWEEN $3 AND $3 + 6))""",
+        group_ids, user_id, day, delta,
+    )
+    return list(group_ids)
+
+
+def apply_cached_delta(group_ids: list[int], user_id: int, day: date, delta: float):
+    for group_id in group_ids:
+        for (period, board_day), board in _cache.get(group_id, {}).items():
+            if period_start(period, board_day) <= day <= board_day:
+                board.add(user_id, delta)
+
+
+async def add_member(db, group_id: int, user_id: int):
+    """Give a new member a row on every already-materialized board of the group."""
+    async with db.transaction():
+        await db.execute("SELECT pg_advisory_xact_lock($1, $2)", LOCK_CLASS, group_id)
+        await db.execute(
+            """INSERT INTO leaderboard_scores (group_id, period, period_day, user_id, score)
+               SELECT k.group_id, k.period, k.period_day, $2,
+                      COALESCE((SELECT SUM(fe.protein_g) FROM food_entries fe
+                                WHERE fe.user_id = $2
+                                  AND fe.logged_at >= CASE WHEN k.period = 'weekly'
+                                                           THEN k.period_day - 6
+                                                           ELSE k.period_day END
+                                  AND fe.logged_at < k.period_day + 1), 0)
+               FROM (SELECT DISTINCT group_id, period, period_day
+                     FROM leaderboard_scores WHERE group_id = $1) k
+               ON CONFLICT DO NOTHING""",
+            group_id, user_id,
+        )
+    evict_group(group_id)
+
+
+async def prune_before(db, cutoff: date) -> str:
+    return await db.execute("DELETE FROM leaderboard_scores WHERE period_day < $1", cutoff)
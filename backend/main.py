@@ -1,27 +1,35 @@
+import secrets
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 
 from config import get_settings
-from database import create_pool, close_pool, init_db
-from seed import seed_common_foods
+import metrics
+from database import LAST_WRITE_HEADER, ReadYourWritesMiddleware, create_pool, close_pool, init_db
 from scheduler import start_scheduler, stop_scheduler
+from realtime import hub
 from routers import auth_router, food_router, dashboard_router, group_router, admin_router
-from routers import notification_router
+from routers import notification_router, sync_router, home_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await create_pool()
     await init_db()
-    await seed_common_foods()
     start_scheduler()
+    await hub.start()
     yield
+    await hub.stop()
     stop_scheduler()
     await close_pool()
 
 
-app = FastAPI(title="Protein & Calorie Tracker", lifespan=lifespan)
+app = FastAPI(
+    title="Protein & Calorie Tracker",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 settings = get_settings()
 app.add_middleware(
@@ -30,7 +38,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(auth_router.router)
 app.include_router(food_router.router)
@@ -38,8 +49,21 @@ app.include_router(dashboard_router.router)
 app.include_router(group_router.router)
 app.include_router(admin_router.router)
 app.include_router(notification_router.router)
+app.include_router(sync_router.router)
+app.include_router(home_router.router)
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: str = Header(None)):
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
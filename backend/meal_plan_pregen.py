@@ -0,0 +1,126 @@
+"""
+Off-peak pre-generation of next-day meal plans.
+
+Meal-plan requests bunch up around mealtimes, which is also when Gemini
+quota runs out. When MEAL_PLAN_PREGEN_ENABLED is set, the scheduler calls
+run() once a night. For recently active users without a stored plan for
+the day, it builds the day's nutrition context, asks Gemini for a plan,
+and stores the plan with a fingerprint of its inputs: the prompt-relevant
+user fields and the context. /food/meal-plan serves a stored plan while
+the fingerprint still matches, which is usually until the user logs the
+day's first meal.
+
+A run makes at most `budget` Gemini calls, paced `interval` seconds apart.
+It stops early as soon as Gemini is unavailable (quota, open breaker or
+timeout), leaving the remaining capacity to daytime requests. A session
+advisory lock, held on a dedicated connection outside the pool, keeps it
+to one worker at a time. Pool connections are only taken around each
+query, never across a Gemini call or the pause between calls.
+"""
+import asyncio
+import hashlib
+from datetime import date, timedelta
+
+import orjson
+
+import database
+import metrics
+import nutrition_context
+from gemini_client import GeminiUnavailable, generate_meal_plan
+from models import MealPlanResponse
+
+LOCK_ID = 0x4D50  # "MP"
+ACTIVE_DAYS = 3
+# User columns generate_meal_plan reads; changing any of them invalidates stored plans
+USER_FIELDS = ("protein_goal", "calorie_goal", "carb_goal", "dietary_preference", "food_dislikes")
+
+# Most recently active first; users already holding a plan for the day are skipped
+CANDIDATES_SQL = """
+    SELECT u.* FROM users u
+    JOIN (
+        SELECT user_id, MAX(day) AS last_day FROM user_daily_totals
+        WHERE day >= $1 AND entries > 0
+        GROUP BY user_id
+    ) a ON a.user_id = u.id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM precomputed_meal_plans p WHERE p.user_id = u.id AND p.plan_date = $2
+    )
+    ORDER BY a.last_day DESC, u.id
+    LIMIT $3
+"""
+
+STORE_SQL = """
+    INSERT INTO precomputed_meal_plans (user_id, plan_date, fingerprint, plan, created_at)
+    VALUES ($1, $2, $3, $4::jsonb, NOW())
+    ON CONFLICT (user_id, plan_date)
+    DO UPDATE SET fingerprint = EXCLUDED.fingerprint, plan = EXCLUDED.plan, created_at = NOW()
+"""
+
+LOOKUP_SQL = "SELECT fingerprint, plan FROM precomputed_meal_plans WHERE user_id = $1 AND plan_date = $2"
+
+PRUNE_SQL = "DELETE FROM precomputed_meal_plans WHERE plan_date < $1"
+
+
+def fingerprint(user: dict, context: dict) -> bytes:
+    inputs = {
+        "user": {f: user.get(f) for f in USER_FIELDS},
+        "context": {k: context[k] for k in ("today", "days", "top_foods")},
+    }
+    return hashlib.sha256(orjson.dumps(inputs, option=orjson.OPT_SORT_KEYS)).digest()
+
+
+async def lookup(db, user: dict, day: date, context: dict) -> dict | None:
+    """The stored plan for `day`, if it was built from exactly this context."""
+    row = await db.fetchrow(LOOKUP_SQL, user["id"], day)
+    if row is None:
+        metrics.MEAL_PLAN_PRECOMPUTED.inc("none")
+        return None
+    if row["fingerprint"] != fingerprint(user, context):
+        metrics.MEAL_PLAN_PRECOMPUTED.inc("stale")
+        return None
+    metrics.MEAL_PLAN_PRECOMPUTED.inc("hit")
+    return row["plan"]
+
+
+async def run(day: date, budget: int, interval: float) -> dict | None:
+    """
+    Pre-generate plans for `day`. Returns counts by outcome, or None if
+    another worker is already running.
+    """
+    lock_conn = await database.connect_dedicated()
+    try:
+        if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_ID):
+            return None
+        # Closing the connection releases the lock
+        return await _run(day, budget, interval)
+    finally:
+        await lock_conn.close()
+
+
+async def _run(day: date, budget: int, interval: float) -> dict:
+    counts = {"generated": 0, "failed": 0, "stopped": None}
+    async with database.acquire() as db:
+        await db.execute(PRUNE_SQL, day - timedelta(days=1))
+        users = await db.fetch(CANDIDATES_SQL, day - timedelta(days=ACTIVE_DAYS), day, budget)
+    for i, row in enumerate(users):
+        if i:
+            await asyncio.sleep(interval)
+        user = dict(row)
+        async with database.acquire() as db:
+            context = await nutrition_context.build(db, user, day)
+        try:
+            plan = MealPlanResponse(**await generate_meal_plan(user, context)).model_dump()
+        except GeminiUnavailable as e:
+            metrics.MEAL_PLAN_PREGEN.inc("stopped")
+            counts["stopped"] = str(e)
+            break
+        except Exception as e:
+            metrics.MEAL_PLAN_PREGEN.inc("failed")
+            counts["failed"] += 1
+            print(f"[meal-plan-pregen] Gemini error for user {user['id']}: {e}")
+            continue
+        async with database.acquire() as db:
+            await db.execute(STORE_SQL, user["id"], day, fingerprint(user, context), plan)
+        metrics.MEAL_PLAN_PREGEN.inc("generated")
+        counts["generated"] += 1
+    return counts
@@ -0,0 +1,166 @@
+"""
+Saved weekly meal plans and their version history.
+
+weekly_meal_plans holds the current plan for each (user, week), plus its
+content hash and version number. Every save that changes the plan also
+appends a row to weekly_meal_plan_versions. That row holds only the days
+that differ from the previous version: {"length": n, "days": {index: day}}.
+Every SNAPSHOT_EVERY-th version stores all days, and so does the first, so
+rebuilding an old version replays a short chain. A save whose content hash
+matches the current plan writes nothing.
+
+Refine conversations are appended to weekly_plan_messages as they happen.
+"""
+import hashlib
+
+import orjson
+
+from changes import bump_change_version
+from models import WEEKLY_PLAN_SCHEMA_VERSION
+
+SNAPSHOT_EVERY = 10
+
+CURRENT_SQL = """
+    SELECT plan_version, content_hash FROM weekly_meal_plans
+    WHERE user_id = $1 AND week_start = $2
+"""
+
+CURRENT_FOR_UPDATE_SQL = """
+    SELECT plan_version, content_hash, plan_data FROM weekly_meal_plans
+    WHERE user_id = $1 AND week_start = $2
+    FOR UPDATE
+"""
+
+UPSERT_PLAN_SQL = """
+    INSERT INTO weekly_meal_plans
+        (user_id, week_start, plan_data, plan_schema_version, content_hash, plan_version,
+         updated_at, change_version)
+    VALUES ($1, $2, $3::jsonb, $4, $5, $6, NOW(), $7)
+    ON CONFLICT (user_id, week_start)
+    DO UPDATE SET plan_data = EXCLUDED.plan_data,
+                  plan_schema_version = EXCLUDED.plan_schema_version,
+                  content_hash = EXCLUDED.content_hash,
+                  plan_version = EXCLUDED.plan_version,
+                  updated_at = NOW(),
+                  change_version = EXCLUDED.change_version
+"""
+
+INSERT_VERSION_SQL = """
+    INSERT INTO weekly_meal_plan_versions
+        (user_id, week_start, version, base_version, content_hash, delta)
+    VALUES ($1, $2, $3, $4, $5, $6::jsonb)
+"""
+
+# The nearest full snapshot at or below $3, and every delta after it
+CHAIN_SQL = """
+    SELECT version, delta FROM weekly_meal_plan_versions
+    WHERE user_id = $1 AND week_start = $2 AND version <= $3
+      AND version >= (
+          SELECT MAX(version) FROM weekly_meal_plan_versions
+          WHERE user_id = $1 AND week_start = $2 AND version <= $3 AND base_version IS NULL
+      )
+    ORDER BY version
+"""
+
+LIST_VERSIONS_SQL = """
+    SELECT version, created_at,
+           ARRAY(SELECT d->>'day' FROM jsonb_each(delta->'days') AS e(k, d) ORDER BY k::int)
+               AS changed_days
+    FROM weekly_meal_plan_versions
+    WHERE user_id = $1 AND week_start = $2
+    ORDER BY version DESC
+    LIMIT $3
+"""
+
+APPEND_MESSAGES_SQL = """
+    INSERT INTO weekly_plan_messages (user_id, week_start, role, content)
+    SELECT $1, $2, m.role, m.content
+    FROM unnest($3::text[], $4::text[]) WITH ORDINALITY AS m(role, content, n)
+    ORDER BY m.n
+"""
+
+
+def encode_plan(days: list[dict]) -> bytes:
+    """Canonical JSON for a plan: key order doesn't survive a jsonb round trip, so sort it."""
+    return orjson.dumps(days, option=orjson.OPT_SORT_KEYS)
+
+
+def plan_hash(encoded: bytes) -> bytes:
+    return hashlib.sha256(encoded).digest()
+
+
+def full_delta(days: list[dict]) -> dict:
+    return {"length": len(days), "days": {str(i): day for i, day in enumerate(days)}}
+
+
+def diff_days(old: list[dict], new: list[dict]) -> dict:
+    return {
+        "length": len(new),
+        "days": {str(i): day for i, day in enumerate(new) if i >= len(old) or old[i] != day},
+    }
+
+
+def apply_delta(days: list, delta: dict) -> list:
+    days = (days + [None] * delta["length"])[:delta["length"]]
+    for i, day in delta["days"].items():
+        days[int(i)] = day
+    return days
+
+
+async def save(db, user_id: int, week_start, days: list[dict]) -> tuple[int, bool]:
+    """
+    Store `days` as the week's plan. Returns (current version, whether a
+    new version was written).
+
+    The unlocked hash check skips the common resave-without-changes case
+    before any write. Otherwise the user's change version is bumped first,
+    which serializes this user's writes, and the check is repeated under
+    the plan row lock.
+    """
+    encoded = encode_plan(days)
+    digest = plan_hash(encoded)
+    current = await db.fetchrow(CURRENT_SQL, user_id, week_start)
+    if current and current["content_hash"] == digest:
+        return current["plan_version"], False
+
+    async with db.transaction():
+        change_version = await bump_change_version(db, user_id)
+        current = await db.fetchrow(CURRENT_FOR_UPDATE_SQL, user_id, week_start)
+        if current and current["content_hash"] == digest:
+            return current["plan_version"], False
+
+        version = (current["plan_version"] if current else 0) + 1
+        if current is None or version % SNAPSHOT_EVERY == 1:
+            base_version, delta = None, full_delta(days)
+        else:
+            base_version, delta = current["plan_version"], diff_days(current["plan_data"], days)
+
+        await db.execute(
+            UPSERT_PLAN_SQL,
+            user_id, week_start, encoded, WEEKLY_PLAN_SCHEMA_VERSION, digest, version, change_version,
+        )
+        await db.execute(INSERT_VERSION_SQL, user_id, week_start, version, base_version, digest, delta)
+    return version, True
+
+
+async def plan_at(db, user_id: int, week_start, version: int) -> list[dict] | None:
+    rows = await db.fetch(CHAIN_SQL, user_id, week_start, version)
+    if not rows or rows[-1]["version"] != version:
+        return None
+    days: list = []
+    for r in rows:
+        days = apply_delta(days, r["delta"])
+    return days
+
+
+async def list_versions(db, user_id: int, week_start, limit: int) -> list:
+    return await db.fetch(LIST_VERSIONS_SQL, user_id, week_start, limit)
+
+
+async def append_messages(db, user_id: int, week_start, messages: list[tuple[str, str]]):
+    async with db.transaction():
+        await db.execute(
+            APPEND_MESSAGES_SQL, user_id, week_start,
+            [role for role, _ in messages], [content for _, content in messages],
+        )
+        await bump_change_version(db, user_id)
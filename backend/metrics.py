@@ -0,0 +1,239 @@
+"""
+In-process metrics exported in the Prometheus text format at /metrics.
+
+Deliberately tiny: label values are plain tuples in a dict, updates are a
+dict lookup and an add, and the exposition text is only built when
+scraped. Every metric is registered in REGISTRY at import time.
+"""
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+import database
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GEMINI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+REGISTRY: list = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    @abstractmethod
+    def samples(self):
+        """Exposition lines for every label set, without HELP/TYPE."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(_Metric):
+    """A settable gauge, or a callback gauge read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self.values: dict[tuple, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def samples(self):
+        values = self.collect() if self.collect else self.values
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            inf = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, inf)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+def render() -> str:
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Requests by route template and status", ("method", "route", "status"),
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task overhead). Routes are
+    labelled by their path template, read from the scope after routing, so
+    /groups/1 and /groups/2 share a series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_DURATION.observe(time.perf_counter() - start, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+
+
+# --- Database ---
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Duration of every asyncpg query")
+DB_STATEMENT_SECONDS = Counter(
+    "db_statement_seconds_total", "Time spent per statement", ("statement",),
+)
+DB_STATEMENT_CALLS = Counter("db_statement_calls_total", "Executions per statement", ("statement",))
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Queries that raised", ("statement",))
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "Queries over DB_SLOW_QUERY_MS", ("statement",))
+
+
+def _pool_gauges() -> dict:
+    snap = database.pool_stats.snapshot()
+    return {(k,): snap[k] for k in ("size", "in_use", "idle", "max_size", "replica_size", "replica_idle")}
+
+
+DB_POOL = Gauge("db_pool_connections", "Connection pool state", ("state",), collect=_pool_gauges)
+DB_ACQUIRE_WAIT = Gauge(
+    "db_pool_acquire_wait_max_seconds", "Longest wait for a pooled connection",
+    collect=lambda: {(): database.pool_stats.acquire_wait_max},
+)
+
+
+def record_query(statement: str, elapsed: float, failed: bool, slow: bool):
+    DB_QUERY_DURATION.observe(elapsed)
+    DB_STATEMENT_SECONDS.inc(statement, amount=elapsed)
+    DB_STATEMENT_CALLS.inc(statement)
+    if failed:
+        DB_QUERY_ERRORS.inc(statement)
+    if slow:
+        DB_SLOW_QUERIES.inc(statement)
+
+
+# --- Gemini ---
+GEMINI_DURATION = Histogram(
+    "gemini_request_duration_seconds", "Gemini call latency", ("operation", "outcome"),
+    buckets=GEMINI_BUCKETS,
+)
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total", "Tokens reported by Gemini usage metadata", ("operation", "kind"),
+)
+
+GEMINI_HEDGES = Counter(
+    "gemini_hedged_requests_total", "Second attempts launched for slow idempotent calls", ("operation",),
+)
+
+MEAL_PLAN_PREGEN = Counter(
+    "meal_plan_pregen_total", "Off-peak meal plan pre-generation by outcome", ("outcome",),
+)
+MEAL_PLAN_PRECOMPUTED = Counter(
+    "meal_plan_precomputed_lookups_total", "Stored plan lookups by /food/meal-plan (hit, stale, none)",
+    ("result",),
+)
+
+
+def record_gemini(operation: str, elapsed: float, outcome: str, usage=None):
+    GEMINI_DURATION.observe(elapsed, operation, outcome)
+    if usage is not None:
+        GEMINI_TOKENS.inc(operation, "prompt", amount=getattr(usage, "prompt_token_count", 0) or 0)
+        GEMINI_TOKENS.inc(operation, "output", amount=getattr(usage, "candidates_token_count", 0) or 0)
+
+
+# --- Circuit breakers ---
+BREAKER_STATE = Gauge(
+    "circuit_breaker_state", "0 closed, 1 half-open, 2 open", ("breaker",),
+)
+BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total", "State changes by new state", ("breaker", "state"),
+)
+BREAKER_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total", "Calls failed fast while open", ("breaker",),
+)
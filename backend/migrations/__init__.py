@@ -0,0 +1,9 @@
+"""
+Numbered schema migrations.
+
+Each module is named v<NNN>_<description>.py and defines
+`async def upgrade(conn)`. Migrations run in their own transaction unless
+the module sets `TRANSACTIONAL = False` (needed for CREATE INDEX
+CONCURRENTLY or batched online rewrites); those must be idempotent so an
+interrupted run can simply be retried.
+"""
@@ -0,0 +1,62 @@
+"""Base tables."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            google_id VARCHAR UNIQUE NOT NULL,
+            email VARCHAR UNIQUE NOT NULL,
+            display_name VARCHAR NOT NULL,
+            avatar_url VARCHAR,
+            protein_goal REAL DEFAULT 150,
+            calorie_goal REAL DEFAULT 2000,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS common_foods (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            protein_g REAL NOT NULL,
+            calories REAL NOT NULL,
+            category VARCHAR NOT NULL,
+            icon VARCHAR NOT NULL,
+            sort_order INTEGER DEFAULT 0
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS food_entries (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            food_name VARCHAR NOT NULL,
+            protein_g REAL NOT NULL,
+            calories REAL NOT NULL,
+            fdc_id VARCHAR,
+            meal_type VARCHAR DEFAULT 'snack',
+            serving_qty REAL DEFAULT 1.0,
+            logged_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_food_entries_user_date
+            ON food_entries(user_id, logged_at)
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            invite_code VARCHAR UNIQUE NOT NULL,
+            created_by INTEGER NOT NULL REFERENCES users(id),
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS group_members (
+            id SERIAL PRIMARY KEY,
+            group_id INTEGER NOT NULL REFERENCES groups(id),
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            joined_at TIMESTAMPTZ DEFAULT NOW(),
+            UNIQUE(group_id, user_id)
+        )
+    """)
@@ -0,0 +1,13 @@
+"""Add carbs_g to food_entries and common_foods; add carb_goal to users."""
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE food_entries ADD COLUMN IF NOT EXISTS carbs_g REAL DEFAULT 0"
+    )
+    await conn.execute(
+        "ALTER TABLE common_foods ADD COLUMN IF NOT EXISTS carbs_g REAL DEFAULT 0"
+    )
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS carb_goal REAL DEFAULT 200"
+    )
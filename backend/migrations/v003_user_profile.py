@@ -0,0 +1,10 @@
+"""Add user profile fields for smart goal calculation."""
+
+
+async def upgrade(conn):
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS age INTEGER")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS weight_kg REAL")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS height_cm REAL")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS sex VARCHAR")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS activity_level VARCHAR")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS goal_type VARCHAR")
@@ -0,0 +1,10 @@
+"""Add dietary preference and food dislikes to users."""
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS dietary_preference VARCHAR DEFAULT 'non_vegetarian'"
+    )
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS food_dislikes TEXT"
+    )
@@ -0,0 +1,15 @@
+"""Add weekly_meal_plans table for persisting 7-day meal plans."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_meal_plans (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            week_start DATE NOT NULL,
+            plan_data JSONB NOT NULL,
+            conversation_history JSONB DEFAULT '[]',
+            updated_at TIMESTAMPTZ DEFAULT NOW(),
+            UNIQUE(user_id, week_start)
+        )
+    """)
@@ -0,0 +1,28 @@
+"""Add push_subscriptions table and notification prefs columns to users."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS push_subscriptions (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            endpoint TEXT NOT NULL,
+            p256dh TEXT NOT NULL,
+            auth TEXT NOT NULL,
+            timezone VARCHAR DEFAULT 'UTC',
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            UNIQUE(user_id, endpoint)
+        )
+    """)
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_enabled BOOLEAN DEFAULT FALSE"
+    )
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_breakfast_time VARCHAR DEFAULT '08:00'"
+    )
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_lunch_time VARCHAR DEFAULT '12:30'"
+    )
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS notif_dinner_time VARCHAR DEFAULT '19:00'"
+    )
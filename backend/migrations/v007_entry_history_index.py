@@ -0,0 +1,12 @@
+"""Add keyset index backing paginated food entry history."""
+import database
+
+TRANSACTIONAL = False
+
+
+async def upgrade(conn):
+    await database.create_index_concurrently(
+        conn,
+        "idx_food_entries_user_history",
+        "food_entries(user_id, logged_at DESC, id DESC)",
+    )
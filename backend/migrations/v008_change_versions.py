@@ -0,0 +1,30 @@
+"""Add per-user change versions and entry tombstones for delta sync."""
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0"
+    )
+    await conn.execute(
+        "ALTER TABLE food_entries ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0"
+    )
+    await conn.execute(
+        "ALTER TABLE weekly_meal_plans ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0"
+    )
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_food_entries_user_change
+            ON food_entries(user_id, change_version)
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS entry_tombstones (
+            entry_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            logged_at TIMESTAMPTZ NOT NULL,
+            change_version BIGINT NOT NULL,
+            deleted_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entry_tombstones_user_change
+            ON entry_tombstones(user_id, change_version)
+    """)
@@ -0,0 +1,111 @@
+"""Convert food_entries into monthly range partitions on logged_at."""
+from datetime import date
+
+import partitions
+from config import get_settings
+
+TRANSACTIONAL = False
+
+COPY_BATCH = 5000
+
+
+async def upgrade(conn):
+    """
+    Rows are copied into the new partitioned table in id batches while the
+    app keeps writing; only the final catch-up copy and table swap hold a
+    lock that blocks writes (reads continue throughout). The catch-up copies
+    every row still missing by id, so rows whose transaction committed
+    behind the batch high-water mark are not lost.
+    """
+    if await partitions.is_partitioned(conn):
+        return
+
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS food_entries_new (
+            id INTEGER NOT NULL DEFAULT nextval('food_entries_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            food_name VARCHAR NOT NULL,
+            protein_g REAL NOT NULL,
+            calories REAL NOT NULL,
+            carbs_g REAL DEFAULT 0,
+            fdc_id VARCHAR,
+            meal_type VARCHAR DEFAULT 'snack',
+            serving_qty REAL DEFAULT 1.0,
+            logged_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            change_version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (id, logged_at)
+        ) PARTITION BY RANGE (logged_at)
+    """)
+    await conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {partitions.DEFAULT_PARTITION} PARTITION OF food_entries_new DEFAULT"
+    )
+    oldest = await conn.fetchval("SELECT MIN(logged_at) FROM food_entries")
+    current = partitions.month_start(date.today())
+    month = partitions.month_start(oldest.date()) if oldest else current
+    last = partitions.add_months(current, get_settings().partition_months_ahead)
+    while month <= last:
+        await conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {partitions.partition_name(month)} "
+            f"PARTITION OF food_entries_new {partitions.partition_bounds(month)}"
+        )
+        month = partitions.add_months(month, 1)
+
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_food_entries_new_user_date ON food_entries_new(user_id, logged_at)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_food_entries_new_user_history "
+        "ON food_entries_new(user_id, logged_at DESC, id DESC)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_food_entries_new_user_change ON food_entries_new(user_id, change_version)"
+    )
+
+    copy_sql = """
+        WITH copied AS (
+            INSERT INTO food_entries_new
+                (id, user_id, food_name, protein_g, calories, carbs_g, fdc_id,
+                 meal_type, serving_qty, logged_at, change_version)
+            SELECT id, user_id, food_name, protein_g, calories, carbs_g, fdc_id,
+                   meal_type, serving_qty, COALESCE(logged_at, NOW()), change_version
+            FROM food_entries
+            WHERE id > $1
+            ORDER BY id
+            LIMIT $2
+            RETURNING id
+        )
+        SELECT MAX(id) FROM copied
+    """
+    last_id = await conn.fetchval("SELECT COALESCE(MAX(id), 0) FROM food_entries_new")
+    while True:
+        batch_max = await conn.fetchval(copy_sql, last_id, COPY_BATCH)
+        if batch_max is None:
+            break
+        last_id = batch_max
+
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE food_entries IN EXCLUSIVE MODE")
+        # Everything not yet copied, not just ids past the high-water mark:
+        # ids are taken before commit, so a transaction holding a lower id
+        # can commit after a batch has already copied higher ones.
+        await conn.execute("""
+            INSERT INTO food_entries_new
+                (id, user_id, food_name, protein_g, calories, carbs_g, fdc_id,
+                 meal_type, serving_qty, logged_at, change_version)
+            SELECT id, user_id, food_name, protein_g, calories, carbs_g, fdc_id,
+                   meal_type, serving_qty, COALESCE(logged_at, NOW()), change_version
+            FROM food_entries o
+            WHERE NOT EXISTS (SELECT 1 FROM food_entries_new n WHERE n.id = o.id)
+        """)
+        # Entries deleted after they were copied
+        await conn.execute("""
+            DELETE FROM food_entries_new n
+            WHERE NOT EXISTS (SELECT 1 FROM food_entries o WHERE o.id = n.id)
+        """)
+        await conn.execute("ALTER SEQUENCE food_entries_id_seq OWNED BY food_entries_new.id")
+        await conn.execute("DROP TABLE food_entries")
+        await conn.execute("ALTER TABLE food_entries_new RENAME TO food_entries")
+        await conn.execute("ALTER TABLE food_entries RENAME CONSTRAINT food_entries_new_pkey TO food_entries_pkey")
+        await conn.execute("ALTER INDEX idx_food_entries_new_user_date RENAME TO idx_food_entries_user_date")
+        await conn.execute("ALTER INDEX idx_food_entries_new_user_history RENAME TO idx_food_entries_user_history")
+        await conn.execute("ALTER INDEX idx_food_entries_new_user_change RENAME TO idx_food_entries_user_change")
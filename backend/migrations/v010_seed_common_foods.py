@@ -0,0 +1,6 @@
+"""Seed the quick-add common foods (and backfill carbs_g on older seeds)."""
+from seed import seed_common_foods
+
+
+async def upgrade(conn):
+    await seed_common_foods(conn)
@@ -0,0 +1,22 @@
+"""Add leaderboard_scores, the persisted store behind precomputed group leaderboards."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS leaderboard_scores (
+            group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+            period VARCHAR NOT NULL,
+            period_day DATE NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            score REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (group_id, period, period_day, user_id)
+        )
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_scores_rank
+            ON leaderboard_scores(group_id, period, period_day, score DESC, user_id)
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_scores_user
+            ON leaderboard_scores(user_id, period_day)
+    """)
@@ -0,0 +1,20 @@
+"""Denormalize groups.member_count and index group_members by user."""
+import database
+
+TRANSACTIONAL = False
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE groups ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0"
+    )
+    await conn.execute("""
+        UPDATE groups g SET member_count = c.n
+        FROM (SELECT group_id, COUNT(*) AS n FROM group_members GROUP BY group_id) c
+        WHERE c.group_id = g.id AND g.member_count <> c.n
+    """)
+    await database.create_index_concurrently(
+        conn,
+        "idx_group_members_user",
+        "group_members(user_id, group_id)",
+    )
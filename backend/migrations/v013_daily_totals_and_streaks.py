@@ -0,0 +1,61 @@
+"""Add per-day macro totals and streak state, backfilled from food_entries."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_daily_totals (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            protein_g REAL NOT NULL DEFAULT 0,
+            calories REAL NOT NULL DEFAULT 0,
+            carbs_g REAL NOT NULL DEFAULT 0,
+            on_target BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (user_id, day)
+        )
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_daily_totals_on_target
+            ON user_daily_totals(user_id, day) WHERE on_target
+    """)
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS current_streak INTEGER NOT NULL DEFAULT 0")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS best_streak INTEGER NOT NULL DEFAULT 0")
+    await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS streak_last_day DATE")
+
+    # Same on-target rule as streaks.is_on_target (10% tolerance over the caps)
+    await conn.execute("""
+        INSERT INTO user_daily_totals (user_id, day, protein_g, calories, carbs_g, on_target)
+        SELECT t.user_id, t.day, t.protein_g, t.calories, t.carbs_g,
+               t.protein_g >= COALESCE(u.protein_goal, 150)
+               AND t.calories <= COALESCE(u.calorie_goal, 2000) * 1.1
+               AND t.carbs_g <= COALESCE(u.carb_goal, 200) * 1.1
+        FROM (SELECT user_id, logged_at::date AS day,
+                     SUM(protein_g) AS protein_g,
+                     SUM(calories) AS calories,
+                     SUM(COALESCE(carbs_g, 0)) AS carbs_g
+              FROM food_entries
+              GROUP BY user_id, logged_at::date) t
+        JOIN users u ON u.id = t.user_id
+        ON CONFLICT (user_id, day) DO NOTHING
+    """)
+
+    # Runs of consecutive on-target days: day minus its row number is
+    # constant within a run.
+    await conn.execute("""
+        WITH hits AS (
+            SELECT user_id, day,
+                   day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::int AS run
+            FROM user_daily_totals WHERE on_target
+        ), runs AS (
+            SELECT user_id, COUNT(*) AS length, MAX(day) AS last_day
+            FROM hits GROUP BY user_id, run
+        ), per_user AS (
+            SELECT user_id, MAX(length) AS best,
+                   (array_agg(length ORDER BY last_day DESC))[1] AS current,
+                   MAX(last_day) AS last_day
+            FROM runs GROUP BY user_id
+        )
+        UPDATE users u
+        SET current_streak = p.current, best_streak = p.best, streak_last_day = p.last_day
+        FROM per_user p
+        WHERE u.id = p.user_id
+    """)
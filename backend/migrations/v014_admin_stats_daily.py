@@ -0,0 +1,28 @@
+"""Count entries per user-day and add admin_stats_daily for stats history."""
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE user_daily_totals ADD COLUMN IF NOT EXISTS entries INTEGER NOT NULL DEFAULT 0"
+    )
+    await conn.execute("""
+        UPDATE user_daily_totals t SET entries = c.n
+        FROM (SELECT user_id, logged_at::date AS day, COUNT(*) AS n
+              FROM food_entries GROUP BY user_id, logged_at::date) c
+        WHERE c.user_id = t.user_id AND c.day = t.day
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_daily_totals_day
+            ON user_daily_totals(day, user_id) WHERE entries > 0
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS admin_stats_daily (
+            day DATE PRIMARY KEY,
+            total_users INTEGER NOT NULL,
+            new_users INTEGER NOT NULL,
+            daily_active_users INTEGER NOT NULL,
+            weekly_active_users INTEGER NOT NULL,
+            total_groups INTEGER NOT NULL,
+            computed_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
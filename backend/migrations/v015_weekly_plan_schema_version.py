@@ -0,0 +1,12 @@
+"""Record which WeeklyDayPlan shape each saved plan was written with."""
+
+
+async def upgrade(conn):
+    await conn.execute(
+        "ALTER TABLE weekly_meal_plans ADD COLUMN IF NOT EXISTS plan_schema_version SMALLINT NOT NULL DEFAULT 0"
+    )
+    # Every existing row came from save_weekly_plan's model_dump of the
+    # current WeeklyDayPlan, which is schema version 1
+    await conn.execute(
+        "UPDATE weekly_meal_plans SET plan_schema_version = 1 WHERE plan_schema_version = 0"
+    )
@@ -0,0 +1,62 @@
+"""Weekly plan version history, content hashes, and persisted refine conversations."""
+import orjson
+
+import meal_plans
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        ALTER TABLE weekly_meal_plans
+            ADD COLUMN IF NOT EXISTS content_hash BYTEA,
+            ADD COLUMN IF NOT EXISTS plan_version INTEGER NOT NULL DEFAULT 0
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_meal_plan_versions (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            week_start DATE NOT NULL,
+            version INTEGER NOT NULL,
+            base_version INTEGER,
+            content_hash BYTEA NOT NULL,
+            delta JSONB NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (user_id, week_start, version)
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_plan_messages (
+            id BIGSERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            week_start DATE NOT NULL,
+            role VARCHAR NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """)
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_weekly_plan_messages_week
+            ON weekly_plan_messages(user_id, week_start, id)
+    """)
+
+    # Existing plans become version 1 snapshots. Text in and out, so this
+    # doesn't depend on the connection's json codecs.
+    rows = await conn.fetch(
+        "SELECT user_id, week_start, plan_data::text AS plan FROM weekly_meal_plans WHERE plan_version = 0"
+    )
+    for r in rows:
+        days = orjson.loads(r["plan"])
+        digest = meal_plans.plan_hash(meal_plans.encode_plan(days))
+        await conn.execute(
+            """INSERT INTO weekly_meal_plan_versions
+                   (user_id, week_start, version, base_version, content_hash, delta)
+               VALUES ($1, $2, 1, NULL, $3, $4::text::jsonb)
+               ON CONFLICT DO NOTHING""",
+            r["user_id"], r["week_start"], digest, orjson.dumps(meal_plans.full_delta(days)).decode(),
+        )
+        await conn.execute(
+            """UPDATE weekly_meal_plans SET content_hash = $3, plan_version = 1
+               WHERE user_id = $1 AND week_start = $2""",
+            r["user_id"], r["week_start"], digest,
+        )
+
+    # Never written; conversations now live in weekly_plan_messages
+    await conn.execute("ALTER TABLE weekly_meal_plans DROP COLUMN IF EXISTS conversation_history")
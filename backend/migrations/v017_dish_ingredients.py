@@ -0,0 +1,18 @@
+"""Dish -> ingredient knowledge base for locally built grocery lists."""
+from seed import seed_dish_ingredients
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS dish_ingredients (
+            dish_key VARCHAR NOT NULL,
+            ingredient VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            amount REAL NOT NULL,
+            unit VARCHAR NOT NULL CHECK (unit IN ('g', 'ml', 'count')),
+            source VARCHAR NOT NULL DEFAULT 'seed',
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (dish_key, ingredient)
+        )
+    """)
+    await seed_dish_ingredients(conn)
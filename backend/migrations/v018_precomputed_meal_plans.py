@@ -0,0 +1,14 @@
+"""Store meal plans pre-generated off-peak, keyed by their input fingerprint."""
+
+
+async def upgrade(conn):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS precomputed_meal_plans (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            plan_date DATE NOT NULL,
+            fingerprint BYTEA NOT NULL,
+            plan JSONB NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (user_id, plan_date)
+        )
+    """)
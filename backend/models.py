@@ -4,6 +4,13 @@ from datetime import datetime
 
 
 # --- Auth ---
+class UserStats(BaseModel):
+    current_streak: int = 0
+    best_streak: int = 0
+    adherence_7d: float = 0.0   # share of the last 7 days on target, 0-1
+    adherence_30d: float = 0.0
+
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -24,6 +31,7 @@ class UserResponse(BaseModel):
     notif_breakfast_time: str = '08:00'
     notif_lunch_time: str = '12:30'
     notif_dinner_time: str = '19:00'
+    stats: Optional[UserStats] = None  # only filled by /auth/me
 
 
 class GoalUpdate(BaseModel):
@@ -81,6 +89,11 @@ class FoodEntryResponse(BaseModel):
     logged_at: str
 
 
+class FoodEntryHistoryPage(BaseModel):
+    entries: list[FoodEntryResponse]
+    next_cursor: Optional[str] = None
+
+
 # --- Dashboard ---
 class DailySummary(BaseModel):
     date: str
@@ -107,6 +120,17 @@ class WeeklyResponse(BaseModel):
     carb_goal: float
 
 
+# --- Sync ---
+class SyncResponse(BaseModel):
+    version: int
+    has_more: bool = False
+    user: UserResponse
+    entries: list[FoodEntryResponse]
+    deleted_entry_ids: list[int]
+    daily_totals: list[WeeklyDay]
+    updated_plan_weeks: list[str]
+
+
 # --- Groups ---
 class GroupCreateRequest(BaseModel):
     name: str
@@ -130,6 +154,24 @@ class LeaderboardEntry(BaseModel):
     avatar_url: Optional[str] = None
     total_protein: float
     rank: int
+    value: Optional[float] = None  # the ranked metric's value
+
+
+class LeaderboardPage(BaseModel):
+    entries: list[LeaderboardEntry]
+    total_members: int
+    my_rank: Optional[int] = None
+    my_total_protein: Optional[float] = None
+    metric: str = "protein"
+    my_value: Optional[float] = None
+
+
+# --- Home ---
+class HomeResponse(BaseModel):
+    user: UserResponse
+    daily: DailySummary
+    weekly: WeeklyResponse
+    groups: list[GroupResponse]
 
 
 # --- Meal Plan ---
@@ -155,6 +197,7 @@ class MealPlanResponse(BaseModel):
     meal_plan: list[MealPlanMeal]
     day_summary: dict
     nutritionist_note: str
+    source: str = "gemini"  # or "local" (meal_planner.py)
 
 
 # --- Weekly Meal Plan ---
@@ -166,15 +209,46 @@ class WeeklyDayPlan(BaseModel):
     nutritionist_note: str
 
 
+# Stored with each saved plan. Bump when WeeklyDayPlan changes shape so older
+# rows are re-validated on read instead of being served as stored.
+WEEKLY_PLAN_SCHEMA_VERSION = 1
+
+
+class ConversationMessage(BaseModel):
+    role: str  # "user" or "assistant"
+    content: str
+
+
 class WeeklyMealPlanResponse(BaseModel):
     week_start: str
     plan: list[WeeklyDayPlan]
     saved: bool = False
+    version: Optional[int] = None  # set on saved plans
+    conversation_history: list[ConversationMessage] = []
 
 
-class ConversationMessage(BaseModel):
-    role: str  # "user" or "assistant"
-    content: str
+class SaveWeeklyPlanResponse(BaseModel):
+    saved: bool = True
+    version: int
+    unchanged: bool = False  # identical to the current version, nothing written
+
+
+class WeeklyPlanVersion(BaseModel):
+    version: int
+    created_at: str
+    changed_days: list[str]
+    current: bool
+
+
+class WeeklyPlanVersionsResponse(BaseModel):
+    week_start: str
+    current_version: int
+    versions: list[WeeklyPlanVersion]
+
+
+class RestoreWeeklyPlanRequest(BaseModel):
+    week_start: str
+    version: int
 
 
 class GenerateWeeklyPlanRequest(BaseModel):
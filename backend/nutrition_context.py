@@ -0,0 +1,105 @@
+"""
+Compact per-user nutrition context for meal planning and AI prompts.
+
+One query reads the last HISTORY_DAYS rows of user_daily_totals, today's
+entries, and the user's most-logged foods over the same window. None of it
+scans beyond that fixed window, however long the user's history is. The
+result is summarized into per-day totals, top foods, meal-slot coverage and
+macro shortfalls, and cached per (user, day, change version) since it can
+only change when the user writes.
+"""
+from collections import OrderedDict
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+HISTORY_DAYS = 7
+TOP_FOODS = 15
+CACHE_SIZE = 2048
+
+CONTEXT_SQL = """
+    WITH days AS (
+        SELECT day, protein_g, calories, carbs_g, on_target
+        FROM user_daily_totals
+        WHERE user_id = $1 AND day >= $2::date - $3::int AND day < $2::date AND entries > 0
+    ), today AS (
+        SELECT food_name, protein_g, calories, COALESCE(carbs_g, 0) AS carbs_g, meal_type
+        FROM food_entries
+        WHERE user_id = $1 AND logged_at >= $2::date AND logged_at < $2::date + 1
+        ORDER BY logged_at
+    ), top AS (
+        SELECT food_name, COUNT(*) AS times, AVG(protein_g) AS protein_g, AVG(calories) AS calories,
+               AVG(COALESCE(carbs_g, 0)) AS carbs_g, array_agg(DISTINCT meal_type) AS meal_types
+        FROM food_entries
+        WHERE user_id = $1 AND logged_at >= $2::date - $3::int AND logged_at < $2::date
+        GROUP BY food_name
+        ORDER BY COUNT(*) DESC, food_name
+        LIMIT $4
+    )
+    SELECT
+        (SELECT COALESCE(json_agg(days ORDER BY day), '[]') FROM days) AS days,
+        (SELECT COALESCE(json_agg(today), '[]') FROM today) AS today,
+        (SELECT COALESCE(json_agg(top ORDER BY times DESC, food_name), '[]') FROM top) AS top_foods
+"""
+
+_cache: OrderedDict = OrderedDict()
+
+
+def _goals(user: dict) -> dict:
+    return {
+        "protein": user.get("protein_goal", 150),
+        "calories": user.get("calorie_goal", 2000),
+        "carbs": user.get("carb_goal", 200),
+    }
+
+
+def summarize(user: dict, days: list, today: list, top_foods: list) -> dict:
+    goals = _goals(user)
+    eaten = {
+        "protein": round(sum(e["protein_g"] for e in today), 1),
+        "calories": round(sum(e["calories"] for e in today)),
+        "carbs": round(sum(e["carbs_g"] for e in today), 1),
+    }
+    logged_slots = sorted({e["meal_type"] for e in today}, key=lambda m: MEAL_TYPES.index(m) if m in MEAL_TYPES else 99)
+
+    shortfalls = {}
+    if days:
+        n = len(days)
+        avg = {
+            "protein": sum(d["protein_g"] for d in days) / n,
+            "calories": sum(d["calories"] for d in days) / n,
+            "carbs": sum(d["carbs_g"] for d in days) / n,
+        }
+        shortfalls = {
+            "days_logged": n,
+            "days_on_target": sum(1 for d in days if d["on_target"]),
+            "protein_short_days": sum(1 for d in days if d["protein_g"] < goals["protein"]),
+            "avg": {k: round(v) for k, v in avg.items()},
+            # Positive = under goal on average, negative = over
+            "avg_gap": {k: round(goals[k] - v) for k, v in avg.items()},
+        }
+
+    return {
+        "goals": goals,
+        "today": today,
+        "eaten": eaten,
+        "remaining": {k: max(0, round(goals[k] - eaten[k], 1)) for k in goals},
+        "logged_slots": logged_slots,
+        "remaining_slots": [m for m in MEAL_TYPES if m not in logged_slots],
+        "days": days,
+        "top_foods": top_foods,
+        "shortfalls": shortfalls,
+    }
+
+
+async def build(db, user: dict, day) -> dict:
+    key = (user["id"], day, user.get("change_version", 0), tuple(_goals(user).values()))
+    context = _cache.get(key)
+    if context is not None:
+        _cache.move_to_end(key)
+        return context
+
+    row = await db.fetchrow(CONTEXT_SQL, user["id"], day, HISTORY_DAYS, TOP_FOODS)
+    context = summarize(user, row["days"], row["today"], row["top_foods"])
+    _cache[key] = context
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return context
@@ -0,0 +1,140 @@
+"""Monthly range partitions for food_entries."""
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "food_entries"
+DEFAULT_PARTITION = "food_entries_default"
+ARCHIVE_SCHEMA = "archive"
+LOCK_ID = 0x4645  # "FE"
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(month: date) -> str:
+    lower, upper = month_start(month), add_months(month_start(month), 1)
+    return f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+
+
+async def ensure_partition(conn, month: date) -> bool:
+    """
+    Create the partition for `month` if missing. Returns True if created.
+
+    Rows that already landed in the default partition for that month are
+    moved into the new partition in the same transaction, otherwise ATTACH
+    would fail its default-partition constraint check. A transaction-level
+    advisory lock serializes workers, so whichever comes second sees the
+    partition and returns False instead of failing on CREATE TABLE.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name)
+    if exists:
+        return False
+
+    lower, upper = month, add_months(month, 1)
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", LOCK_ID)
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name):
+            return False
+        await conn.execute(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        moved = await conn.execute(
+            f"""WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE logged_at >= $1 AND logged_at < $2
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved""",
+            lower, upper,
+        )
+        await conn.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {partition_bounds(month)}"
+        )
+    logger.info("Created partition %s (%s)", name, moved)
+    return True
+
+
+async def list_partitions(conn) -> list[str]:
+    rows = await conn.fetch(
+        """SELECT c.relname
+           FROM pg_inherits i
+           JOIN pg_class c ON c.oid = i.inhrelid
+           JOIN pg_class p ON p.oid = i.inhparent
+           WHERE p.relname = $1
+           ORDER BY c.relname""",
+        PARENT_TABLE,
+    )
+    return [r["relname"] for r in rows]
+
+
+def _partition_month(name: str) -> date | None:
+    prefix = f"{PARENT_TABLE}_y"
+    if not name.startswith(prefix):
+        return None
+    try:
+        year, month = name[len(prefix):].split("m")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        return None
+
+
+async def archive_partitions_before(conn, cutoff: date) -> list[str]:
+    """
+    Detach every monthly partition that ends on or before `cutoff` and move
+    it into the archive schema. Data is kept, just no longer scanned.
+    """
+    cutoff = month_start(cutoff)
+    archived = []
+    await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+    for name in await list_partitions(conn):
+        month = _partition_month(name)
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        async with conn.transaction():
+            await conn.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+            await conn.execute(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+        archived.append(name)
+        logger.info("Archived partition %s", name)
+    return archived
+
+
+async def maintain_partitions(conn, months_ahead: int, retention_months: int, today: date | None = None) -> bool:
+    """
+    Pre-create upcoming partitions and archive ones past retention (0 keeps
+    all). Every worker runs this at startup; returns False without doing
+    anything if another one already holds the maintenance lock.
+    """
+    if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_ID):
+        return False
+    try:
+        today = today or date.today()
+        current = month_start(today)
+        for i in range(months_ahead + 1):
+            await ensure_partition(conn, add_months(current, i))
+        if retention_months > 0:
+            await archive_partitions_before(conn, add_months(current, -retention_months))
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", LOCK_ID)
+    return True
+
+
+async def is_partitioned(conn) -> bool:
+    return await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = $1)",
+        PARENT_TABLE,
+    )
@@ -0,0 +1,123 @@
+"""
+Push group activity to connected clients.
+
+log_food/delete_entry publish a NOTIFY on ACTIVITY_CHANNEL carrying the
+user, their groups and the protein delta. Each process keeps one dedicated
+LISTEN connection and fans notifications out to its local subscribers,
+coalescing so a group receives at most one event per COALESCE_SECONDS no
+matter how many entries were logged in between.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+import database
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_CHANNEL = "group_activity"
+COALESCE_SECONDS = 1.0
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+async def notify_activity(db, user_id: int, group_ids: list[int], delta: float, day):
+    """Publish from inside the write's transaction; Postgres delivers on commit."""
+    if not group_ids:
+        return
+    payload = json.dumps({
+        "user_id": user_id,
+        "group_ids": group_ids,
+        "delta": round(delta, 1),
+        "day": day.isoformat(),
+    })
+    await db.execute("SELECT pg_notify($1, $2)", ACTIVITY_CHANNEL, payload)
+
+
+class ActivityHub:
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        # group_id -> user_id -> accumulated delta since the last flush
+        self._pending: dict[int, dict[int, float]] = {}
+        self._conn = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_conn()
+
+    async def _close_conn(self):
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _ensure_listening(self):
+        if self._conn is not None and not self._conn.is_closed():
+            return
+        self._conn = await database.connect_dedicated()
+        await self._conn.add_listener(ACTIVITY_CHANNEL, self._on_notify)
+        logger.info("Listening on %s", ACTIVITY_CHANNEL)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._ensure_listening()
+            except Exception as e:
+                logger.warning("Activity listener connect failed: %s", e)
+                await self._close_conn()
+            await asyncio.sleep(COALESCE_SECONDS)
+            self._flush()
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        for group_id in data.get("group_ids", []):
+            if group_id not in self._subscribers:
+                continue
+            changes = self._pending.setdefault(group_id, defaultdict(float))
+            changes[data["user_id"]] += data.get("delta", 0)
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        for group_id, changes in pending.items():
+            event = {
+                "type": "leaderboard",
+                "group_id": group_id,
+                "changes": [
+                    {"user_id": uid, "delta": round(delta, 1)}
+                    for uid, delta in changes.items()
+                ],
+            }
+            for queue in self._subscribers.get(group_id, ()):
+                if queue.full():
+                    # Slow client: drop its oldest event rather than block fan-out
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    def subscribe(self, group_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[group_id].add(queue)
+        return queue
+
+    def unsubscribe(self, group_id: int, queue: asyncio.Queue):
+        subs = self._subscribers.get(group_id)
+        if subs is None:
+            return
+        subs.discard(queue)
+        if not subs:
+            del self._subscribers[group_id]
+            self._pending.pop(group_id, None)
+
+
+hub = ActivityHub()
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends
-from datetime import datetime, timedelta
-from dependencies import get_db, get_current_user
+from fastapi import APIRouter, Depends, Query
+from datetime import date, datetime
+import admin_stats
+import database
+from dependencies import get_current_user, get_read_db, get_current_user_read
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -15,61 +17,50 @@ class AdminStats(BaseModel):
     active_users_last_7_days: int
     total_protein_logged_all_time: float
     total_calories_logged_all_time: float
+    as_of: datetime
+
+
+class AdminStatsDay(BaseModel):
+    day: date
+    total_users: int
+    new_users: int
+    daily_active_users: int
+    weekly_active_users: int
+    total_groups: int
 
 
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(
-    user: dict = Depends(get_current_user),
-    db=Depends(get_db),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
 ):
     """Get platform-wide statistics (requires authentication)"""
-
-    now = datetime.utcnow()
-    last_24h = now - timedelta(hours=24)
-    last_7_days = now - timedelta(days=7)
-
-    # Total users
-    total_users = await db.fetchval("SELECT COUNT(*) FROM users")
-
-    # New users in last 24 hours
-    new_users_last_24h = await db.fetchval(
-        "SELECT COUNT(*) FROM users WHERE created_at >= $1", last_24h
-    )
-
-    # New users in last 7 days
-    new_users_last_7_days = await db.fetchval(
-        "SELECT COUNT(*) FROM users WHERE created_at >= $1", last_7_days
+    stats = await admin_stats.current(db)
+    return AdminStats(
+        total_users=stats["total_users"],
+        new_users_last_24h=stats["new_users_last_24h"],
+        new_users_last_7_days=stats["new_users_last_7_days"],
+        total_food_entries=stats["total_food_entries"],
+        total_groups=stats["total_groups"],
+        active_users_last_7_days=stats["active_users_last_7_days"],
+        total_protein_logged_all_time=round(stats["total_protein_logged_all_time"], 1),
+        total_calories_logged_all_time=round(stats["total_calories_logged_all_time"], 1),
+        as_of=stats["as_of"],
     )
 
-    # Total food entries
-    total_food_entries = await db.fetchval("SELECT COUNT(*) FROM food_entries")
 
-    # Total groups
-    total_groups = await db.fetchval("SELECT COUNT(*) FROM groups")
-
-    # Active users (logged food in last 7 days)
-    active_users_last_7_days = await db.fetchval(
-        """SELECT COUNT(DISTINCT user_id)
-           FROM food_entries
-           WHERE logged_at >= $1""",
-        last_7_days,
-    )
+@router.get("/stats/history", response_model=list[AdminStatsDay])
+async def get_admin_stats_history(
+    days: int = Query(90, ge=1, le=730),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """Daily snapshots (users, DAU/WAU, groups) for the last `days` days, oldest first."""
+    rows = await admin_stats.history(db, days)
+    return [AdminStatsDay(**dict(r)) for r in rows]
 
-    # Total nutrition logged all time
-    nutrition_totals = await db.fetchrow(
-        """SELECT
-           COALESCE(SUM(protein_g), 0) as total_protein,
-           COALESCE(SUM(calories), 0) as total_calories
-           FROM food_entries"""
-    )
 
-    return AdminStats(
-        total_users=total_users,
-        new_users_last_24h=new_users_last_24h,
-        new_users_last_7_days=new_users_last_7_days,
-        total_food_entries=total_food_entries,
-        total_groups=total_groups,
-        active_users_last_7_days=active_users_last_7_days,
-        total_protein_logged_all_time=round(nutrition_totals["total_protein"], 1),
-        total_calories_logged_all_time=round(nutrition_totals["total_calories"], 1),
-    )
+@router.get("/db-pool")
+async def get_db_pool_stats(user: dict = Depends(get_current_user)):
+    """Connection pool usage and per-statement prepare/cache-hit counts."""
+    return database.pool_stats.snapshot()
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import RedirectResponse
+from datetime import date
+from urllib.parse import quote
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+import database
+import streaks
 from auth import get_google_login_url, exchange_google_code, create_jwt
 from dependencies import get_db, get_current_user
 from models import UserResponse, GoalUpdate, UserProfileUpdate
+from changes import make_etag, etag_matches
 from config import get_settings
+from export import export_limiter, stream_ndjson, stream_csv_zip
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -33,28 +40,72 @@ async def google_callback(code: str, db=Depends(get_db)):
 
     if existing:
         user_id = existing['id']
-        await db.execute(
-            "UPDATE users SET display_name = $1, avatar_url = $2 WHERE id = $3",
+        version = await db.fetchval(
+            """UPDATE users SET display_name = $1, avatar_url = $2,
+                      change_version = change_version + 1
+               WHERE id = $3 AND (display_name IS DISTINCT FROM $1 OR avatar_url IS DISTINCT FROM $2)
+               RETURNING change_version""",
             display_name, avatar_url, user_id,
         )
     else:
-        user_id = await db.fetchval(
+        row = await db.fetchrow(
             """INSERT INTO users (google_id, email, display_name, avatar_url)
-               VALUES ($1, $2, $3, $4) RETURNING id""",
+               VALUES ($1, $2, $3, $4) RETURNING id, change_version""",
             google_id, email, display_name, avatar_url,
         )
+        user_id, version = row["id"], row["change_version"]
 
     token = create_jwt(user_id)
     frontend_url = get_settings().frontend_url
     redirect_url = f"{frontend_url}/auth/callback?token={token}"
     if not existing:
         redirect_url += "&new_user=1"
+    if version is not None:
+        # A redirect's headers never reach the app, so the token rides in the URL
+        redirect_url += "&last_write=" + quote(database.last_write_token(user_id, version))
     return RedirectResponse(redirect_url)
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(user: dict = Depends(get_current_user)):
-    return UserResponse(**user)
+async def get_me(
+    response: Response,
+    if_none_match: str = Header(None),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    today = date.today()
+    # Streaks lapse and adherence windows slide with the date, not just on writes
+    etag = make_etag(user, "me", today)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return UserResponse(**user, stats=await streaks.user_stats(db, user, today))
+
+
+@router.get("/me/export")
+async def export_account(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user: dict = Depends(get_current_user),
+):
+    """Stream the user's full account (entries, meal plans, groups)."""
+    if export_limiter().locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many exports in progress, try again shortly",
+            headers={"Retry-After": "30"},
+        )
+    stamp = date.today().isoformat()
+    if format == "csv":
+        return StreamingResponse(
+            stream_csv_zip(user["id"]),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="tracker-export-{stamp}.zip"'},
+        )
+    return StreamingResponse(
+        stream_ndjson(user["id"]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="tracker-export-{stamp}.ndjson"'},
+    )
 
 
 @router.put("/me/goals", response_model=UserResponse)
@@ -79,13 +130,15 @@ async def update_goals(
     for i, (k, v) in enumerate(updates.items(), 1):
         set_parts.append(f"{k} = ${i}")
         params.append(v)
+    set_parts.append("change_version = change_version + 1")
     set_clause = ", ".join(set_parts)
     params.append(user["id"])
-    await db.execute(
-        f"UPDATE users SET {set_clause} WHERE id = ${len(params)}", *params
-    )
-
-    updated = await db.fetchrow("SELECT * FROM users WHERE id = $1", user["id"])
+    async with db.transaction():
+        updated = await db.fetchrow(
+            f"UPDATE users SET {set_clause} WHERE id = ${len(params)} RETURNING *", *params
+        )
+        await streaks.reevaluate_day(db, dict(updated), date.today())
+    database.note_write(user["id"], updated["change_version"])
     return UserResponse(**dict(updated))
 
 
@@ -110,11 +163,13 @@ async def update_profile(
     for i, (k, v) in enumerate(updates.items(), 1):
         set_parts.append(f"{k} = ${i}")
         params.append(v)
+    set_parts.append("change_version = change_version + 1")
     set_clause = ", ".join(set_parts)
     params.append(user["id"])
-    await db.execute(
-        f"UPDATE users SET {set_clause} WHERE id = ${len(params)}", *params
-    )
-
-    updated = await db.fetchrow("SELECT * FROM users WHERE id = $1", user["id"])
+    async with db.transaction():
+        updated = await db.fetchrow(
+            f"UPDATE users SET {set_clause} WHERE id = ${len(params)} RETURNING *", *params
+        )
+        await streaks.reevaluate_day(db, dict(updated), date.today())
+    database.note_write(user["id"], updated["change_version"])
     return UserResponse(**dict(updated))
@@ -1,70 +1,68 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import ORJSONResponse
 from datetime import date, timedelta
 
-from dependencies import get_db, get_current_user
-from models import DailySummary, FoodEntryResponse, WeeklyResponse, WeeklyDay
-from routers.food_router import _row_to_dict
+import database
+from changes import make_etag, etag_matches
+from dependencies import get_read_db, get_current_user_read
+from models import DailySummary, WeeklyResponse, WeeklyDay
+from routers.food_router import _entry_json
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+DAILY_ENTRIES_SQL = database.hot_statement(
+    """SELECT * FROM food_entries
+       WHERE user_id = $1 AND logged_at >= $2::date AND logged_at < $2::date + 1
+       ORDER BY logged_at DESC"""
+)
 
-@router.get("/daily", response_model=DailySummary)
-async def get_daily(
-    date_str: str = Query(None, alias="date", description="YYYY-MM-DD"),
-    user: dict = Depends(get_current_user),
-    db=Depends(get_db),
-):
-    target_date = date.fromisoformat(date_str) if date_str else date.today()
 
-    rows = await db.fetch(
-        """SELECT * FROM food_entries
-           WHERE user_id = $1 AND DATE(logged_at) = $2
-           ORDER BY logged_at DESC""",
-        user["id"], target_date,
-    )
-    entries = [FoodEntryResponse(**_row_to_dict(r)) for r in rows]
+async def build_daily_summary(db, user: dict, target_date: date) -> dict:
+    """DailySummary-shaped dict, ready for ORJSONResponse."""
+    rows = await db.fetch(DAILY_ENTRIES_SQL, user["id"], target_date)
+    entries = [_entry_json(r) for r in rows]
 
-    total_protein = sum(e.protein_g for e in entries)
-    total_calories = sum(e.calories for e in entries)
-    total_carbs = sum(e.carbs_g for e in entries)
+    total_protein = sum(e["protein_g"] for e in entries)
+    total_calories = sum(e["calories"] for e in entries)
+    total_carbs = sum(e["carbs_g"] for e in entries)
 
-    return DailySummary(
-        date=target_date.isoformat(),
-        total_protein=round(total_protein, 1),
-        total_calories=round(total_calories, 1),
-        total_carbs=round(total_carbs, 1),
-        protein_goal=user["protein_goal"],
-        calorie_goal=user["calorie_goal"],
-        carb_goal=user["carb_goal"],
-        entries=entries,
-    )
+    return {
+        "date": target_date.isoformat(),
+        "total_protein": round(total_protein, 1),
+        "total_calories": round(total_calories, 1),
+        "total_carbs": round(total_carbs, 1),
+        "protein_goal": user["protein_goal"],
+        "calorie_goal": user["calorie_goal"],
+        "carb_goal": user["carb_goal"],
+        "entries": entries,
+    }
 
 
-@router.get("/weekly", response_model=WeeklyResponse)
-async def get_weekly(
-    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
-    user: dict = Depends(get_current_user),
-    db=Depends(get_db),
-):
-    today = date.fromisoformat(today_str) if today_str else date.today()
-    days = []
+async def build_weekly(db, user: dict, today: date) -> WeeklyResponse:
+    """Totals for the 7 days ending at `today`, in one grouped query."""
+    start = today - timedelta(days=6)
+    rows = await db.fetch(
+        """SELECT DATE(logged_at) as day,
+                  COALESCE(SUM(protein_g), 0) as total_protein,
+                  COALESCE(SUM(calories), 0) as total_calories,
+                  COALESCE(SUM(carbs_g), 0) as total_carbs
+           FROM food_entries
+           WHERE user_id = $1 AND logged_at >= $2::date AND logged_at < $3::date + 1
+           GROUP BY DATE(logged_at)""",
+        user["id"], start, today,
+    )
+    by_day = {r["day"]: r for r in rows}
 
+    days = []
     for i in range(6, -1, -1):
         d = today - timedelta(days=i)
-        row = await db.fetchrow(
-            """SELECT COALESCE(SUM(protein_g), 0) as total_protein,
-                      COALESCE(SUM(calories), 0) as total_calories,
-                      COALESCE(SUM(carbs_g), 0) as total_carbs
-               FROM food_entries
-               WHERE user_id = $1 AND DATE(logged_at) = $2""",
-            user["id"], d,
-        )
+        row = by_day.get(d)
         days.append(
             WeeklyDay(
                 date=d.isoformat(),
-                total_protein=round(row['total_protein'], 1),
-                total_calories=round(row['total_calories'], 1),
-                total_carbs=round(row['total_carbs'], 1),
+                total_protein=round(row['total_protein'], 1) if row else 0,
+                total_calories=round(row['total_calories'], 1) if row else 0,
+                total_carbs=round(row['total_carbs'], 1) if row else 0,
             )
         )
 
@@ -74,3 +72,36 @@ async def get_weekly(
         calorie_goal=user["calorie_goal"],
         carb_goal=user["carb_goal"],
     )
+
+
+@router.get("/daily", response_model=DailySummary)
+async def get_daily(
+    date_str: str = Query(None, alias="date", description="YYYY-MM-DD"),
+    if_none_match: str = Header(None),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    target_date = date.fromisoformat(date_str) if date_str else date.today()
+    etag = make_etag(user, "daily", target_date)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    summary = await build_daily_summary(db, user, target_date)
+    return ORJSONResponse(summary, headers={"ETag": etag})
+
+
+@router.get("/weekly", response_model=WeeklyResponse)
+async def get_weekly(
+    response: Response,
+    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
+    if_none_match: str = Header(None),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    today = date.fromisoformat(today_str) if today_str else date.today()
+    etag = make_etag(user, "weekly", today)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    return await build_weekly(db, user, today)
@@ -1,25 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import ORJSONResponse, Response
 from datetime import datetime, timezone
-import json
-
-from dependencies import get_db, get_current_user
+import asyncio
+import base64
+import orjson
+
+import grocery
+import leaderboards
+import meal_plan_pregen
+import meal_planner
+import meal_plans
+import nutrition_context
+import realtime
+import streaks
+from changes import bump_change_version
+from config import get_settings
+from dependencies import get_db, get_current_user, get_read_db, get_current_user_read
 from models import (
     CommonFoodResponse,
     FoodLogRequest,
     FoodEntryResponse,
+    FoodEntryHistoryPage,
     MealPlanResponse,
     WeeklyMealPlanResponse,
     WeeklyDayPlan,
     GenerateWeeklyPlanRequest,
     RefineWeeklyPlanRequest,
     RefineWeeklyPlanResponse,
+    RestoreWeeklyPlanRequest,
+    SaveWeeklyPlanResponse,
+    WeeklyPlanVersion,
+    WeeklyPlanVersionsResponse,
     GroceryListResponse,
+    WEEKLY_PLAN_SCHEMA_VERSION,
+)
+from gemini_client import (
+    GeminiUnavailable,
+    detect_food_from_image,
+    generate_meal_plan,
+    generate_weekly_meal_plan,
+    refine_weekly_meal_plan,
 )
-from gemini_client import detect_food_from_image, generate_meal_plan, generate_weekly_meal_plan, refine_weekly_meal_plan, generate_grocery_list
 
 router = APIRouter(prefix="/food", tags=["food"])
 
 _MEAL_ORDER = {"breakfast": 0, "lunch": 1, "dinner": 2, "snack": 3}
+MAX_DETECT_IMAGES = 8
+
+
+def _gemini_error(route: str, e: Exception, detail: str) -> HTTPException:
+    """503 with Retry-After when Gemini is unavailable (see gemini_client._generate), else 500 with `detail`."""
+    print(f"[{route}] Gemini error: {str(e) or type(e).__name__}")
+    if isinstance(e, GeminiUnavailable):
+        message = ("AI service quota reached. Please try again later." if e.quota
+                   else "AI service is temporarily unavailable. Please try again shortly.")
+        return HTTPException(status_code=503, detail=message, headers={"Retry-After": str(e.retry_after)})
+    return HTTPException(status_code=500, detail=detail)
+
+
+WEEKLY_PLAN_SQL = """
+    SELECT p.plan_schema_version, p.plan_version,
+           convert_to(p.plan_data::text, 'UTF8') AS plan_json,
+           convert_to(COALESCE(
+               (SELECT json_agg(json_build_object('role', m.role, 'content', m.content) ORDER BY m.id)
+                FROM weekly_plan_messages m
+                WHERE m.user_id = p.user_id AND m.week_start = p.week_start),
+               '[]'
+           )::text, 'UTF8') AS conversation_json
+    FROM weekly_meal_plans p
+    WHERE p.user_id = $1 AND p.week_start = $2
+"""
 
 def _sort_meals(plan_days: list) -> list:
     for day in plan_days:
@@ -31,7 +81,7 @@ def _sort_meals(plan_days: list) -> list:
 
 
 @router.get("/common", response_model=list[CommonFoodResponse])
-async def get_common_foods(db=Depends(get_db)):
+async def get_common_foods(db=Depends(get_read_db)):
     rows = await db.fetch("SELECT * FROM common_foods ORDER BY sort_order")
     return [CommonFoodResponse(**dict(r)) for r in rows]
 
@@ -43,8 +93,80 @@ async def detect_food(
 ):
     """Upload food image for AI detection."""
     contents = await image.read()
-    result = await detect_food_from_image(contents)
-    return result
+    try:
+        return await detect_food_from_image(contents)
+    except Exception as e:
+        raise _gemini_error("detect", e, "Failed to analyze image. Please try again.")
+
+
+def _merge_detections(results: list) -> dict:
+    """
+    Combine per-image detection results into one. Same-named foods within
+    an image are separate servings and add up; a food seen in several
+    images is one food photographed twice, kept at its most confident
+    estimate.
+    """
+    foods: dict[str, dict] = {}
+    images = []
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            images.append({"index": i, "error": "Failed to analyze image."})
+            continue
+        in_image: dict[str, dict] = {}
+        for food in result.get("foods", []):
+            key = grocery.dish_key(food.get("name", ""))
+            if not key:
+                continue
+            if key in in_image:
+                same = in_image[key]
+                for field in ("protein_g", "calories", "carbs_g"):
+                    same[field] = same.get(field, 0) + food.get(field, 0)
+                same["confidence"] = min(same.get("confidence", 0), food.get("confidence", 0))
+            else:
+                in_image[key] = dict(food)
+        images.append({"index": i, "foods": len(in_image)})
+        for key, food in in_image.items():
+            seen = foods.get(key)
+            if seen is None:
+                foods[key] = {**food, "images": [i]}
+            elif food.get("confidence", 0) > seen.get("confidence", 0):
+                foods[key] = {**food, "images": seen["images"] + [i]}
+            else:
+                seen["images"].append(i)
+
+    merged = list(foods.values())
+    return {
+        "foods": merged,
+        "total_protein": round(sum(f.get("protein_g", 0) for f in merged), 1),
+        "total_calories": round(sum(f.get("calories", 0) for f in merged)),
+        "total_carbs": round(sum(f.get("carbs_g", 0) for f in merged), 1),
+        "images": images,
+    }
+
+
+@router.post("/detect/batch", response_model=dict)
+async def detect_food_batch(
+    images: list[UploadFile] = File(...),
+    _user: dict = Depends(get_current_user),
+):
+    """
+    Detect foods across several photos of one meal. Images are decoded in
+    threads and analyzed concurrently (within gemini_client.detect_limiter),
+    so a batch takes about as long as its slowest image. Images that fail
+    are reported in `images`; the request fails only if all of them do.
+    """
+    if len(images) > MAX_DETECT_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Send at most {MAX_DETECT_IMAGES} images at once.")
+    contents = [await image.read() for image in images]
+    results = await asyncio.gather(
+        *(detect_food_from_image(c) for c in contents), return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if len(errors) == len(results):
+        raise _gemini_error("detect-batch", errors[0], "Failed to analyze images. Please try again.")
+    for e in errors:
+        print(f"[detect-batch] Gemini error on one image: {str(e) or type(e).__name__}")
+    return _merge_detections(results)
 
 
 @router.post("/log", response_model=FoodEntryResponse)
@@ -58,23 +180,34 @@ async def log_food(
     else:
         logged_at = datetime.now(timezone.utc)
 
-    new_id = await db.fetchval(
-        """INSERT INTO food_entries
-           (user_id, food_name, protein_g, calories, carbs_g, fdc_id, meal_type, serving_qty, logged_at)
-           VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) RETURNING id""",
-        user["id"],
-        entry.food_name,
-        entry.protein_g * entry.serving_qty,
-        entry.calories * entry.serving_qty,
-        entry.carbs_g * entry.serving_qty,
-        entry.fdc_id,
-        entry.meal_type,
-        entry.serving_qty,
-        logged_at,
-    )
-
-    row = await db.fetchrow("SELECT * FROM food_entries WHERE id = $1", new_id)
-    return FoodEntryResponse(**_row_to_dict(row))
+    async with db.transaction():
+        version = await bump_change_version(db, user["id"])
+        row = await db.fetchrow(
+            """INSERT INTO food_entries
+               (user_id, food_name, protein_g, calories, carbs_g, fdc_id, meal_type, serving_qty,
+                logged_at, change_version)
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+               RETURNING *, logged_at::date AS log_day""",
+            user["id"],
+            entry.food_name,
+            entry.protein_g * entry.serving_qty,
+            entry.calories * entry.serving_qty,
+            entry.carbs_g * entry.serving_qty,
+            entry.fdc_id,
+            entry.meal_type,
+            entry.serving_qty,
+            logged_at,
+            version,
+        )
+        await streaks.apply_entry(
+            db, user, row["log_day"], row["protein_g"], row["calories"], row["carbs_g"],
+        )
+        group_ids = await leaderboards.apply_entry_delta(
+            db, user["id"], row["log_day"], row["protein_g"],
+        )
+        await realtime.notify_activity(db, user["id"], group_ids, row["protein_g"], row["log_day"])
+    leaderboards.apply_cached_delta(group_ids, user["id"], row["log_day"], row["protein_g"])
+    return ORJSONResponse(_entry_json(row))
 
 
 @router.get("/entries", response_model=list[FoodEntryResponse])
@@ -87,11 +220,55 @@ async def get_entries(
     target = date_type.fromisoformat(date)
     rows = await db.fetch(
         """SELECT * FROM food_entries
-           WHERE user_id = $1 AND DATE(logged_at) = $2
+           WHERE user_id = $1 AND logged_at >= $2::date AND logged_at < $2::date + 1
            ORDER BY logged_at DESC""",
         user["id"], target,
     )
-    return [FoodEntryResponse(**_row_to_dict(r)) for r in rows]
+    return ORJSONResponse([_entry_json(r) for r in rows])
+
+
+@router.get("/entries/history", response_model=FoodEntryHistoryPage)
+async def get_entry_history(
+    before: str = Query(None, description="Cursor from a previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=200),
+    meal_type: str = Query(None),
+    q: str = Query(None, description="Case-insensitive food name filter"),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """Page backwards through the user's log, newest first."""
+    conditions = ["user_id = $1"]
+    params = [user["id"]]
+    if before:
+        try:
+            cursor_at, cursor_id = _decode_history_cursor(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        params.extend([cursor_at, cursor_id])
+        conditions.append(f"(logged_at, id) < (${len(params) - 1}, ${len(params)})")
+    if meal_type:
+        params.append(meal_type)
+        conditions.append(f"meal_type = ${len(params)}")
+    if q:
+        params.append(f"%{q}%")
+        conditions.append(f"food_name ILIKE ${len(params)}")
+    params.append(limit + 1)
+
+    rows = await db.fetch(
+        f"""SELECT * FROM food_entries
+            WHERE {' AND '.join(conditions)}
+            ORDER BY logged_at DESC, id DESC
+            LIMIT ${len(params)}""",
+        *params,
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_history_cursor(rows[-1]["logged_at"], rows[-1]["id"])
+    return ORJSONResponse({
+        "entries": [_entry_json(r) for r in rows],
+        "next_cursor": next_cursor,
+    })
 
 
 @router.delete("/entries/{entry_id}")
@@ -100,57 +277,68 @@ async def delete_entry(
     user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    entry = await db.fetchrow(
-        "SELECT * FROM food_entries WHERE id = $1 AND user_id = $2",
-        entry_id, user["id"],
-    )
-    if not entry:
-        raise HTTPException(status_code=404, detail="Entry not found")
-
-    await db.execute("DELETE FROM food_entries WHERE id = $1", entry_id)
+    async with db.transaction():
+        deleted = await db.fetchrow(
+            """DELETE FROM food_entries WHERE id = $1 AND user_id = $2
+               RETURNING logged_at, logged_at::date AS log_day, protein_g, calories, carbs_g""",
+            entry_id, user["id"],
+        )
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Entry not found")
+
+        version = await bump_change_version(db, user["id"])
+        await db.execute(
+            """INSERT INTO entry_tombstones (entry_id, user_id, logged_at, change_version)
+               VALUES ($1, $2, $3, $4)
+               ON CONFLICT (entry_id) DO UPDATE SET change_version = EXCLUDED.change_version""",
+            entry_id, user["id"], deleted["logged_at"], version,
+        )
+        await streaks.apply_entry(
+            db, user, deleted["log_day"],
+            -deleted["protein_g"], -deleted["calories"], -(deleted["carbs_g"] or 0), entries=-1,
+        )
+        group_ids = await leaderboards.apply_entry_delta(
+            db, user["id"], deleted["log_day"], -deleted["protein_g"],
+        )
+        await realtime.notify_activity(db, user["id"], group_ids, -deleted["protein_g"], deleted["log_day"])
+    leaderboards.apply_cached_delta(group_ids, user["id"], deleted["log_day"], -deleted["protein_g"])
     return {"ok": True}
 
 
 @router.get("/meal-plan", response_model=MealPlanResponse)
 async def get_meal_plan(
     date: str = Query(..., description="YYYY-MM-DD"),
+    planner: str = Query(
+        "auto", pattern="^(auto|gemini|local)$",
+        description="auto: Gemini, falling back to the local planner when it is slow or failing",
+    ),
     user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    """Generate a personalized AI meal plan based on today's logged entries."""
+    """Generate a personalized meal plan based on today's logged entries."""
     from datetime import date as date_type
     target = date_type.fromisoformat(date)
-    rows = await db.fetch(
-        """SELECT food_name, protein_g, calories, carbs_g, meal_type
-           FROM food_entries
-           WHERE user_id = $1 AND DATE(logged_at) = $2
-           ORDER BY logged_at""",
-        user["id"], target,
-    )
-    entries = [dict(r) for r in rows]
-
-    from datetime import timedelta
-    history_rows = await db.fetch(
-        """SELECT food_name, protein_g, calories, carbs_g, meal_type,
-                  DATE(logged_at) AS log_date
-           FROM food_entries
-           WHERE user_id = $1
-             AND DATE(logged_at) < $2
-             AND DATE(logged_at) >= $2 - INTERVAL '7 days'
-           ORDER BY logged_at""",
-        user["id"], target,
-    )
-    history_entries = [dict(r) for r in history_rows]
+    context = await nutrition_context.build(db, user, target)
 
-    try:
-        result = await generate_meal_plan(user, entries, history_entries)
-    except Exception as e:
-        msg = str(e)
-        print(f"[meal-plan] Gemini error: {msg}")
-        if "429" in msg or "quota" in msg.lower() or "exhausted" in msg.lower():
-            raise HTTPException(status_code=503, detail="AI service quota reached. Please try again later.")
-        raise HTTPException(status_code=500, detail="Failed to generate meal plan. Please try again.")
-    return MealPlanResponse(**result)
+    if planner != "local" and get_settings().meal_plan_pregen_enabled:
+        stored = await meal_plan_pregen.lookup(db, user, target, context)
+        if stored is not None:
+            return MealPlanResponse(**stored)
+
+    if planner != "local":
+        # Only auto mode trades a slow answer for the local planner
+        deadline = get_settings().meal_plan_gemini_timeout_s if planner == "auto" else None
+        try:
+            result = await generate_meal_plan(user, context, deadline)
+            return MealPlanResponse(**result)
+        except Exception as e:
+            if planner == "gemini":
+                raise _gemini_error("meal-plan", e, "Failed to generate meal plan. Please try again.")
+            print(f"[meal-plan] Gemini error, using the local planner: {str(e) or type(e).__name__}")
+
+    common_foods = await meal_planner.load_common_foods(db)
+    result = meal_planner.plan_day(user, context, common_foods)
+    return MealPlanResponse(**result, source="local")
 
 
 @router.post("/weekly-meal-plan/generate", response_model=WeeklyMealPlanResponse)
@@ -162,73 +350,130 @@ async def generate_weekly_plan(
     try:
         plan_days = await generate_weekly_meal_plan(user, body.week_start)
     except Exception as e:
-        msg = str(e)
-        print(f"[weekly-meal-plan] Gemini error: {msg}")
-        if "429" in msg or "quota" in msg.lower() or "exhausted" in msg.lower():
-            raise HTTPException(status_code=503, detail="AI service quota reached. Please try again later.")
-        raise HTTPException(status_code=500, detail="Failed to generate weekly meal plan. Please try again.")
+        raise _gemini_error("weekly-meal-plan", e, "Failed to generate weekly meal plan. Please try again.")
     return WeeklyMealPlanResponse(week_start=body.week_start, plan=_sort_meals(plan_days), saved=False)
 
 
 @router.get("/weekly-meal-plan", response_model=WeeklyMealPlanResponse)
 async def get_weekly_plan(
     week_start: str = Query(..., description="YYYY-MM-DD (Monday of the week)"),
-    user: dict = Depends(get_current_user),
-    db=Depends(get_db),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
 ):
-    """Load the saved weekly meal plan for a given week."""
+    """
+    Load the saved weekly meal plan for a given week, with its refine conversation.
+
+    Plans saved with the current WEEKLY_PLAN_SCHEMA_VERSION are spliced into
+    the response as the bytes Postgres returns, without being parsed;
+    older ones are validated (and so normalized) through the model.
+    """
     from datetime import date as date_type
     week_date = date_type.fromisoformat(week_start)
-    row = await db.fetchrow(
-        "SELECT plan_data, conversation_history FROM weekly_meal_plans WHERE user_id = $1 AND week_start = $2",
-        user["id"], week_date,
-    )
+    row = await db.fetchrow(WEEKLY_PLAN_SQL, user["id"], week_date)
     if not row:
         raise HTTPException(status_code=404, detail="No saved plan for this week.")
-    plan_data = row["plan_data"]
-    if isinstance(plan_data, str):
-        plan_data = json.loads(plan_data)
-    return WeeklyMealPlanResponse(week_start=week_start, plan=plan_data, saved=True)
+    if row["plan_schema_version"] != WEEKLY_PLAN_SCHEMA_VERSION:
+        return WeeklyMealPlanResponse(
+            week_start=week_start,
+            plan=orjson.loads(row["plan_json"]),
+            saved=True,
+            version=row["plan_version"],
+            conversation_history=orjson.loads(row["conversation_json"]),
+        )
+    return Response(
+        b"".join((
+            b'{"week_start":', orjson.dumps(week_start),
+            b',"plan":', row["plan_json"],
+            b',"saved":true,"version":', str(row["plan_version"]).encode(),
+            b',"conversation_history":', row["conversation_json"],
+            b"}",
+        )),
+        media_type="application/json",
+    )
 
 
-@router.post("/weekly-meal-plan/save")
+@router.post("/weekly-meal-plan/save", response_model=SaveWeeklyPlanResponse)
 async def save_weekly_plan(
     body: WeeklyMealPlanResponse,
     user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    """Upsert a weekly meal plan into the database."""
+    """Save a weekly meal plan as a new version; saving an unchanged plan writes nothing."""
     from datetime import date as date_type
     week_date = date_type.fromisoformat(body.week_start)
-    plan_json = json.dumps([d.model_dump() for d in body.plan])
-    await db.execute(
-        """INSERT INTO weekly_meal_plans (user_id, week_start, plan_data, updated_at)
-           VALUES ($1, $2, $3::jsonb, NOW())
-           ON CONFLICT (user_id, week_start)
-           DO UPDATE SET plan_data = EXCLUDED.plan_data, updated_at = NOW()""",
-        user["id"], week_date, plan_json,
+    version, changed = await meal_plans.save(db, user["id"], week_date, [d.model_dump() for d in body.plan])
+    return SaveWeeklyPlanResponse(version=version, unchanged=not changed)
+
+
+@router.get("/weekly-meal-plan/versions", response_model=WeeklyPlanVersionsResponse)
+async def get_weekly_plan_versions(
+    week_start: str = Query(..., description="YYYY-MM-DD (Monday of the week)"),
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """Saved versions of a week's plan, newest first, with the days each one changed."""
+    from datetime import date as date_type
+    week_date = date_type.fromisoformat(week_start)
+    current = await db.fetchval(
+        "SELECT plan_version FROM weekly_meal_plans WHERE user_id = $1 AND week_start = $2",
+        user["id"], week_date,
     )
-    return {"saved": True}
+    if current is None:
+        raise HTTPException(status_code=404, detail="No saved plan for this week.")
+    rows = await meal_plans.list_versions(db, user["id"], week_date, limit)
+    return WeeklyPlanVersionsResponse(
+        week_start=week_start,
+        current_version=current,
+        versions=[
+            WeeklyPlanVersion(
+                version=r["version"],
+                created_at=r["created_at"].isoformat(),
+                changed_days=r["changed_days"],
+                current=r["version"] == current,
+            )
+            for r in rows
+        ],
+    )
+
+
+@router.post("/weekly-meal-plan/versions/restore", response_model=WeeklyMealPlanResponse)
+async def restore_weekly_plan_version(
+    body: RestoreWeeklyPlanRequest,
+    user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """Undo: save an earlier version's plan as the newest version."""
+    from datetime import date as date_type
+    week_date = date_type.fromisoformat(body.week_start)
+    days = await meal_plans.plan_at(db, user["id"], week_date, body.version)
+    if days is None:
+        raise HTTPException(status_code=404, detail="No such version of this week's plan.")
+    version, _ = await meal_plans.save(db, user["id"], week_date, days)
+    return WeeklyMealPlanResponse(week_start=body.week_start, plan=days, saved=True, version=version)
 
 
 @router.post("/weekly-meal-plan/refine", response_model=RefineWeeklyPlanResponse)
 async def refine_weekly_plan(
     body: RefineWeeklyPlanRequest,
     user: dict = Depends(get_current_user),
+    db=Depends(get_db),
 ):
-    """Refine an existing weekly plan via a natural language prompt."""
+    """Refine an existing weekly plan via a natural language prompt; the exchange is kept with the week."""
+    from datetime import date as date_type
+    week_date = date_type.fromisoformat(body.week_start)
     current_plan_dicts = [d.model_dump() for d in body.current_plan]
     history_dicts = [m.model_dump() for m in body.conversation_history]
     try:
         result = await refine_weekly_meal_plan(user, current_plan_dicts, body.prompt, history_dicts)
     except Exception as e:
-        msg = str(e)
-        print(f"[weekly-meal-plan/refine] Gemini error: {msg}")
-        if "429" in msg or "quota" in msg.lower() or "exhausted" in msg.lower():
-            raise HTTPException(status_code=503, detail="AI service quota reached. Please try again later.")
-        raise HTTPException(status_code=500, detail="Failed to refine meal plan. Please try again.")
+        raise _gemini_error("weekly-meal-plan/refine", e, "Failed to refine meal plan. Please try again.")
     for day in result["plan"]:
         day["meal_plan"].sort(key=lambda m: _MEAL_ORDER.get(m.get("meal_type", ""), 99))
+    await meal_plans.append_messages(
+        db, user["id"], week_date,
+        [("user", body.prompt), ("assistant", result["assistant_message"])],
+    )
     return RefineWeeklyPlanResponse(
         week_start=body.week_start,
         plan=result["plan"],
@@ -241,19 +486,12 @@ async def refine_weekly_plan(
 async def get_grocery_list(
     body: WeeklyMealPlanResponse,
     user: dict = Depends(get_current_user),
+    db=Depends(get_db),
 ):
-    """Generate a categorized grocery list from a saved weekly meal plan."""
+    """Build a categorized grocery list from a weekly meal plan (see grocery.py)."""
     plan_dicts = [d.model_dump() for d in body.plan]
-    try:
-        result = await generate_grocery_list(plan_dicts, body.week_start)
-    except Exception as e:
-        msg = str(e)
-        print(f"[weekly-meal-plan/grocery-list] Gemini error: {msg}")
-        if "429" in msg or "quota" in msg.lower() or "exhausted" in msg.lower():
-            raise HTTPException(status_code=503, detail="AI service quota reached. Please try again later.")
-        raise HTTPException(status_code=500, detail="Failed to generate grocery list. Please try again.")
-    categories = result.get("categories", [])
-    total_items = sum(len(cat.get("items", [])) for cat in categories)
+    categories = await grocery.build_list(db, plan_dicts)
+    total_items = sum(len(cat["items"]) for cat in categories)
     return GroceryListResponse(
         week_start=body.week_start,
         categories=categories,
@@ -261,10 +499,31 @@ async def get_grocery_list(
     )
 
 
-def _row_to_dict(row):
-    """Convert asyncpg Record to dict, converting datetimes to ISO strings."""
-    d = dict(row)
-    for k, v in d.items():
-        if isinstance(v, datetime):
-            d[k] = v.isoformat()
-    return d
+def _encode_history_cursor(logged_at: datetime, entry_id: int) -> str:
+    raw = f"{logged_at.isoformat()}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of _encode_history_cursor. Raises ValueError on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (UnicodeDecodeError, TypeError) as e:
+        raise ValueError(str(e))
+    logged_at, _, entry_id = raw.rpartition("|")
+    return datetime.fromisoformat(logged_at), int(entry_id)
+
+
+ENTRY_FIELDS = tuple(FoodEntryResponse.model_fields)
+
+
+def _entry_json(row) -> dict:
+    """
+    FoodEntryResponse-shaped dict straight from a food_entries record.
+
+    For routes that return an ORJSONResponse: FastAPI skips response_model
+    validation for Response objects, and orjson writes datetimes as ISO 8601
+    itself, so there is no isoformat pass and no model round trip.
+    """
+    return {k: row[k] for k in ENTRY_FIELDS}
+
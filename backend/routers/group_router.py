@@ -1,13 +1,22 @@
+import asyncio
+import json
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import date, timedelta
 
-from dependencies import get_db, get_current_user
+import leaderboards
+import streaks
+from auth import create_stream_ticket, decode_stream_ticket
+from changes import bump_change_version
+from realtime import hub
+from dependencies import get_db, get_current_user, get_read_db, get_current_user_read
 from models import (
     GroupCreateRequest,
     GroupJoinRequest,
     GroupResponse,
     LeaderboardEntry,
+    LeaderboardPage,
 )
 
 router = APIRouter(prefix="/groups", tags=["groups"])
@@ -26,13 +35,15 @@ async def create_group(
     invite_code = generate_invite_code()
     async with db.transaction():
         group_id = await db.fetchval(
-            "INSERT INTO groups (name, invite_code, created_by) VALUES ($1, $2, $3) RETURNING id",
+            """INSERT INTO groups (name, invite_code, created_by, member_count)
+               VALUES ($1, $2, $3, 1) RETURNING id""",
             req.name, invite_code, user["id"],
         )
         await db.execute(
             "INSERT INTO group_members (group_id, user_id) VALUES ($1, $2)",
             group_id, user["id"],
         )
+        await bump_change_version(db, user["id"])
 
     return GroupResponse(
         id=group_id,
@@ -43,59 +54,62 @@ async def create_group(
     )
 
 
+# Look up the group, add the membership if it's new and bump the group's
+# member_count, in one statement. All CTEs see the same snapshot, so the
+# updated count comes from `bumped` when this call inserted the row.
+JOIN_GROUP_SQL = """
+    WITH g AS (
+        SELECT id, name, invite_code, created_by, member_count
+        FROM groups WHERE invite_code = $1
+    ), joined AS (
+        INSERT INTO group_members (group_id, user_id)
+        SELECT id, $2 FROM g
+        ON CONFLICT (group_id, user_id) DO NOTHING
+        RETURNING group_id
+    ), bumped AS (
+        UPDATE groups SET member_count = member_count + 1
+        WHERE id IN (SELECT group_id FROM joined)
+        RETURNING id, member_count
+    )
+    SELECT g.id, g.name, g.invite_code, g.created_by,
+           COALESCE(bumped.member_count, g.member_count) AS member_count,
+           bumped.id IS NOT NULL AS joined
+    FROM g LEFT JOIN bumped ON bumped.id = g.id
+"""
+
+
 @router.post("/join", response_model=GroupResponse)
 async def join_group(
     req: GroupJoinRequest,
     user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    group = await db.fetchrow(
-        "SELECT * FROM groups WHERE invite_code = $1", req.invite_code
-    )
+    group = await db.fetchrow(JOIN_GROUP_SQL, req.invite_code, user["id"])
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
 
-    group = dict(group)
-    # Check if already a member
-    existing = await db.fetchrow(
-        "SELECT id FROM group_members WHERE group_id = $1 AND user_id = $2",
-        group["id"], user["id"],
-    )
-    if not existing:
-        try:
-            await db.execute(
-                "INSERT INTO group_members (group_id, user_id) VALUES ($1, $2)",
-                group["id"], user["id"],
-            )
-        except Exception:
-            pass  # Race condition: already joined between check and insert
-
-    count = await db.fetchval(
-        "SELECT COUNT(*) FROM group_members WHERE group_id = $1", group["id"]
-    )
+    if group["joined"]:
+        await leaderboards.add_member(db, group["id"], user["id"])
+        # After the join has committed, so a replica at this version has it
+        await bump_change_version(db, user["id"])
 
     return GroupResponse(
         id=group["id"],
         name=group["name"],
         invite_code=group["invite_code"],
-        member_count=count,
+        member_count=group["member_count"],
         created_by=group["created_by"],
     )
 
 
-@router.get("", response_model=list[GroupResponse])
-async def list_groups(
-    user: dict = Depends(get_current_user),
-    db=Depends(get_db),
-):
+async def fetch_user_groups(db, user_id: int) -> list[GroupResponse]:
     rows = await db.fetch(
-        """SELECT g.*, COUNT(gm2.id) as member_count
-           FROM groups g
-           JOIN group_members gm ON gm.group_id = g.id AND gm.user_id = $1
-           JOIN group_members gm2 ON gm2.group_id = g.id
-           GROUP BY g.id
+        """SELECT g.id, g.name, g.invite_code, g.created_by, g.member_count
+           FROM group_members gm
+           JOIN groups g ON g.id = gm.group_id
+           WHERE gm.user_id = $1
            ORDER BY g.created_at DESC""",
-        user["id"],
+        user_id,
     )
     return [
         GroupResponse(
@@ -109,53 +123,207 @@ async def list_groups(
     ]
 
 
-@router.get("/{group_id}/leaderboard", response_model=list[LeaderboardEntry])
-async def get_leaderboard(
-    group_id: int,
-    period: str = Query("daily", regex="^(daily|weekly)$"),
-    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
+@router.get("", response_model=list[GroupResponse])
+async def list_groups(
     user: dict = Depends(get_current_user),
     db=Depends(get_db),
 ):
-    # Verify user is in the group
+    return await fetch_user_groups(db, user["id"])
+
+
+METRIC_PATTERN = "^(" + "|".join(streaks.METRICS) + ")$"
+METRIC_HELP = (
+    "protein: total over the period; adherence: % of the last 7 days on target; "
+    "streak: current run of on-target days (period only affects protein)"
+)
+
+
+# Client local dates are at most a day either side of the server's (UTC-12..UTC+14)
+MAX_DAY_SKEW = timedelta(days=1)
+
+
+def _board_day(today_str: str | None) -> date:
+    """The client's local date, refused if it is not today somewhere."""
+    if not today_str:
+        return date.today()
+    try:
+        today = date.fromisoformat(today_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="today must be YYYY-MM-DD")
+    if abs(today - date.today()) > MAX_DAY_SKEW:
+        raise HTTPException(status_code=400, detail="today is too far from the current date")
+    return today
+
+
+async def _require_member(db, group_id: int, user_id: int):
     member = await db.fetchrow(
         "SELECT id FROM group_members WHERE group_id = $1 AND user_id = $2",
-        group_id, user["id"],
+        group_id, user_id,
     )
     if not member:
         raise HTTPException(status_code=403, detail="Not a member of this group")
 
-    today = date.fromisoformat(today_str) if today_str else date.today()
 
-    if period == "daily":
-        date_clause = "DATE(fe.logged_at) = $1"
-        date_params = [today]
-        group_param = "$2"
+async def _ranked_view(
+    db, group_id: int, user_id: int, period: str, today: date, metric: str,
+    offset: int, limit: int | None, around_me: int | None,
+) -> tuple[list[tuple[int, float, int]], int, tuple[float, int] | None]:
+    """
+    (ranked slice, member count, (my score, my rank)) for a leaderboard.
+
+    Protein boards up to LARGE_BOARD_MEMBERS come from the in-memory store;
+    larger ones are paged and ranked with index range scans so the work
+    stays bounded by the page size, not the group size. Adherence and
+    streak boards are ranked from the per-day totals on each request.
+    """
+    # Before anything that loads or materializes a board
+    await _require_member(db, group_id, user_id)
+    if metric == "protein":
+        board = await leaderboards.get_board(db, group_id, period, today)
+    else:
+        board = leaderboards.Board(await streaks.group_scores(db, group_id, metric, today))
+    if board is not None:
+        score = board.scores.get(user_id)
+        mine = (score, board.rank(user_id)) if score is not None else None
+        total = len(board)
+        if around_me:
+            ranked = board.around(user_id, around_me)
+        else:
+            ranked = board.page(offset, limit)
     else:
-        start = today - timedelta(days=6)
-        date_clause = "DATE(fe.logged_at) BETWEEN $1 AND $2"
-        date_params = [start, today]
-        group_param = "$3"
+        mine = await leaderboards.sql_my_rank(db, group_id, period, today, user_id)
+        total = await leaderboards.sql_total(db, group_id, period, today)
+        if around_me:
+            ranked = await leaderboards.sql_around(db, group_id, period, today, user_id, around_me)
+        else:
+            ranked = await leaderboards.sql_page(db, group_id, period, today, offset, limit)
+    return ranked, total, mine
 
-    rows = await db.fetch(
-        f"""SELECT u.id as user_id, u.display_name, u.avatar_url,
-                   COALESCE(SUM(fe.protein_g), 0) as total_protein
-            FROM group_members gm
-            JOIN users u ON u.id = gm.user_id
-            LEFT JOIN food_entries fe ON fe.user_id = u.id AND {date_clause}
-            WHERE gm.group_id = {group_param}
-            GROUP BY u.id, u.display_name, u.avatar_url
-            ORDER BY total_protein DESC""",
-        *date_params, group_id,
-    )
 
+async def _leaderboard_entries(
+    db, ranked: list[tuple[int, float, int]], metric: str, period: str, today: date,
+) -> list[LeaderboardEntry]:
+    user_ids = [uid for uid, _, _ in ranked]
+    users = await db.fetch(
+        "SELECT id, display_name, avatar_url FROM users WHERE id = ANY($1)", user_ids,
+    )
+    by_id = {u["id"]: u for u in users}
+    if metric == "protein":
+        protein = {uid: score for uid, score, _ in ranked}
+    else:
+        protein = await streaks.protein_totals(
+            db, user_ids, leaderboards.period_start(period, today), today,
+        )
     return [
         LeaderboardEntry(
-            user_id=r["user_id"],
-            display_name=r["display_name"],
-            avatar_url=r["avatar_url"],
-            total_protein=round(r["total_protein"], 1),
-            rank=i + 1,
+            user_id=uid,
+            display_name=by_id[uid]["display_name"],
+            avatar_url=by_id[uid]["avatar_url"],
+            total_protein=round(protein.get(uid, 0.0), 1),
+            rank=rank,
+            value=round(score, 1),
         )
-        for i, r in enumerate(rows)
+        for uid, score, rank in ranked
+        if uid in by_id
     ]
+
+
+@router.get("/{group_id}/leaderboard", response_model=list[LeaderboardEntry])
+async def get_leaderboard(
+    group_id: int,
+    period: str = Query("daily", regex="^(daily|weekly)$"),
+    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
+    metric: str = Query("protein", pattern=METRIC_PATTERN, description=METRIC_HELP),
+    limit: int = Query(None, ge=1, le=500, description="Default: every member"),
+    offset: int = Query(0, ge=0),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """
+    The whole board by default, as older clients expect; current clients
+    page through /leaderboard/page, which also returns the caller's rank.
+    """
+    today = _board_day(today_str)
+    ranked, _, _ = await _ranked_view(db, group_id, user["id"], period, today, metric, offset, limit, None)
+    return await _leaderboard_entries(db, ranked, metric, period, today)
+
+
+@router.get("/{group_id}/leaderboard/page", response_model=LeaderboardPage)
+async def get_leaderboard_page(
+    group_id: int,
+    period: str = Query("daily", pattern="^(daily|weekly)$"),
+    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    around_me: int = Query(None, ge=1, le=50, description="Return this many ranks either side of the caller instead of a page"),
+    metric: str = Query("protein", pattern=METRIC_PATTERN, description=METRIC_HELP),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """A ranked slice of the leaderboard plus the caller's own rank."""
+    today = _board_day(today_str)
+    ranked, total, mine = await _ranked_view(
+        db, group_id, user["id"], period, today, metric, offset, limit, around_me,
+    )
+    entries = await _leaderboard_entries(db, ranked, metric, period, today)
+    my_protein = None
+    if mine and metric == "protein":
+        my_protein = round(mine[0], 1)
+    elif mine:
+        totals = await streaks.protein_totals(
+            db, [user["id"]], leaderboards.period_start(period, today), today,
+        )
+        my_protein = round(totals.get(user["id"], 0.0), 1)
+    return LeaderboardPage(
+        entries=entries,
+        total_members=total,
+        my_rank=mine[1] if mine else None,
+        my_total_protein=my_protein,
+        metric=metric,
+        my_value=round(mine[0], 1) if mine else None,
+    )
+
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.post("/{group_id}/events/ticket")
+async def group_events_ticket(
+    group_id: int,
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """A short-lived ticket for opening the group's event stream (see auth.create_stream_ticket)."""
+    await _require_member(db, group_id, user["id"])
+    return {"ticket": create_stream_ticket(user["id"], group_id)}
+
+
+@router.get("/{group_id}/events")
+async def group_events(
+    group_id: int,
+    ticket: str = Query(..., description="From POST /groups/{group_id}/events/ticket"),
+):
+    """Server-sent events with coalesced leaderboard changes for the group."""
+    # Membership was checked when the ticket was issued
+    if decode_stream_ticket(ticket, group_id) is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired ticket")
+
+    async def stream():
+        queue = hub.subscribe(group_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(group_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
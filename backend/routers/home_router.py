@@ -0,0 +1,50 @@
+import asyncio
+from datetime import date
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import ORJSONResponse
+
+import database
+from dependencies import get_read_db, get_current_user_read
+from models import HomeResponse, UserResponse
+from routers.dashboard_router import build_daily_summary, build_weekly
+from routers.group_router import fetch_user_groups
+
+router = APIRouter(prefix="/home", tags=["home"])
+
+
+async def _weekly_and_groups(user: dict, today: date, last_write: str | None):
+    async with database.acquire_read(user["id"], last_write) as conn:
+        weekly = await build_weekly(conn, user, today)
+        groups = await fetch_user_groups(conn, user["id"])
+    return weekly, groups
+
+
+@router.get("", response_model=HomeResponse)
+async def get_home(
+    date_str: str = Query(None, alias="date", description="YYYY-MM-DD"),
+    today_str: str = Query(None, alias="today", description="YYYY-MM-DD client local date"),
+    x_last_write: str = Header(None),
+    user: dict = Depends(get_current_user_read),
+    db=Depends(get_read_db),
+):
+    """
+    Everything the app needs on open, in one round trip.
+
+    The daily summary runs on the request's connection while the weekly
+    totals and group list run on a second pooled connection. Both are
+    read connections, so they go to the replica when it is eligible.
+    """
+    today = date.fromisoformat(today_str) if today_str else date.today()
+    target_date = date.fromisoformat(date_str) if date_str else today
+
+    daily, (weekly, groups) = await asyncio.gather(
+        build_daily_summary(db, user, target_date),
+        _weekly_and_groups(user, today, x_last_write),
+    )
+    return ORJSONResponse({
+        "user": UserResponse(**user).model_dump(),
+        "daily": daily,
+        "weekly": weekly.model_dump(),
+        "groups": [g.model_dump() for g in groups],
+    })
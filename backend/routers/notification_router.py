@@ -81,6 +81,7 @@ async def update_prefs(
     for i, (k, v) in enumerate(updates.items(), 1):
         set_parts.append(f"{k} = ${i}")
         params.append(v)
+    set_parts.append("change_version = change_version + 1")
     params.append(user["id"])
     await db.execute(
         f"UPDATE users SET {', '.join(set_parts)} WHERE id = ${len(params)}",
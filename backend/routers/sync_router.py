@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+
+from dependencies import get_db, get_current_user
+from models import SyncResponse, UserResponse
+from routers.food_router import _entry_json
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: int = Query(0, ge=0, description="Last change version the client has seen"),
+    limit: int = Query(500, ge=1, le=2000),
+    user: dict = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Return everything that changed after `since`.
+
+    Each write bumps the user's change version once, so entries carry
+    distinct versions. When more than `limit` entries changed, the page is
+    cut at the last returned entry's version and `has_more` is set; the
+    client calls again with the returned `version`.
+    """
+    version = user["change_version"]
+    if since >= version:
+        return SyncResponse(
+            version=version,
+            user=UserResponse(**user),
+            entries=[],
+            deleted_entry_ids=[],
+            daily_totals=[],
+            updated_plan_weeks=[],
+        )
+
+    rows = await db.fetch(
+        """SELECT * FROM food_entries
+           WHERE user_id = $1 AND change_version > $2
+           ORDER BY change_version
+           LIMIT $3""",
+        user["id"], since, limit + 1,
+    )
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        version = rows[-1]["change_version"]
+
+    tombstones = await db.fetch(
+        """SELECT entry_id, logged_at FROM entry_tombstones
+           WHERE user_id = $1 AND change_version > $2 AND change_version <= $3""",
+        user["id"], since, version,
+    )
+    plan_weeks = await db.fetch(
+        """SELECT week_start FROM weekly_meal_plans
+           WHERE user_id = $1 AND change_version > $2 AND change_version <= $3
+           ORDER BY week_start""",
+        user["id"], since, version,
+    )
+
+    touched_dates = sorted(
+        {r["logged_at"].date() for r in rows} | {t["logged_at"].date() for t in tombstones}
+    )
+    totals = []
+    if touched_dates:
+        totals = await db.fetch(
+            """SELECT d.day,
+                      COALESCE(SUM(fe.protein_g), 0) as total_protein,
+                      COALESCE(SUM(fe.calories), 0) as total_calories,
+                      COALESCE(SUM(fe.carbs_g), 0) as total_carbs
+               FROM unnest($2::date[]) AS d(day)
+               LEFT JOIN food_entries fe
+                 ON fe.user_id = $1 AND fe.logged_at >= d.day AND fe.logged_at < d.day + 1
+               GROUP BY d.day
+               ORDER BY d.day""",
+            user["id"], touched_dates,
+        )
+
+    return ORJSONResponse({
+        "version": version,
+        "has_more": has_more,
+        "user": UserResponse(**user).model_dump(),
+        "entries": [_entry_json(r) for r in rows],
+        "deleted_entry_ids": [t["entry_id"] for t in tombstones],
+        "daily_totals": [
+            {
+                "date": r["day"].isoformat(),
+                "total_protein": round(r["total_protein"], 1),
+                "total_calories": round(r["total_calories"], 1),
+                "total_carbs": round(r["total_carbs"], 1),
+            }
+            for r in totals
+        ],
+        "updated_plan_weeks": [r["week_start"].isoformat() for r in plan_weeks],
+    })
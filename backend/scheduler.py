@@ -1,13 +1,18 @@
 import asyncio
 import json
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from pywebpush import webpush, WebPushException
 
+import admin_stats
 import database
+import leaderboards
+import meal_plan_pregen
+import partitions
 from config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -67,7 +72,7 @@ async def check_and_send_meal_notifications(meal_type: str):
 
     now_utc = datetime.now(timezone.utc)
 
-    async with database.pool.acquire() as db:
+    async with database.acquire() as db:
         rows = await db.fetch(
             f"""
             SELECT ps.id, ps.user_id, ps.endpoint, ps.p256dh, ps.auth, ps.timezone,
@@ -145,6 +150,61 @@ async def check_and_send_meal_notifications(meal_type: str):
             await db.execute("DELETE FROM push_subscriptions WHERE id = $1", sub_id)
 
 
+async def manage_food_entry_partitions():
+    """Keep future monthly partitions created and archive expired ones."""
+    if not database.pool:
+        return
+    settings = get_settings()
+    async with database.acquire() as db:
+        if not await partitions.is_partitioned(db):
+            return
+        try:
+            await partitions.maintain_partitions(
+                db,
+                months_ahead=settings.partition_months_ahead,
+                retention_months=settings.food_entries_retention_months,
+            )
+        except Exception as e:
+            logger.error("Partition maintenance failed: %s", e)
+
+
+async def prune_leaderboard_scores():
+    """Drop precomputed leaderboard rows for days nobody views any more."""
+    if not database.pool:
+        return
+    async with database.acquire() as db:
+        await leaderboards.prune_before(db, date.today() - timedelta(days=14))
+
+
+async def refresh_admin_stats():
+    """Refresh the admin stats snapshot and record today's history row."""
+    if not database.pool:
+        return
+    async with database.acquire() as db:
+        try:
+            await admin_stats.refresh(db)
+        except Exception as e:
+            logger.error("Admin stats refresh failed: %s", e)
+
+
+async def pregenerate_meal_plans():
+    """Pre-generate tomorrow's meal plans while Gemini is quiet."""
+    if not database.pool:
+        return
+    settings = get_settings()
+    try:
+        counts = await meal_plan_pregen.run(
+            date.today() + timedelta(days=1),
+            budget=settings.meal_plan_pregen_budget,
+            interval=settings.meal_plan_pregen_interval_s,
+        )
+    except Exception as e:
+        logger.error("Meal plan pre-generation failed: %s", e)
+        return
+    if counts is not None:
+        logger.info("Meal plan pre-generation: %s", counts)
+
+
 def start_scheduler():
     global _scheduler
     _scheduler = AsyncIOScheduler()
@@ -156,6 +216,33 @@ def start_scheduler():
             id=f"notif_{meal}",
             replace_existing=True,
         )
+    _scheduler.add_job(
+        manage_food_entry_partitions,
+        CronTrigger(hour=3, minute=15),
+        id="manage_partitions",
+        replace_existing=True,
+        next_run_time=datetime.now(timezone.utc),
+    )
+    _scheduler.add_job(
+        prune_leaderboard_scores,
+        CronTrigger(hour=3, minute=30),
+        id="prune_leaderboards",
+        replace_existing=True,
+    )
+    _scheduler.add_job(
+        refresh_admin_stats,
+        IntervalTrigger(seconds=admin_stats.REFRESH_SECONDS),
+        id="refresh_admin_stats",
+        replace_existing=True,
+        next_run_time=datetime.now(timezone.utc),
+    )
+    if get_settings().meal_plan_pregen_enabled:
+        _scheduler.add_job(
+            pregenerate_meal_plans,
+            CronTrigger(hour=get_settings().meal_plan_pregen_hour, minute=0),
+            id="pregenerate_meal_plans",
+            replace_existing=True,
+        )
     _scheduler.start()
     logger.info("Notification scheduler started")
 
@@ -1,5 +1,3 @@
-import database
-
 # Format: (name, protein_g, calories, carbs_g, category, icon, sort_order)
 COMMON_FOODS = [
     ("Chicken Breast (100g)", 31.0, 165,  0.0, "meat",       "\U0001f357", 1),
@@ -20,28 +18,141 @@ COMMON_FOODS = [
 ]
 
 
-async def seed_common_foods():
-    async with database.pool.acquire() as conn:
-        count = await conn.fetchval("SELECT COUNT(*) FROM common_foods")
-        if count == 0:
+async def seed_common_foods(conn):
+    """Insert the quick-add foods on an empty table; run as a migration, not per boot."""
+    count = await conn.fetchval("SELECT COUNT(*) FROM common_foods")
+    if count == 0:
+        await conn.executemany(
+            """INSERT INTO common_foods
+               (name, protein_g, calories, carbs_g, category, icon, sort_order)
+               VALUES ($1, $2, $3, $4, $5, $6, $7)""",
+            COMMON_FOODS,
+        )
+        print(f"Seeded {len(COMMON_FOODS)} common foods")
+    else:
+        # Backfill carbs_g if migration just added the column (all zeros)
+        zero_count = await conn.fetchval(
+            "SELECT COUNT(*) FROM common_foods WHERE carbs_g = 0"
+        )
+        if zero_count == count:
+            carbs_updates = [(row[3], row[0]) for row in COMMON_FOODS]
             await conn.executemany(
-                """INSERT INTO common_foods
-                   (name, protein_g, calories, carbs_g, category, icon, sort_order)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)""",
-                COMMON_FOODS,
+                "UPDATE common_foods SET carbs_g = $1 WHERE name = $2",
+                carbs_updates,
             )
-            print(f"Seeded {len(COMMON_FOODS)} common foods")
+            print(f"Backfilled carbs_g for {len(carbs_updates)} common foods")
         else:
-            # Backfill carbs_g if migration just added the column (all zeros)
-            zero_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM common_foods WHERE carbs_g = 0"
-            )
-            if zero_count == count:
-                carbs_updates = [(row[3], row[0]) for row in COMMON_FOODS]
-                await conn.executemany(
-                    "UPDATE common_foods SET carbs_g = $1 WHERE name = $2",
-                    carbs_updates,
-                )
-                print(f"Backfilled carbs_g for {len(carbs_updates)} common foods")
-            else:
-                print(f"Common foods already seeded ({count} entries)")
+            print(f"Common foods already seeded ({count} entries)")
+
+
+# Dish -> ingredients for ONE serving, used by grocery.py. Keys are
+# grocery.dish_key() forms; units are g, ml or count.
+# Format: dish: [(ingredient, category, amount, unit), ...]
+DISH_INGREDIENTS = {
+    # Single-ingredient quick-add foods
+    "chicken breast": [("Chicken breast", "Protein & Meat", 150, "g")],
+    "eggs": [("Eggs", "Dairy & Eggs", 2, "count")],
+    "greek yogurt": [("Greek yogurt", "Dairy & Eggs", 200, "g")],
+    "whey protein scoop": [("Whey protein", "Pantry & Spices", 30, "g")],
+    "paneer": [("Paneer", "Dairy & Eggs", 100, "g")],
+    "dal lentils": [("Yellow lentils", "Pantry & Spices", 60, "g"), ("Onion", "Produce", 40, "g"),
+                    ("Tomatoes", "Produce", 50, "g"), ("Cumin seeds", "Pantry & Spices", 2, "g")],
+    "tofu": [("Tofu", "Protein & Meat", 150, "g")],
+    "salmon": [("Salmon fillet", "Protein & Meat", 150, "g")],
+    "milk": [("Milk", "Dairy & Eggs", 250, "ml")],
+    "rice": [("Rice", "Grains & Bread", 75, "g")],
+    "oats": [("Rolled oats", "Grains & Bread", 50, "g")],
+    "peanut butter": [("Peanut butter", "Pantry & Spices", 32, "g")],
+    "chickpeas": [("Chickpeas", "Pantry & Spices", 80, "g")],
+    "almonds": [("Almonds", "Pantry & Spices", 30, "g")],
+    "banana": [("Bananas", "Produce", 1, "count")],
+    # Common plan dishes
+    "greek yogurt with oats": [("Greek yogurt", "Dairy & Eggs", 200, "g"),
+                               ("Rolled oats", "Grains & Bread", 40, "g"),
+                               ("Honey", "Pantry & Spices", 10, "g")],
+    "overnight oats": [("Rolled oats", "Grains & Bread", 50, "g"), ("Milk", "Dairy & Eggs", 150, "ml"),
+                       ("Chia seeds", "Pantry & Spices", 10, "g"), ("Bananas", "Produce", 1, "count")],
+    "oatmeal with berries": [("Rolled oats", "Grains & Bread", 50, "g"), ("Milk", "Dairy & Eggs", 200, "ml"),
+                             ("Mixed berries", "Produce", 80, "g")],
+    "scrambled eggs on toast": [("Eggs", "Dairy & Eggs", 3, "count"), ("Bread", "Grains & Bread", 2, "count"),
+                                ("Butter", "Dairy & Eggs", 10, "g")],
+    "omelette": [("Eggs", "Dairy & Eggs", 3, "count"), ("Onion", "Produce", 30, "g"),
+                 ("Bell peppers", "Produce", 40, "g"), ("Cooking oil", "Pantry & Spices", 5, "ml")],
+    "boiled eggs": [("Eggs", "Dairy & Eggs", 2, "count")],
+    "protein smoothie": [("Whey protein", "Pantry & Spices", 30, "g"), ("Milk", "Dairy & Eggs", 250, "ml"),
+                         ("Bananas", "Produce", 1, "count"), ("Peanut butter", "Pantry & Spices", 16, "g")],
+    "whey shake": [("Whey protein", "Pantry & Spices", 30, "g"), ("Milk", "Dairy & Eggs", 250, "ml")],
+    "poha": [("Flattened rice", "Grains & Bread", 60, "g"), ("Onion", "Produce", 40, "g"),
+             ("Peanuts", "Pantry & Spices", 15, "g"), ("Cooking oil", "Pantry & Spices", 5, "ml")],
+    "upma": [("Semolina", "Grains & Bread", 60, "g"), ("Onion", "Produce", 40, "g"),
+             ("Mixed vegetables", "Produce", 60, "g"), ("Cooking oil", "Pantry & Spices", 5, "ml")],
+    "moong dal chilla": [("Moong dal", "Pantry & Spices", 60, "g"), ("Onion", "Produce", 30, "g"),
+                         ("Green chillies", "Produce", 5, "g"), ("Cooking oil", "Pantry & Spices", 5, "ml")],
+    "paneer bhurji": [("Paneer", "Dairy & Eggs", 120, "g"), ("Onion", "Produce", 40, "g"),
+                      ("Tomatoes", "Produce", 50, "g"), ("Cooking oil", "Pantry & Spices", 5, "ml")],
+    "chicken rice bowl": [("Chicken breast", "Protein & Meat", 150, "g"), ("Rice", "Grains & Bread", 75, "g"),
+                          ("Mixed vegetables", "Produce", 100, "g"), ("Soy sauce", "Pantry & Spices", 10, "ml")],
+    "grilled chicken salad": [("Chicken breast", "Protein & Meat", 150, "g"), ("Lettuce", "Produce", 80, "g"),
+                              ("Cucumber", "Produce", 60, "g"), ("Tomatoes", "Produce", 60, "g"),
+                              ("Olive oil", "Pantry & Spices", 10, "ml")],
+    "chicken curry with rice": [("Chicken thighs", "Protein & Meat", 150, "g"), ("Rice", "Grains & Bread", 75, "g"),
+                                ("Onion", "Produce", 60, "g"), ("Tomatoes", "Produce", 80, "g"),
+                                ("Curry powder", "Pantry & Spices", 5, "g"),
+                                ("Cooking oil", "Pantry & Spices", 10, "ml")],
+    "butter chicken": [("Chicken thighs", "Protein & Meat", 150, "g"), ("Tomatoes", "Produce", 100, "g"),
+                       ("Butter", "Dairy & Eggs", 15, "g"), ("Cream", "Dairy & Eggs", 30, "ml"),
+                       ("Garam masala", "Pantry & Spices", 3, "g")],
+    "chicken wrap": [("Chicken breast", "Protein & Meat", 120, "g"), ("Tortillas", "Grains & Bread", 1, "count"),
+                     ("Lettuce", "Produce", 30, "g"), ("Greek yogurt", "Dairy & Eggs", 30, "g")],
+    "turkey sandwich": [("Sliced turkey", "Protein & Meat", 100, "g"), ("Bread", "Grains & Bread", 2, "count"),
+                        ("Lettuce", "Produce", 20, "g"), ("Tomatoes", "Produce", 40, "g")],
+    "tuna salad": [("Canned tuna", "Protein & Meat", 120, "g"), ("Lettuce", "Produce", 80, "g"),
+                   ("Cucumber", "Produce", 60, "g"), ("Olive oil", "Pantry & Spices", 10, "ml")],
+    "baked salmon with quinoa": [("Salmon fillet", "Protein & Meat", 150, "g"), ("Quinoa", "Grains & Bread", 60, "g"),
+                                 ("Broccoli", "Produce", 100, "g"), ("Lemon", "Produce", 1, "count")],
+    "beef stir fry": [("Beef strips", "Protein & Meat", 150, "g"), ("Bell peppers", "Produce", 80, "g"),
+                      ("Broccoli", "Produce", 80, "g"), ("Soy sauce", "Pantry & Spices", 15, "ml"),
+                      ("Rice", "Grains & Bread", 75, "g")],
+    "egg fried rice": [("Eggs", "Dairy & Eggs", 2, "count"), ("Rice", "Grains & Bread", 75, "g"),
+                       ("Mixed vegetables", "Produce", 80, "g"), ("Soy sauce", "Pantry & Spices", 10, "ml")],
+    "paneer tikka with dal": [("Paneer", "Dairy & Eggs", 150, "g"), ("Greek yogurt", "Dairy & Eggs", 40, "g"),
+                              ("Bell peppers", "Produce", 60, "g"), ("Yellow lentils", "Pantry & Spices", 50, "g"),
+                              ("Tandoori masala", "Pantry & Spices", 5, "g")],
+    "palak paneer": [("Paneer", "Dairy & Eggs", 120, "g"), ("Spinach", "Produce", 150, "g"),
+                     ("Onion", "Produce", 40, "g"), ("Cream", "Dairy & Eggs", 20, "ml")],
+    "rajma chawal": [("Kidney beans", "Pantry & Spices", 70, "g"), ("Rice", "Grains & Bread", 75, "g"),
+                     ("Onion", "Produce", 50, "g"), ("Tomatoes", "Produce", 80, "g")],
+    "chole": [("Chickpeas", "Pantry & Spices", 80, "g"), ("Onion", "Produce", 50, "g"),
+              ("Tomatoes", "Produce", 80, "g"), ("Chole masala", "Pantry & Spices", 5, "g")],
+    "dal with roti": [("Yellow lentils", "Pantry & Spices", 60, "g"), ("Whole wheat flour", "Grains & Bread", 60, "g"),
+                      ("Onion", "Produce", 30, "g"), ("Tomatoes", "Produce", 40, "g")],
+    "tofu stir fry": [("Tofu", "Protein & Meat", 150, "g"), ("Mixed vegetables", "Produce", 150, "g"),
+                      ("Soy sauce", "Pantry & Spices", 15, "ml"), ("Cooking oil", "Pantry & Spices", 10, "ml")],
+    "lentil soup": [("Red lentils", "Pantry & Spices", 70, "g"), ("Carrots", "Produce", 60, "g"),
+                    ("Onion", "Produce", 40, "g"), ("Vegetable stock", "Pantry & Spices", 300, "ml")],
+    "quinoa bowl": [("Quinoa", "Grains & Bread", 60, "g"), ("Chickpeas", "Pantry & Spices", 60, "g"),
+                    ("Cucumber", "Produce", 50, "g"), ("Tomatoes", "Produce", 50, "g"),
+                    ("Olive oil", "Pantry & Spices", 10, "ml")],
+    "cottage cheese with fruit": [("Cottage cheese", "Dairy & Eggs", 200, "g"), ("Mixed berries", "Produce", 80, "g")],
+    "apple with peanut butter": [("Apples", "Produce", 1, "count"), ("Peanut butter", "Pantry & Spices", 32, "g")],
+    "trail mix": [("Almonds", "Pantry & Spices", 15, "g"), ("Walnuts", "Pantry & Spices", 10, "g"),
+                  ("Raisins", "Pantry & Spices", 15, "g")],
+    "roasted chana": [("Roasted chickpeas", "Pantry & Spices", 40, "g")],
+    "sprouts salad": [("Moong sprouts", "Produce", 100, "g"), ("Onion", "Produce", 20, "g"),
+                      ("Tomatoes", "Produce", 30, "g"), ("Lemon", "Produce", 1, "count")],
+}
+
+
+async def seed_dish_ingredients(conn):
+    """Load the built-in dish knowledge base; learned rows are left alone."""
+    await conn.executemany(
+        """INSERT INTO dish_ingredients (dish_key, ingredient, category, amount, unit, source)
+           VALUES ($1, $2, $3, $4, $5, 'seed')
+           ON CONFLICT (dish_key, ingredient) DO NOTHING""",
+        [
+            (dish, ingredient, category, amount, unit)
+            for dish, ingredients in DISH_INGREDIENTS.items()
+            for ingredient, category, amount, unit in ingredients
+        ],
+    )
+    print(f"Seeded ingredients for {len(DISH_INGREDIENTS)} dishes")
@@ -0,0 +1,210 @@
+"""
+Goal streaks and adherence.
+
+Every food write adds its macros to the user's user_daily_totals row for
+that day, which also records whether the day is on target. Streak state on
+users (current_streak, best_streak, streak_last_day) only changes when a
+day flips on or off target, and then only the run of days around it is
+re-read, so no write ever rescans food_entries. The one exception is a day
+dropping out of a run at least as long as best_streak: the best is then
+recomputed from the user's daily rows. Adherence is the share of on-target
+days in the last 7/30 daily rows.
+"""
+from datetime import date, timedelta
+
+from models import UserStats
+
+# Calories and carbs count as on target up to this much over goal
+GOAL_TOLERANCE = 0.10
+METRICS = ("protein", "adherence", "streak")
+RUN_BATCH = 64
+
+ADD_DAY_TOTALS_SQL = """
+    INSERT INTO user_daily_totals AS t (user_id, day, protein_g, calories, carbs_g, entries)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (user_id, day) DO UPDATE
+    SET entries = t.entries + EXCLUDED.entries,
+        protein_g = t.protein_g + EXCLUDED.protein_g,
+        calories = t.calories + EXCLUDED.calories,
+        carbs_g = t.carbs_g + EXCLUDED.carbs_g
+    RETURNING protein_g, calories, carbs_g, on_target
+"""
+
+HITS_BEFORE_SQL = """
+    SELECT day FROM user_daily_totals
+    WHERE user_id = $1 AND on_target AND day < $2
+    ORDER BY day DESC LIMIT $3
+"""
+
+HITS_AFTER_SQL = """
+    SELECT day FROM user_daily_totals
+    WHERE user_id = $1 AND on_target AND day > $2
+    ORDER BY day LIMIT $3
+"""
+
+# Longest run of consecutive on-target days: within a run, day minus its
+# row number is constant
+BEST_STREAK_SQL = """
+    SELECT COALESCE(MAX(n), 0) FROM (
+        SELECT COUNT(*) AS n FROM (
+            SELECT day - (ROW_NUMBER() OVER (ORDER BY day))::int AS run
+            FROM user_daily_totals WHERE user_id = $1 AND on_target
+        ) d GROUP BY run
+    ) r
+"""
+
+
+def is_on_target(totals, user: dict) -> bool:
+    return (
+        totals["protein_g"] >= user["protein_goal"]
+        and totals["calories"] <= user["calorie_goal"] * (1 + GOAL_TOLERANCE)
+        and totals["carbs_g"] <= user["carb_goal"] * (1 + GOAL_TOLERANCE)
+    )
+
+
+def current_streak(user: dict, today: date) -> int:
+    """The stored streak, or 0 once a whole day has passed without a hit."""
+    last = user.get("streak_last_day")
+    if last is None or last < today - timedelta(days=1):
+        return 0
+    return user.get("current_streak", 0)
+
+
+async def _run_length(db, user_id: int, day: date, step: int) -> int:
+    """Consecutive on-target days right before (step=-1) or after (step=1) `day`."""
+    sql = HITS_BEFORE_SQL if step < 0 else HITS_AFTER_SQL
+    n, cursor = 0, day
+    while True:
+        rows = await db.fetch(sql, user_id, cursor, RUN_BATCH)
+        for r in rows:
+            if r["day"] != cursor + timedelta(days=step):
+                return n
+            n, cursor = n + 1, r["day"]
+        if len(rows) < RUN_BATCH:
+            return n
+
+
+async def _on_flip(db, user: dict, day: date, on_target: bool):
+    uid = user["id"]
+    await db.execute(
+        "UPDATE user_daily_totals SET on_target = $3 WHERE user_id = $1 AND day = $2",
+        uid, day, on_target,
+    )
+    streak = await db.fetchrow(
+        "SELECT current_streak, best_streak, streak_last_day FROM users WHERE id = $1", uid,
+    )
+    current, best, last = streak["current_streak"], streak["best_streak"], streak["streak_last_day"]
+
+    if on_target:
+        after = await _run_length(db, uid, day, 1)
+        length = await _run_length(db, uid, day, -1) + 1 + after
+        end = day + timedelta(days=after)
+        best = max(best, length)
+        if last is None or end >= last:
+            current, last = length, end
+    else:
+        before = await _run_length(db, uid, day, -1)
+        after = await _run_length(db, uid, day, 1)
+        if before + 1 + after >= best:
+            # The broken run may be the one that set the best
+            best = await db.fetchval(BEST_STREAK_SQL, uid)
+        if last is not None and last - timedelta(days=current) < day <= last:
+            # The day broke the latest run
+            if day < last:
+                current = after
+            elif before:
+                current, last = before, day - timedelta(days=1)
+            else:
+                prev = await db.fetchval(
+                    "SELECT MAX(day) FROM user_daily_totals WHERE user_id = $1 AND on_target AND day < $2",
+                    uid, day,
+                )
+                if prev is None:
+                    current, last = 0, None
+                else:
+                    current, last = await _run_length(db, uid, prev, -1) + 1, prev
+
+    await db.execute(
+        """UPDATE users SET current_streak = $2, best_streak = $3, streak_last_day = $4
+           WHERE id = $1""",
+        uid, current, best, last,
+    )
+
+
+async def apply_entry(
+    db, user: dict, day: date, protein: float, calories: float, carbs: float, entries: int = 1,
+):
+    """
+    Add an entry's macros to the user's day; a delete passes negated macros
+    and entries=-1.
+
+    Call inside the write's transaction, after bump_change_version, whose
+    row lock on users serializes concurrent writes by the same user.
+    """
+    totals = await db.fetchrow(
+        ADD_DAY_TOTALS_SQL, user["id"], day, protein, calories, carbs or 0, entries,
+    )
+    on_target = is_on_target(totals, user)
+    if on_target != totals["on_target"]:
+        await _on_flip(db, user, day, on_target)
+
+
+async def reevaluate_day(db, user: dict, day: date):
+    """Re-check one day against the user's (new) goals; past days keep their verdict."""
+    totals = await db.fetchrow(
+        """SELECT protein_g, calories, carbs_g, on_target FROM user_daily_totals
+           WHERE user_id = $1 AND day = $2""",
+        user["id"], day,
+    )
+    if totals is not None and is_on_target(totals, user) != totals["on_target"]:
+        await _on_flip(db, user, day, not totals["on_target"])
+
+
+async def user_stats(db, user: dict, today: date) -> UserStats:
+    hits = await db.fetchrow(
+        """SELECT COUNT(*) FILTER (WHERE on_target AND day > $2::date - 7) AS hits_7,
+                  COUNT(*) FILTER (WHERE on_target) AS hits_30
+           FROM user_daily_totals
+           WHERE user_id = $1 AND day > $2::date - 30 AND day <= $2""",
+        user["id"], today,
+    )
+    return UserStats(
+        current_streak=current_streak(user, today),
+        best_streak=user.get("best_streak", 0),
+        adherence_7d=round(hits["hits_7"] / 7, 3),
+        adherence_30d=round(hits["hits_30"] / 30, 3),
+    )
+
+
+async def group_scores(db, group_id: int, metric: str, today: date) -> dict[int, float]:
+    """user id -> 7-day adherence (%) or current streak for every group member."""
+    if metric == "adherence":
+        rows = await db.fetch(
+            """SELECT gm.user_id, 100.0 * COUNT(t.day) / 7 AS score
+               FROM group_members gm
+               LEFT JOIN user_daily_totals t
+                 ON t.user_id = gm.user_id AND t.on_target
+                AND t.day > $2::date - 7 AND t.day <= $2
+               WHERE gm.group_id = $1
+               GROUP BY gm.user_id""",
+            group_id, today,
+        )
+    else:
+        rows = await db.fetch(
+            """SELECT gm.user_id,
+                      CASE WHEN u.streak_last_day >= $2::date - 1 THEN u.current_streak ELSE 0 END AS score
+               FROM group_members gm JOIN users u ON u.id = gm.user_id
+               WHERE gm.group_id = $1""",
+            group_id, today,
+        )
+    return {r["user_id"]: float(r["score"]) for r in rows}
+
+
+async def protein_totals(db, user_ids: list[int], start: date, end: date) -> dict[int, float]:
+    rows = await db.fetch(
+        """SELECT user_id, SUM(protein_g) AS protein FROM user_daily_totals
+           WHERE user_id = ANY($1) AND day BETWEEN $2 AND $3
+           GROUP BY user_id""",
+        user_ids, start, end,
+    )
+    return {r["user_id"]: r["protein"] for r in rows}
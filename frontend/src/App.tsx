@@ -1,5 +1,6 @@
 import { BrowserRouter, Routes, Route, useSearchParams, useNavigate } from 'react-router-dom';
 import { useEffect } from 'react';
+import { setLastWrite } from './api';
 import { AuthProvider } from './context/AuthContext';
 import { useAuth } from './hooks/useAuth';
 import ProtectedRoute from './components/ProtectedRoute';
@@ -22,6 +23,10 @@ function AuthCallback() {
   useEffect(() => {
     const token = params.get('token');
     const isNewUser = params.get('new_user') === '1';
+    const lastWrite = params.get('last_write');
+    if (lastWrite) {
+      setLastWrite(lastWrite);
+    }
     if (token) {
       login(token);
       navigate('/', { replace: true, state: { showGoals: isNewUser } });
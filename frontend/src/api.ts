@@ -4,16 +4,38 @@ const api = axios.create({
   baseURL: '/api',
 });
 
+// Returned after writes and echoed on every request, so reads that land on
+// a lagging replica still see this client's own writes (any worker).
+const LAST_WRITE_KEY = 'lastWrite';
+
+export function getLastWrite(): string | null {
+  return localStorage.getItem(LAST_WRITE_KEY);
+}
+
+export function setLastWrite(value: string) {
+  localStorage.setItem(LAST_WRITE_KEY, value);
+}
+
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token');
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  const lastWrite = getLastWrite();
+  if (lastWrite) {
+    config.headers['X-Last-Write'] = lastWrite;
+  }
   return config;
 });
 
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const lastWrite = response.headers['x-last-write'];
+    if (lastWrite) {
+      setLastWrite(lastWrite);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
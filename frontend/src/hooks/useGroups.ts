@@ -1,6 +1,7 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
+import axios from 'axios';
 import api from '../api';
-import { Group, LeaderboardEntry } from '../types';
+import { Group, LeaderboardEntry, LeaderboardPage } from '../types';
 
 export function useGroups() {
   const [groups, setGroups] = useState<Group[]>([]);
@@ -41,30 +42,122 @@ function toLocalDateStr(d: Date): string {
   return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
 }
 
+const PAGE_SIZE = 50;
+const MAX_PAGE = 200; // the page endpoint's limit cap
+const AROUND_ME = 2;
+const EVENTS_RETRY_MS = 5000;
+
 export function useLeaderboard(groupId: number | null, period: 'daily' | 'weekly') {
   const [entries, setEntries] = useState<LeaderboardEntry[]>([]);
+  // The caller's neighbourhood when they rank below the loaded pages
+  const [aroundMe, setAroundMe] = useState<LeaderboardEntry[]>([]);
+  const [totalMembers, setTotalMembers] = useState(0);
+  const [myRank, setMyRank] = useState<number | null>(null);
   const [loading, setLoading] = useState(false);
+  const shown = useRef(PAGE_SIZE);
 
-  const refresh = useCallback(async () => {
-    if (!groupId) return;
-    setLoading(true);
-    try {
+  const fetchPage = useCallback(
+    async (params: Record<string, number>) => {
       const today = toLocalDateStr(new Date());
-      const { data } = await api.get<LeaderboardEntry[]>(
-        `/groups/${groupId}/leaderboard`,
-        { params: { period, today } }
+      const { data } = await api.get<LeaderboardPage>(
+        `/groups/${groupId}/leaderboard/page`,
+        { params: { period, today, ...params } }
       );
-      setEntries(data);
+      return data;
+    },
+    [groupId, period]
+  );
+
+  // Pushed updates reload in place; only explicit refreshes show the spinner
+  const load = useCallback(async (showLoading: boolean) => {
+    if (!groupId) return;
+    if (showLoading) setLoading(true);
+    try {
+      const data = await fetchPage({ limit: Math.min(shown.current, MAX_PAGE), offset: 0 });
+      setEntries(data.entries);
+      setTotalMembers(data.total_members);
+      setMyRank(data.my_rank);
+      if (data.my_rank && data.my_rank > data.entries.length) {
+        setAroundMe((await fetchPage({ around_me: AROUND_ME })).entries);
+      } else {
+        setAroundMe([]);
+      }
     } catch {
       // keep stale
     } finally {
-      setLoading(false);
+      if (showLoading) setLoading(false);
     }
+  }, [groupId, fetchPage]);
+
+  const refresh = useCallback(() => load(true), [load]);
+
+  const loadMore = useCallback(async () => {
+    if (!groupId) return;
+    try {
+      const data = await fetchPage({ limit: PAGE_SIZE, offset: entries.length });
+      const next = [...entries, ...data.entries];
+      shown.current = next.length;
+      setEntries(next);
+      setAroundMe((prev) => prev.filter((e) => e.rank > next.length));
+    } catch {
+      // keep what is shown
+    }
+  }, [groupId, fetchPage, entries]);
+
+  useEffect(() => {
+    shown.current = PAGE_SIZE;
   }, [groupId, period]);
 
   useEffect(() => {
     refresh();
   }, [refresh]);
 
-  return { entries, loading, refresh };
+  // Refetch when the server pushes a (coalesced) leaderboard change. The
+  // stream URL carries a short-lived ticket rather than the session token,
+  // so every (re)connect asks for a fresh one.
+  useEffect(() => {
+    if (!groupId || typeof EventSource === 'undefined') return;
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const connect = async () => {
+      try {
+        const { data } = await api.post<{ ticket: string }>(`/groups/${groupId}/events/ticket`);
+        if (closed) return;
+        source = new EventSource(
+          `/api/groups/${groupId}/events?ticket=${encodeURIComponent(data.ticket)}`
+        );
+        source.addEventListener('leaderboard', () => {
+          load(false);
+        });
+        source.onerror = () => {
+          source?.close();
+          source = null;
+          if (!closed) retry = setTimeout(connect, EVENTS_RETRY_MS);
+        };
+      } catch (err) {
+        // Not a member (any more): nothing to listen to
+        if (axios.isAxiosError(err) && err.response?.status === 403) return;
+        if (!closed) retry = setTimeout(connect, EVENTS_RETRY_MS);
+      }
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      source?.close();
+    };
+  }, [groupId, load]);
+
+  return {
+    entries,
+    aroundMe: aroundMe.filter((e) => e.rank > entries.length),
+    totalMembers,
+    myRank,
+    hasMore: entries.length < totalMembers,
+    loading,
+    refresh,
+    loadMore,
+  };
 }
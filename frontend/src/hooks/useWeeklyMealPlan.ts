@@ -36,7 +36,7 @@ export function useWeeklyMealPlan() {
         params: { week_start: weekStart },
       });
       setPlan(res.data);
-      setConversationHistory([]);
+      setConversationHistory(res.data.conversation_history ?? []);
     } catch (e: any) {
       if (e.response?.status !== 404) {
         setError(e.response?.data?.detail ?? 'Failed to load saved plan.');
@@ -83,8 +83,11 @@ export function useWeeklyMealPlan() {
     setIsSaving(true);
     setError(null);
     try {
-      await api.post('/food/weekly-meal-plan/save', plan);
-      setPlan({ ...plan, saved: true });
+      const res = await api.post<{ saved: boolean; version: number; unchanged: boolean }>(
+        '/food/weekly-meal-plan/save',
+        plan,
+      );
+      setPlan({ ...plan, saved: true, version: res.data.version });
     } catch (e: any) {
       setError(e.response?.data?.detail ?? 'Failed to save plan.');
     } finally {
@@ -92,6 +95,24 @@ export function useWeeklyMealPlan() {
     }
   };
 
+  const restoreVersion = async (version: number) => {
+    if (!plan) return;
+    setIsSaving(true);
+    setError(null);
+    try {
+      const res = await api.post<WeeklyMealPlanResponse>('/food/weekly-meal-plan/versions/restore', {
+        week_start: plan.week_start,
+        version,
+      });
+      setPlan(res.data);
+      setGroceryList(null);
+    } catch (e: any) {
+      setError(e.response?.data?.detail ?? 'Failed to restore plan.');
+    } finally {
+      setIsSaving(false);
+    }
+  };
+
   const generateGroceryList = async () => {
     if (!plan) return;
     setIsGeneratingGroceryList(true);
@@ -123,6 +144,7 @@ export function useWeeklyMealPlan() {
     loadSavedPlan,
     refinePlan,
     savePlan,
+    restoreVersion,
     generateGroceryList,
     clearGroceryList,
   };
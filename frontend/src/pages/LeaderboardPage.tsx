@@ -10,7 +10,10 @@ export default function LeaderboardPage() {
   const navigate = useNavigate();
   const { user } = useAuth();
   const [period, setPeriod] = useState<'daily' | 'weekly'>('daily');
-  const { entries, loading } = useLeaderboard(id ? parseInt(id) : null, period);
+  const { entries, aroundMe, hasMore, loading, loadMore } = useLeaderboard(
+    id ? parseInt(id) : null,
+    period
+  );
 
   return (
     <div className="max-w-lg mx-auto px-4 py-4 space-y-4">
@@ -42,7 +45,20 @@ export default function LeaderboardPage() {
           <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-primary-600" />
         </div>
       ) : (
-        <LeaderboardTable entries={entries} currentUserId={user?.id ?? 0} />
+        <>
+          <LeaderboardTable entries={entries} currentUserId={user?.id ?? 0} />
+          {hasMore && (
+            <button onClick={loadMore} className="w-full py-2 text-sm font-medium text-primary-600">
+              Show more
+            </button>
+          )}
+          {aroundMe.length > 0 && (
+            <>
+              <p className="text-center text-gray-400">…</p>
+              <LeaderboardTable entries={aroundMe} currentUserId={user?.id ?? 0} />
+            </>
+          )}
+        </>
       )}
     </div>
   );
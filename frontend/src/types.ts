@@ -18,6 +18,14 @@ export interface User {
   notif_breakfast_time?: string;
   notif_lunch_time?: string;
   notif_dinner_time?: string;
+  stats?: UserStats | null;
+}
+
+export interface UserStats {
+  current_streak: number;
+  best_streak: number;
+  adherence_7d: number;
+  adherence_30d: number;
 }
 
 export interface CommonFood {
@@ -90,6 +98,16 @@ export interface LeaderboardEntry {
   avatar_url: string | null;
   total_protein: number;
   rank: number;
+  value?: number | null;
+}
+
+export interface LeaderboardPage {
+  entries: LeaderboardEntry[];
+  total_members: number;
+  my_rank: number | null;
+  my_total_protein: number | null;
+  metric: string;
+  my_value: number | null;
 }
 
 export interface MealItem {
@@ -118,6 +136,7 @@ export interface MealPlanResponse {
     total_carbs: number;
   };
   nutritionist_note: string;
+  source?: 'gemini' | 'local';
 }
 
 export interface WeeklyDayPlan {
@@ -132,15 +151,30 @@ export interface WeeklyDayPlan {
   nutritionist_note: string;
 }
 
+export interface ConversationMessage {
+  role: 'user' | 'assistant';
+  content: string;
+}
+
 export interface WeeklyMealPlanResponse {
   week_start: string;
   plan: WeeklyDayPlan[];
   saved: boolean;
+  version?: number | null;
+  conversation_history?: ConversationMessage[];
 }
 
-export interface ConversationMessage {
-  role: 'user' | 'assistant';
-  content: string;
+export interface WeeklyPlanVersion {
+  version: number;
+  created_at: string;
+  changed_days: string[];
+  current: boolean;
+}
+
+export interface WeeklyPlanVersionsResponse {
+  week_start: string;
+  current_version: number;
+  versions: WeeklyPlanVersion[];
 }
 
 export interface GroceryItem {